@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import os
-import sqlite3
 from datetime import time, date
-from fastapi import FastAPI, HTTPException, Request, Depends, Header, Response
+from typing import Any, AsyncIterator, Iterator
+from fastapi import FastAPI, HTTPException, Request, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from jose import jwt as jose_jwt
@@ -16,27 +18,47 @@ from pydantic import BaseModel
 from src import (
     auth,
     mindful,
-    dashboard,
     relationships,
     activity,
     notifications,
     subscriptions,
     challenges,
-    sessions as session_models,
+    frame,
     profiles,
     analytics,
     ads,
+    bulk,
+    export,
+    stats,
+    charts,
+    mood_stats,
+    community,
+    sketches,
+    timeline,
 )
 from src import monitoring
+from src.aiodb import create_async_pool
+from src.batcher import WriteBatcher
+from src.broker import OVERFLOW, FeedBroker, encode_event
+from src.cache import MISSING, ResultCache
+from src.follow_graph import FollowGraph
+from src.frame import SessionFrame
+from src.pool import create_pool
+from src.transaction import unit_of_work
+from src.user_cache import UserSummaryCache, summaries_query
 from src.api_models import (
     DateValuePoint,
     ConsistencyDataResponse,
     MoodCorrelationPoint,
     MoodCorrelationResponse,
+    MoodStatsResponse,
+    DurationStatsResponse,
     HourValuePoint,
     TimeOfDayResponse,
     StringValuePoint,
     LocationFrequencyResponse,
+    AnalyticsSummaryResponse,
+    CommunityBenchmarksResponse,
     AdResponse,
     CustomTypeInput,
     CustomTypeResponse,
@@ -73,27 +95,94 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
-db_url = os.getenv("DATABASE_URL")
-if db_url and db_url.startswith("postgresql"):
-    import psycopg2
-    from src.pgutil import PGConnectionWrapper
+db_pool = create_pool(
+    os.getenv("DATABASE_URL"),
+    os.getenv("DB_FILE", "mindful.db"),
+    max_size=int(os.getenv("DB_POOL_SIZE", "10")),
+)
+
+
+# Async endpoints draw from their own pool so they never block the event loop.
+async_db_pool = create_async_pool(
+    os.getenv("DATABASE_URL"),
+    os.getenv("DB_FILE", "mindful.db"),
+    max_size=int(os.getenv("DB_POOL_SIZE", "10")),
+    sync_pool=db_pool,
+)
+
+
+# Optional group commit: with WRITE_BATCH_DELAY_MS set, session, comment and
+# encouragement inserts from concurrent requests are committed together by a
+# background writer on its own connection. Requests still wait for the commit.
+WRITE_BATCH_DELAY_MS = float(os.getenv("WRITE_BATCH_DELAY_MS", "0"))
+write_batcher = (
+    WriteBatcher(
+        create_pool(
+            os.getenv("DATABASE_URL"), os.getenv("DB_FILE", "mindful.db"), max_size=1
+        ),
+        max_delay=WRITE_BATCH_DELAY_MS / 1000,
+        max_batch=int(os.getenv("WRITE_BATCH_SIZE", "64")),
+    )
+    if WRITE_BATCH_DELAY_MS > 0
+    else None
+)
+
+# Analytics results are cached per user and dropped when the user's
+# user_stats.data_version changes, which every session write increments.
+analytics_cache = ResultCache(
+    max_entries=int(os.getenv("ANALYTICS_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "300")),
+)
+
+# Chart images are drawn in CHART_WORKERS processes (0 renders on a thread).
+chart_renderer = charts.ChartRenderer(
+    int(os.getenv("CHART_WORKERS", "2")),
+    max_entries=int(os.getenv("CHART_CACHE_SIZE", "256")),
+)
+
+# Following and follower lists, updated by /follow and /unfollow. Rows
+# expire after FOLLOW_GRAPH_TTL seconds so other workers' changes show up.
+follow_graph = FollowGraph(
+    max_edges=int(os.getenv("FOLLOW_GRAPH_MAX_EDGES", "1000000")),
+    ttl=float(os.getenv("FOLLOW_GRAPH_TTL", "60")),
+)
+
+# Display names, photos, bios and visibility of recently seen users. Profile
+# writes drop a user's entry; other workers' writes show up within the TTL.
+user_summaries = UserSummaryCache(
+    max_entries=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60")),
+)
+
+# Largest page of /feed a client may request.
+FEED_MAX_LIMIT = int(os.getenv("FEED_MAX_LIMIT", "100"))
+
+# Live /feed/stream subscriptions. Each buffers FEED_STREAM_QUEUE_SIZE items
+# and idle streams get a heartbeat every FEED_STREAM_HEARTBEAT seconds.
+feed_broker = FeedBroker(int(os.getenv("FEED_STREAM_QUEUE_SIZE", "100")))
+FEED_STREAM_HEARTBEAT = float(os.getenv("FEED_STREAM_HEARTBEAT", "15"))
+
+
+def get_db() -> Iterator[Any]:
+    """Yield a pooled connection that is returned when the request finishes."""
+    with db_pool.connection() as conn:
+        yield conn
+
 
-    raw_conn = psycopg2.connect(db_url)
-    conn = PGConnectionWrapper(raw_conn)
-    mindful.init_postgres_db(conn)
-else:
-    db_file = os.getenv("DB_FILE", "mindful.db")
-    conn = sqlite3.connect(db_file, check_same_thread=False)
-    mindful.init_db(conn)
+async def get_async_db() -> AsyncIterator[Any]:
+    """Yield an async pooled connection for ``async def`` endpoints."""
+    async with async_db_pool.connection() as conn:
+        yield conn
 
 
-def ensure_default_user() -> None:
+def ensure_default_user(conn: Any) -> None:
     """Insert a default account used for all requests if it doesn't exist."""
     cur = conn.execute("SELECT id FROM users WHERE id = 1")
     if not cur.fetchone():
@@ -104,7 +193,12 @@ def ensure_default_user() -> None:
         conn.commit()
 
 
-ensure_default_user()
+with db_pool.connection() as _conn:
+    if db_pool.dialect == "postgres":
+        mindful.init_postgres_db(_conn)
+    else:
+        mindful.init_db(_conn)
+    ensure_default_user(_conn)
 
 
 @app.middleware("http")
@@ -120,10 +214,10 @@ async def log_requests(request: Request, call_next):
     return response
 
 
-# Assuming ActivityFeed and NotificationManager classes were updated to accept 'conn'
-feed = activity.ActivityFeed(conn)
-notify_manager = notifications.NotificationManager(conn)
-ad_manager = ads.AdManager(conn)
+# Managers borrow a pooled connection for each call.
+feed = activity.ActivityFeed(db_pool, follow_graph, feed_broker, user_summaries)
+notify_manager = notifications.NotificationManager(db_pool)
+ad_manager = ads.AdManager(db_pool)
 
 
 def get_current_user(_: str = Header(None)) -> int:
@@ -136,26 +230,49 @@ def get_optional_user(_: str = Header(None)) -> int | None:
     return 1
 
 
-def _get_user_sessions_with_moods(user_id: int) -> list[session_models.MeditationSession]:
-    """Return all sessions for the user including mood data."""
-    cur = conn.execute(
-        "SELECT s.duration, s.session_type, s.session_date, s.session_time, s.location, m.mood_before, m.mood_after "
-        "FROM sessions s LEFT JOIN moods m ON s.id = m.session_id WHERE s.user_id = ?",
-        (user_id,),
-    )
-    rows = cur.fetchall()
-    return [
-        session_models.MeditationSession(
-            duration_minutes=r[0],
-            meditation_type=r[1],
-            session_date=date.fromisoformat(r[2]) if isinstance(r[2], str) else r[2],
-            time_of_day=time.fromisoformat(r[3]) if r[3] else time(0, 0),
-            location=r[4] or "",
-            mood_before=r[5],
-            mood_after=r[6],
+async def _get_user_session_frame(
+    conn: Any, user_id: int, start: date | None = None, end: date | None = None
+) -> SessionFrame:
+    """Return the user's sessions in the window, including mood data, as columns."""
+    cur = await conn.execute(
+        *analytics.build_query(
+            "SELECT s.duration, s.session_type, s.session_date, s.session_time, s.location, m.mood_before, m.mood_after "
+            "FROM sessions s LEFT JOIN moods m ON s.id = m.session_id WHERE {where}",
+            user_id,
+            start,
+            end,
+            alias="s",
         )
-        for r in rows
-    ]
+    )
+    return SessionFrame.from_rows(await cur.fetchall())
+
+
+def get_date_range(
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+) -> tuple[date | None, date | None]:
+    """Inclusive ``from``/``to`` window for analytics endpoints."""
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return start, end
+
+
+def _check_bucket(bucket: str) -> None:
+    if bucket not in analytics.BUCKETS:
+        raise HTTPException(status_code=400, detail="bucket must be day, week or month")
+
+
+async def _cached(conn: Any, user_id: int, key: tuple, compute: Any) -> Any:
+    """Return ``await compute()`` from ``analytics_cache`` when still current."""
+    cur = await conn.execute(stats.SELECT_DATA_VERSION, (user_id,))
+    row = await cur.fetchone()
+    # Read the version first so a concurrent write can only make the entry stale.
+    version = row[0] if row else None
+    value = analytics_cache.get(user_id, key, version)
+    if value is MISSING:
+        value = await compute()
+        analytics_cache.put(user_id, key, version, value)
+    return value
 
 
 class SignUp(BaseModel):
@@ -212,16 +329,22 @@ class PrivateChallengeInput(BaseModel):
 
 
 @app.post("/auth/signup")
-def signup_user(data: SignUp):  # Renamed for clarity from just 'signup'
+def signup_user(
+    data: SignUp, conn: Any = Depends(get_db)
+):  # Renamed for clarity from just 'signup'
     user_id = auth.register_user(
-        conn, data.email, data.password, display_name=data.display_name
+        conn,
+        data.email,
+        data.password,
+        display_name=data.display_name,
+        users=user_summaries,
     )
     monitoring.log_event("signup", {"user": user_id})
     return {"user_id": user_id}
 
 
 @app.post("/auth/login")
-def login_user(data: Login):  # Renamed for clarity
+def login_user(data: Login, conn: Any = Depends(get_db)):  # Renamed for clarity
     cur = conn.execute(
         "SELECT id, password_hash FROM users WHERE email = ?", (data.email,)
     )
@@ -236,7 +359,7 @@ def login_user(data: Login):  # Renamed for clarity
 
 
 @app.post("/auth/social-login")
-def social_login(data: SocialLoginInput):
+def social_login(data: SocialLoginInput, conn: Any = Depends(get_db)):
     """Log in or register a user via a social provider."""
     try:
         provider_user_id, email = data.token.split(":", 1)
@@ -252,115 +375,206 @@ def social_login(data: SocialLoginInput):
         user_id = row[0]
     else:
         user_id = auth.register_social_user(
-            conn, data.provider, provider_user_id, email=email
+            conn, data.provider, provider_user_id, email=email, users=user_summaries
         )
 
-    monitoring.log_event(
-        "social_login", {"user": user_id, "provider": data.provider}
-    )
+    monitoring.log_event("social_login", {"user": user_id, "provider": data.provider})
     token_payload = {"user_id": user_id}
     token = jose_jwt.encode(token_payload, SECRET_KEY, algorithm=ALGORITHM)
     return {"access_token": token, "token_type": "bearer"}
 
 
+def _record_session(conn: Any, user_id: int, info: SessionInput) -> int:
+    """Store a session with its feed entry and first-session badge.
+
+    The writes share one unit of work, so the request commits once.
+    """
+    with unit_of_work(conn):
+        session_id = mindful.log_session(
+            conn,
+            user_id,
+            info.duration,
+            info.type,
+            info.date,
+            session_time=info.time,
+            location=info.location,
+            notes=info.notes,
+            mood_before=info.moodBefore,
+            mood_after=info.moodAfter,
+        )
+        # Record the session in the social feed. ActivityFeed.log_session only
+        # stores a text description and does not take the session ID.
+        feed.log_session(user_id, f"{info.type} {info.duration}m")
+        count = stats.get_user_stats(conn, user_id)["session_count"]
+        if count == 1:
+            challenges.award_badge(conn, user_id, "First Session Completed")
+    return session_id
+
+
 @app.post("/sessions", response_model=dict)  # Added response_model
-def create_session(
-    info: SessionInput, current_user_id: int = Depends(get_current_user)
+async def create_session(
+    info: SessionInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
 ):
-    session_id = mindful.log_session(
+    # The write path reuses the synchronous helpers so every side effect of
+    # logging a session lives in one place; ``run_sync`` keeps it off the loop.
+    if write_batcher is not None:
+        future = write_batcher.submit(_record_session, current_user_id, info)
+        session_id = await asyncio.wrap_future(future)
+    else:
+        session_id = await conn.run_sync(_record_session, current_user_id, info)
+    return {"session_id": session_id}
+
+
+@app.post("/sessions/bulk", response_model=dict)
+async def bulk_import_sessions(
+    request: Request,
+    format: str | None = None,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+):
+    """Import historical sessions streamed as NDJSON or CSV.
+
+    The format comes from ``?format=`` or the ``Content-Type`` header. Invalid
+    rows are skipped and reported by line number; no feed items are created.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    if format not in bulk.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    return await bulk.import_stream(
         conn,
-        current_user_id,  # Use current_user_id from token
-        info.duration,
-        info.type,
-        info.date,
-        session_time=info.time,
-        location=info.location,
-        notes=info.notes,
-        mood_before=info.moodBefore,
-        mood_after=info.moodAfter,
-    )
-    # Record the session in the social feed. ActivityFeed.log_session only
-    # stores a text description and does not take the session ID.
-    feed.log_session(current_user_id, f"{info.type} {info.duration}m")
-    cur = conn.execute(
-        "SELECT COUNT(*) FROM sessions WHERE user_id = ?",
-        (current_user_id,),
+        current_user_id,
+        request.stream(),
+        format,
+        dialect=db_pool.dialect,
+        chunk_size=int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "500")),
     )
-    count = cur.fetchone()[0]
-    if count == 1:
-        challenges.award_badge(conn, current_user_id, "First Session Completed")
-    return {"session_id": session_id}
 
 
 @app.get("/dashboard/me", response_model=dict)
-def get_dashboard_data(current_user_id: int = Depends(get_current_user)):
-    cur = conn.execute(
-        "SELECT duration, session_type, session_date, session_time, location, photo_url FROM sessions WHERE user_id = ?",
-        (current_user_id,),
-    )
-    records = cur.fetchall()
-    sess = [
-        session_models.MeditationSession(
-            duration_minutes=r[0],
-            meditation_type=r[1],
-            time_of_day=time.fromisoformat(r[3]) if r[3] else time(0, 0),
-            # Ensure r[2] (session_date) is a date object or string that can be parsed
-            session_date=date.fromisoformat(r[2]) if isinstance(r[2], str) else r[2],
-            location=r[4] or "",
-            photo_url=r[5],
-        )
-        for r in records
-    ]
-    total = dashboard.calculate_total_time(sess)
-    count = dashboard.calculate_session_count(sess)
-    streak = dashboard.calculate_current_streak(sess)
+async def get_dashboard_data(
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+):
+    cur = await conn.execute(stats.SELECT_STATS, (current_user_id,))
+    row = await cur.fetchone()
+    if row is None:
+        user_stats = await conn.run_sync(stats.get_user_stats, current_user_id)
+    else:
+        user_stats = stats.as_dict(row)
+    total = user_stats["total_minutes"]
+    count = user_stats["session_count"]
+    streak = user_stats["current_streak"]
     return {
         "total": total,
         "sessions": count,
         "streak": streak,
     }
 
+
 @app.get("/feed", response_model=list)  # Changed path to /feed, user_id from token
-def get_user_feed(current_user_id: int = Depends(get_current_user)):
-    # This is the implementation from the third provided diff for /feed
-    followed_ids = relationships.get_following(conn, current_user_id)
-    # User should also see their own items in their feed
-    user_ids_for_feed = set(followed_ids)
-    user_ids_for_feed.add(current_user_id)
-
-    if not user_ids_for_feed:
-        return []
-
-    # Build a dynamic placeholder string (?,?,?) for the ``IN`` clause based on
-    # how many user ids we're querying for. SQLite requires ``?`` for each value.
-    placeholders = ",".join("?" for _ in user_ids_for_feed)
-
-    # ``activity_feed`` table stores all social feed items. Ensure the query
-    # matches the schema defined in scripts/init_db.sql and ActivityFeed.
-    query = (
-        "SELECT f.id, f.user_id, u.display_name, f.item_type, f.message, f.timestamp, f.target_user_id, f.related_feed_item_id "
-        "FROM activity_feed f JOIN users u ON f.user_id = u.id "
-        f"WHERE f.user_id IN ({placeholders}) AND (u.is_public = 1 OR f.user_id = ?) "
-        "ORDER BY f.timestamp DESC, f.id DESC LIMIT 20"
-    )
-    params = (*list(user_ids_for_feed), current_user_id)
-    cur = conn.execute(query, params)
-    rows = cur.fetchall()
-    return [
-            {
-                "item_id": r[0],
-                "user_id": r[1],
-                "user_display_name": r[2],
-                "item_type": r[3],
-                "message": r[4],
-                "timestamp": (
-                    r[5].isoformat() if isinstance(r[5], (date, time)) else r[5]
-                ),  # Ensure ISO format
-                "target_user_id": r[6],
-                "related_feed_item_id": r[7],
-            }
-            for r in rows
-        ]
+async def get_user_feed(
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: str | None = None,
+    interactions: bool = False,
+    comments: int = Query(3, ge=0, le=20),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+):
+    """Return a page of the viewer's feed, newest first.
+
+    ``limit`` is capped at ``FEED_MAX_LIMIT``. When more items follow, the
+    ``X-Next-Cursor`` header holds the ``cursor`` for the next page. With
+    ``interactions`` each item also carries its comment and encouragement
+    counts and its newest ``comments`` comments.
+    """
+    limit = min(limit, FEED_MAX_LIMIT)
+    try:
+        # Fetch one extra row to learn whether another page follows.
+        query, params = timeline.page_query(current_user_id, limit + 1, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    # Items were fanned out to the viewer's timeline when written, with
+    # visibility already applied.
+    cur = await conn.execute(query, params)
+    rows = await cur.fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = timeline.encode_cursor(
+            rows[-1][4], rows[-1][0]
+        )
+    interaction_rows: list = []
+    if interactions and rows:
+        cur = await conn.execute(
+            *timeline.interactions_query([r[0] for r in rows], comments)
+        )
+        interaction_rows = await cur.fetchall()
+    # Authors and commenters are read through the summary cache in one batch.
+    users = await _user_summaries(
+        conn, [r[1] for r in rows] + [r[5] for r in interaction_rows]
+    )
+    items = [timeline.feed_item(r, users) for r in rows]
+    if interactions:
+        timeline.attach_interactions(items, interaction_rows, comments, users)
+    return items
+
+
+async def _user_summaries(conn: Any, user_ids: list) -> dict:
+    """Return ``user_summaries.get_many`` for an async connection."""
+    found, missing, generation = user_summaries.lookup(user_ids)
+    if missing:
+        cur = await conn.execute(*summaries_query(missing))
+        found.update(user_summaries.store(await cur.fetchall(), generation))
+    return found
+
+
+@app.get("/feed/stream")
+async def stream_user_feed(current_user_id: int = Depends(get_current_user)):
+    """Stream new feed items to the viewer as Server-Sent Events.
+
+    Each new item is sent as an ``item`` event shaped like a ``/feed`` entry.
+    A client that falls too far behind gets a ``reset`` event and the stream
+    ends; it should reload ``/feed`` and reconnect.
+    """
+    subscription = feed_broker.subscribe(current_user_id)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscription.get(FEED_STREAM_HEARTBEAT)
+                if event is None:
+                    yield ": heartbeat\n\n"
+                elif event is OVERFLOW:
+                    yield encode_event({}, event="reset")
+                    return
+                else:
+                    yield encode_event(event, event="item")
+        finally:
+            feed_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _add_interaction(conn: Any, add: Any, *args: Any, **kwargs: Any) -> int:
+    """Call a feed ``add_*`` method, through the write batcher if enabled.
+
+    Without the batcher the feed joins the request's connection, so the
+    request never holds two pooled connections at once.
+    """
+    if write_batcher is None:
+        with unit_of_work(conn):
+            return add(*args, **kwargs)
+    # The feed borrows the writer's connection while the batch is open.
+    return write_batcher.submit(lambda _conn: add(*args, **kwargs)).result()
 
 
 @app.post("/feed/{feed_item_id}/comment", response_model=FeedInteractionResponse)
@@ -368,6 +582,7 @@ def comment_on_feed_item(
     feed_item_id: int,
     data: CommentInput,
     current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     """Add a comment to a feed item."""
     # Ensure the request body feed_item_id matches the URL parameter
@@ -382,7 +597,9 @@ def comment_on_feed_item(
     if not row:
         raise HTTPException(status_code=404, detail="Feed item not found")
     target_user_id = row[0]
-    interaction_id = feed.add_comment(
+    interaction_id = _add_interaction(
+        conn,
+        feed.add_comment,
         current_user_id,
         target_user_id,
         data.text,
@@ -398,6 +615,7 @@ def encourage_feed_item(
     feed_item_id: int,
     data: EncouragementInput,
     current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     """Send encouragement related to a feed item."""
     if data.feed_item_id != feed_item_id:
@@ -411,7 +629,9 @@ def encourage_feed_item(
     if not row:
         raise HTTPException(status_code=404, detail="Feed item not found")
     target_user_id = row[0]
-    interaction_id = feed.add_encouragement(
+    interaction_id = _add_interaction(
+        conn,
+        feed.add_encouragement,
         current_user_id,
         target_user_id,
         data.text,
@@ -424,11 +644,13 @@ def encourage_feed_item(
 
 @app.post("/follow", response_model=dict)
 def follow_user_action(
-    data: FollowInput, current_user_id: int = Depends(get_current_user)
+    data: FollowInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):  # Renamed
     if current_user_id == data.followed_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
-    relationships.follow_user(conn, current_user_id, data.followed_id)
+    relationships.follow_user(conn, current_user_id, data.followed_id, follow_graph)
     return {
         "status": "ok",
         "message": f"User {current_user_id} now follows {data.followed_id}",
@@ -437,9 +659,11 @@ def follow_user_action(
 
 @app.post("/unfollow", response_model=dict)
 def unfollow_user_action(
-    data: FollowInput, current_user_id: int = Depends(get_current_user)
+    data: FollowInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):  # Renamed
-    relationships.unfollow_user(conn, current_user_id, data.followed_id)
+    relationships.unfollow_user(conn, current_user_id, data.followed_id, follow_graph)
     return {
         "status": "ok",
         "message": f"User {current_user_id} unfollowed {data.followed_id}",
@@ -478,7 +702,7 @@ class JoinChallengeInput(BaseModel):
 
 
 @app.get("/challenges", response_model=list)  # Added response_model
-def list_community_challenges():  # Renamed
+def list_community_challenges(conn: Any = Depends(get_db)):  # Renamed
     cur = conn.execute(
         "SELECT id, name, target_minutes, start_date, end_date FROM community_challenges"
     )
@@ -499,9 +723,20 @@ def list_community_challenges():  # Renamed
     ]
 
 
+@app.get("/community/benchmarks", response_model=CommunityBenchmarksResponse)
+def get_community_benchmarks(
+    conn: Any = Depends(get_db),
+) -> CommunityBenchmarksResponse:
+    """Return the community aggregates written by ``python -m src.community``."""
+    rows = conn.execute(community.SELECT_COMMUNITY_STATS).fetchall()
+    return CommunityBenchmarksResponse(**community.benchmarks_from_rows(rows))
+
+
 @app.post("/challenges/join", response_model=dict)  # Added response_model
 def join_community_challenge(
-    data: JoinChallengeInput, current_user_id: int = Depends(get_current_user)
+    data: JoinChallengeInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):  # Renamed
     mindful.join_challenge(conn, current_user_id, data.challenge_id)
     return {
@@ -511,7 +746,9 @@ def join_community_challenge(
 
 
 @app.get("/moods", response_model=list)  # Changed path, user_id from token
-def get_user_moods(current_user_id: int = Depends(get_current_user)):  # Renamed
+def get_user_moods(
+    current_user_id: int = Depends(get_current_user), conn: Any = Depends(get_db)
+):  # Renamed
     moods = mindful.get_user_moods(conn, current_user_id)
     return [{"before": m[0], "after": m[1]} for m in moods]
 
@@ -521,7 +758,9 @@ class SubscriptionUpdate(BaseModel):
 
 
 @app.get("/subscriptions/me", response_model=dict)  # Changed path for current user
-def get_my_subscription(current_user_id: int = Depends(get_current_user)):  # Renamed
+def get_my_subscription(
+    current_user_id: int = Depends(get_current_user), conn: Any = Depends(get_db)
+):  # Renamed
     tier = subscriptions.get_user_tier(conn, current_user_id)
     return {"tier": tier}
 
@@ -530,7 +769,9 @@ def get_my_subscription(current_user_id: int = Depends(get_current_user)):  # Re
     "/subscriptions/me", response_model=dict
 )  # Changed to PUT, path for current user
 def update_my_subscription(
-    data: SubscriptionUpdate, current_user_id: int = Depends(get_current_user)
+    data: SubscriptionUpdate,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):  # Renamed
     # Assuming start_date is current date or handled by subscribe_user
     subscriptions.subscribe_user(
@@ -541,17 +782,19 @@ def update_my_subscription(
 
 @app.put("/users/me/bio", response_model=dict)  # Path for current user
 def update_my_bio(
-    data: BioUpdate, current_user_id: int = Depends(get_current_user)
+    data: BioUpdate,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):  # Renamed
-    profiles.update_bio(
-        conn, current_user_id, data.bio
-    )  # Assuming profiles.update_bio exists
+    profiles.update_bio(conn, current_user_id, data.bio, user_summaries)
     return {"status": "ok", "message": "Bio updated successfully."}
 
 
 @app.post("/users/me/photo", response_model=dict)  # Path for current user
 async def upload_my_photo(
-    request: Request, current_user_id: int = Depends(get_current_user)
+    request: Request,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):  # Renamed
     content_type = request.headers.get("Content-Type", "")
     if not content_type.startswith("image/"):
@@ -589,28 +832,30 @@ async def upload_my_photo(
         raise HTTPException(status_code=500, detail="Could not save uploaded photo.")
 
     photo_url = f"/uploads/{filename}"
-    profiles.update_photo(
-        conn, current_user_id, photo_url
-    )  # Assuming profiles.update_photo exists
+    profiles.update_photo(conn, current_user_id, photo_url, user_summaries)
     return {"photo_url": photo_url}
 
 
 @app.put("/users/me/profile-visibility", response_model=dict)
 def update_profile_visibility(
-    data: ProfileVisibilityInput, current_user_id: int = Depends(get_current_user)
+    data: ProfileVisibilityInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     """Update whether the authenticated user's profile is public."""
-    profiles.update_visibility(conn, current_user_id, data.is_public)
+    profiles.update_visibility(conn, current_user_id, data.is_public, user_summaries)
     return {"status": "ok"}
 
 
 @app.get("/users/{user_id}/profile", response_model=PublicProfileResponse)
 def get_user_profile(
-    user_id: int, requester_id: int | None = Depends(get_optional_user)
+    user_id: int,
+    requester_id: int | None = Depends(get_optional_user),
+    conn: Any = Depends(get_db),
 ):
     """Return public profile information for ``user_id``."""
     try:
-        profile = profiles.get_profile_with_stats(conn, user_id)
+        profile = profiles.get_profile_with_stats(conn, user_id, user_summaries)
     except ValueError:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -627,8 +872,37 @@ def get_user_profile(
         recent_activity=profile["recent_activity"],
     )
 
+
+@app.get("/users/me/export")
+def export_user_data(
+    format: str = "ndjson",
+    current_user_id: int = Depends(get_current_user),
+):
+    """Stream the user's sessions, badges, reminders and custom types."""
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+    def body() -> Iterator[str]:
+        # Borrow the connection here: the response outlives request dependencies.
+        with db_pool.connection() as conn:
+            yield from export.stream_export(
+                conn, current_user_id, format, dialect=db_pool.dialect
+            )
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="mindful-export.{format}"'
+        },
+    )
+
+
 @app.get("/users/me/custom-meditation-types", response_model=list)
-def list_custom_types(current_user_id: int = Depends(get_current_user)):
+def list_custom_types(
+    current_user_id: int = Depends(get_current_user), conn: Any = Depends(get_db)
+):
     cur = conn.execute(
         "SELECT id, type_name FROM custom_meditation_types WHERE user_id = ?",
         (current_user_id,),
@@ -638,7 +912,9 @@ def list_custom_types(current_user_id: int = Depends(get_current_user)):
 
 @app.post("/users/me/custom-meditation-types", response_model=dict)
 def create_custom_type(
-    data: CustomTypeInput, current_user_id: int = Depends(get_current_user)
+    data: CustomTypeInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     new_id = uuid4().hex
     conn.execute(
@@ -650,11 +926,11 @@ def create_custom_type(
 
 
 @app.put("/users/me/custom-meditation-types/{type_id}", response_model=dict)
-
 def update_custom_type(
     type_id: str,
     data: CustomTypeInput,
     current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     conn.execute(
         "UPDATE custom_meditation_types SET type_name = ? WHERE id = ? AND user_id = ?",
@@ -665,7 +941,11 @@ def update_custom_type(
 
 
 @app.delete("/users/me/custom-meditation-types/{type_id}", response_model=dict)
-def delete_custom_type(type_id: str, current_user_id: int = Depends(get_current_user)):
+def delete_custom_type(
+    type_id: str,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
+):
     conn.execute(
         "DELETE FROM custom_meditation_types WHERE id = ? AND user_id = ?",
         (type_id, current_user_id),
@@ -675,7 +955,9 @@ def delete_custom_type(type_id: str, current_user_id: int = Depends(get_current_
 
 
 @app.get("/users/me/badges", response_model=list)
-def list_badges(current_user_id: int = Depends(get_current_user)):
+def list_badges(
+    current_user_id: int = Depends(get_current_user), conn: Any = Depends(get_db)
+):
     cur = conn.execute(
         "SELECT badge_name FROM badges WHERE user_id = ? ORDER BY awarded_at",
         (current_user_id,),
@@ -684,7 +966,9 @@ def list_badges(current_user_id: int = Depends(get_current_user)):
 
 
 @app.get("/users/me/private-challenges", response_model=list)
-def list_private_challenges(current_user_id: int = Depends(get_current_user)):
+def list_private_challenges(
+    current_user_id: int = Depends(get_current_user), conn: Any = Depends(get_db)
+):
     cur = conn.execute(
         "SELECT id, name FROM challenges WHERE created_by = ? AND is_private = 1",
         (current_user_id,),
@@ -693,9 +977,10 @@ def list_private_challenges(current_user_id: int = Depends(get_current_user)):
 
 
 @app.post("/users/me/private-challenges", response_model=dict)
-
 def create_private_challenge(
-    data: PrivateChallengeInput, current_user_id: int = Depends(get_current_user)
+    data: PrivateChallengeInput,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     if not subscriptions.is_premium(conn, current_user_id):
         raise HTTPException(status_code=403, detail="Premium subscription required")
@@ -709,11 +994,11 @@ def create_private_challenge(
 
 
 @app.put("/users/me/private-challenges/{challenge_id}", response_model=dict)
-
 def update_private_challenge(
     challenge_id: int,
     data: PrivateChallengeInput,
     current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     if not subscriptions.is_premium(conn, current_user_id):
         raise HTTPException(status_code=403, detail="Premium subscription required")
@@ -727,7 +1012,9 @@ def update_private_challenge(
 
 @app.delete("/users/me/private-challenges/{challenge_id}", response_model=dict)
 def delete_private_challenge(
-    challenge_id: int, current_user_id: int = Depends(get_current_user)
+    challenge_id: int,
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     if not subscriptions.is_premium(conn, current_user_id):
         raise HTTPException(status_code=403, detail="Premium subscription required")
@@ -738,7 +1025,12 @@ def delete_private_challenge(
     conn.commit()
     return {"status": "deleted"}
 
-@app.get("/ads/random", response_model=AdResponse, responses={204: {"description": "No ad available"}})
+
+@app.get(
+    "/ads/random",
+    response_model=AdResponse,
+    responses={204: {"description": "No ad available"}},
+)
 def get_random_ad() -> AdResponse | Response:
     """Return a random advertisement for free-tier users."""
     try:
@@ -749,35 +1041,262 @@ def get_random_ad() -> AdResponse | Response:
 
 
 @app.get("/analytics/me/consistency", response_model=ConsistencyDataResponse)
-def analytics_consistency(current_user_id: int = Depends(get_current_user)) -> ConsistencyDataResponse:
-    sessions = _get_user_sessions_with_moods(current_user_id)
-    data = analytics.consistency_over_time(sessions)
-    points = [DateValuePoint(date_str=d.isoformat(), value=v) for d, v in data.items()]
-    return ConsistencyDataResponse(points=points)
+async def analytics_consistency(
+    bucket: str = "day",
+    date_range: tuple = Depends(get_date_range),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> ConsistencyDataResponse:
+    _check_bucket(bucket)
+
+    async def compute() -> ConsistencyDataResponse:
+        cur = await conn.execute(
+            *analytics.build_query(
+                analytics.CONSISTENCY_QUERY, current_user_id, *date_range
+            )
+        )
+        data = analytics.bucket_counts(
+            analytics.consistency_from_rows(await cur.fetchall()), bucket
+        )
+        points = [
+            DateValuePoint(date_str=d.isoformat(), value=v) for d, v in data.items()
+        ]
+        return ConsistencyDataResponse(points=points)
+
+    return await _cached(
+        conn, current_user_id, ("consistency", bucket, *date_range), compute
+    )
 
 
 @app.get("/analytics/me/mood-correlation", response_model=MoodCorrelationResponse)
-def analytics_mood_correlation(current_user_id: int = Depends(get_current_user)) -> MoodCorrelationResponse:
-    sessions = _get_user_sessions_with_moods(current_user_id)
-    pairs = analytics.mood_correlation_points(sessions)
-    points = [MoodCorrelationPoint(mood_before=p[0], mood_after=p[1]) for p in pairs]
-    return MoodCorrelationResponse(points=points)
+async def analytics_mood_correlation(
+    date_range: tuple = Depends(get_date_range),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> MoodCorrelationResponse:
+    async def compute() -> MoodCorrelationResponse:
+        session_frame = await _get_user_session_frame(
+            conn, current_user_id, *date_range
+        )
+        pairs = frame.mood_correlation_points(session_frame)
+        points = [
+            MoodCorrelationPoint(mood_before=p[0], mood_after=p[1]) for p in pairs
+        ]
+        return MoodCorrelationResponse(points=points)
+
+    return await _cached(
+        conn, current_user_id, ("mood-correlation", *date_range), compute
+    )
+
+
+@app.get("/analytics/me/mood-stats", response_model=MoodStatsResponse)
+async def analytics_mood_stats(
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> MoodStatsResponse:
+    """Return mood statistics over the user's whole history.
+
+    Reads the running totals in ``mood_stats``, so the cost does not grow
+    with the number of sessions.
+    """
+    cur = await conn.execute(mood_stats.SELECT_MOOD_STATS, (current_user_id,))
+    return MoodStatsResponse(**mood_stats.summarize(await cur.fetchall()))
+
+
+@app.get("/analytics/me/durations", response_model=DurationStatsResponse)
+async def analytics_durations(
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> DurationStatsResponse:
+    """Return median and 90th percentile session lengths (premium)."""
+    cur = await conn.execute(subscriptions.SELECT_TIER, (current_user_id,))
+    row = await cur.fetchone()
+    if (row[0] if row else "free") != "premium":
+        raise HTTPException(status_code=403, detail="Premium subscription required")
+    cur = await conn.execute(sketches.SELECT_BUILT, (current_user_id,))
+    if await cur.fetchone():
+        cur = await conn.execute(sketches.SELECT_SKETCHES, (current_user_id,))
+        by_type = sketches.load_sketches(await cur.fetchall())
+    else:
+        # History logged before sketches existed, built on the next write.
+        cur = await conn.execute(sketches.SELECT_DURATIONS, (current_user_id,))
+        by_type = sketches.sketches_from_durations(await cur.fetchall())
+    return DurationStatsResponse(**sketches.summarize(by_type))
 
 
 @app.get("/analytics/me/time-of-day", response_model=TimeOfDayResponse)
-def analytics_time_of_day(current_user_id: int = Depends(get_current_user)) -> TimeOfDayResponse:
-    sessions = _get_user_sessions_with_moods(current_user_id)
-    data = analytics.time_of_day_distribution(sessions)
-    points = [HourValuePoint(hour=h, value=v) for h, v in data.items()]
-    return TimeOfDayResponse(points=points)
+async def analytics_time_of_day(
+    date_range: tuple = Depends(get_date_range),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> TimeOfDayResponse:
+    async def compute() -> TimeOfDayResponse:
+        cur = await conn.execute(
+            *analytics.build_query(
+                analytics.TIME_OF_DAY_QUERY, current_user_id, *date_range
+            )
+        )
+        data = analytics.counts_from_rows(await cur.fetchall())
+        points = [HourValuePoint(hour=h, value=v) for h, v in data.items()]
+        return TimeOfDayResponse(points=points)
+
+    return await _cached(conn, current_user_id, ("time-of-day", *date_range), compute)
 
 
 @app.get("/analytics/me/location-frequency", response_model=LocationFrequencyResponse)
-def analytics_location_frequency(current_user_id: int = Depends(get_current_user)) -> LocationFrequencyResponse:
-    sessions = _get_user_sessions_with_moods(current_user_id)
-    data = analytics.location_frequency(sessions)
-    points = [StringValuePoint(name=k, value=v) for k, v in data.items()]
-    return LocationFrequencyResponse(points=points)
+async def analytics_location_frequency(
+    date_range: tuple = Depends(get_date_range),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> LocationFrequencyResponse:
+    async def compute() -> LocationFrequencyResponse:
+        cur = await conn.execute(
+            *analytics.build_query(
+                analytics.LOCATION_FREQUENCY_QUERY, current_user_id, *date_range
+            )
+        )
+        data = analytics.counts_from_rows(await cur.fetchall())
+        points = [StringValuePoint(name=k, value=v) for k, v in data.items()]
+        return LocationFrequencyResponse(points=points)
+
+    return await _cached(
+        conn, current_user_id, ("location-frequency", *date_range), compute
+    )
+
+
+@app.get(
+    "/analytics/me/summary",
+    response_model=AnalyticsSummaryResponse,
+    response_model_exclude_none=True,
+)
+async def analytics_summary(
+    fields: str | None = None,
+    bucket: str = "day",
+    date_range: tuple = Depends(get_date_range),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> AnalyticsSummaryResponse:
+    """Return several analytics charts from one query.
+
+    ``fields`` is a comma-separated subset of ``consistency``,
+    ``mood_correlation``, ``time_of_day`` and ``location_frequency``;
+    all of them are returned by default. ``from``, ``to`` and ``bucket``
+    work as on the individual endpoints.
+    """
+    _check_bucket(bucket)
+    selected = (
+        [f.strip() for f in fields.split(",") if f.strip()]
+        if fields
+        else list(analytics.SUMMARY_FIELDS)
+    )
+    unknown = set(selected) - set(analytics.SUMMARY_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+
+    async def compute() -> AnalyticsSummaryResponse:
+        if "mood_correlation" in selected:
+            query = analytics.build_query(
+                "SELECT s.session_date, s.session_time, s.location, m.mood_before, m.mood_after "
+                "FROM sessions s LEFT JOIN moods m ON s.id = m.session_id WHERE {where}",
+                current_user_id,
+                *date_range,
+                alias="s",
+            )
+        else:
+            # Mood pairs are the only reason to join moods.
+            query = analytics.build_query(
+                "SELECT session_date, session_time, location, NULL, NULL "
+                "FROM sessions WHERE {where}",
+                current_user_id,
+                *date_range,
+            )
+        cur = await conn.execute(*query)
+        data = analytics.summarize_rows(await cur.fetchall(), selected)
+        if "consistency" in data:
+            data["consistency"] = analytics.bucket_counts(data["consistency"], bucket)
+
+        summary = AnalyticsSummaryResponse()
+        if "consistency" in data:
+            summary.consistency = [
+                DateValuePoint(date_str=d.isoformat(), value=v)
+                for d, v in data["consistency"].items()
+            ]
+        if "mood_correlation" in data:
+            summary.mood_correlation = [
+                MoodCorrelationPoint(mood_before=b, mood_after=a)
+                for b, a in data["mood_correlation"]
+            ]
+        if "time_of_day" in data:
+            summary.time_of_day = [
+                HourValuePoint(hour=h, value=v) for h, v in data["time_of_day"].items()
+            ]
+        if "location_frequency" in data:
+            summary.location_frequency = [
+                StringValuePoint(name=k, value=v)
+                for k, v in data["location_frequency"].items()
+            ]
+        return summary
+
+    key = ("summary", tuple(sorted(set(selected))), bucket, *date_range)
+    return await _cached(conn, current_user_id, key, compute)
+
+
+@app.get("/analytics/me/charts/{chart}")
+async def analytics_chart(
+    chart: str,
+    request: Request,
+    format: str = "png",
+    bucket: str = "day",
+    date_range: tuple = Depends(get_date_range),
+    current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_async_db),
+) -> Response:
+    """Return an analytics chart as a PNG or SVG image.
+
+    ``chart`` names one of the analytics endpoints, whose ``from``, ``to``
+    and ``bucket`` parameters it accepts.
+    """
+    if chart not in charts.CHARTS:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    if format not in charts.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be png or svg")
+    if chart == "consistency":
+        data = await analytics_consistency(bucket, date_range, current_user_id, conn)
+        points = [(p.date_str, p.value) for p in data.points]
+    elif chart == "mood-correlation":
+        data = await analytics_mood_correlation(date_range, current_user_id, conn)
+        points = [(p.mood_before, p.mood_after) for p in data.points]
+    elif chart == "time-of-day":
+        data = await analytics_time_of_day(date_range, current_user_id, conn)
+        points = [(p.hour, p.value) for p in data.points]
+    else:
+        data = await analytics_location_frequency(date_range, current_user_id, conn)
+        points = [(p.name, p.value) for p in data.points]
+
+    etag = f'"{charts.chart_key(chart, points, format)}"'
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    _, image = chart_renderer.render(chart, points, format)
+    return Response(
+        content=await asyncio.wrap_future(image),
+        media_type=charts.FORMATS[format],
+        headers={"ETag": etag},
+    )
+
+
+@app.get("/metrics/cache", response_model=dict)
+def cache_metrics() -> dict:
+    """Hit rates and sizes of the in-process caches, and live stream counters."""
+    return {
+        "analytics": analytics_cache.stats(),
+        "charts": chart_renderer.stats(),
+        "follow_graph": follow_graph.stats(),
+        "users": user_summaries.stats(),
+        "feed_stream": feed_broker.stats(),
+    }
 
 
 @app.post("/sessions/{session_id}/photo", response_model=dict)
@@ -785,6 +1304,7 @@ async def upload_session_photo(
     session_id: int,
     request: Request,
     current_user_id: int = Depends(get_current_user),
+    conn: Any = Depends(get_db),
 ):
     content_type = request.headers.get("Content-Type", "")
     if not content_type.startswith("image/"):
@@ -800,7 +1320,9 @@ async def upload_session_photo(
     if not row:
         raise HTTPException(status_code=404, detail="Session not found")
     if row[0] != current_user_id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this session")
+        raise HTTPException(
+            status_code=403, detail="Not authorized to modify this session"
+        )
 
     file_data = await request.body()
     if not file_data:
@@ -824,11 +1346,12 @@ async def upload_session_photo(
         raise HTTPException(status_code=500, detail="Could not save uploaded photo.")
 
     photo_url = f"/uploads/{filename}"
-    conn.execute(
-        "UPDATE sessions SET photo_url = ? WHERE id = ?",
-        (photo_url, session_id),
-    )
-    conn.commit()
+    with unit_of_work(conn):
+        conn.execute(
+            "UPDATE sessions SET photo_url = ? WHERE id = ?",
+            (photo_url, session_id),
+        )
+        stats.bump_data_version(conn, current_user_id)
     return {"photo_url": photo_url}
 
 
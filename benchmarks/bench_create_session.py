@@ -0,0 +1,68 @@
+"""Compare write latency of ``POST /sessions`` with and without a unit of work.
+
+Each iteration performs the writes made by ``backend.main._record_session``:
+the session and mood rows, the feed entry and the first-session badge check.
+Without a unit of work every helper commits on its own; with one, the whole
+request commits once.
+
+Usage: ``python benchmarks/bench_create_session.py [iterations]``
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import challenges, mindful  # noqa: E402
+from src.activity import ActivityFeed  # noqa: E402
+from src.pool import connect_sqlite  # noqa: E402
+from src.transaction import unit_of_work  # noqa: E402
+
+
+def record_session(conn, feed, grouped: bool) -> None:
+    with unit_of_work(conn) if grouped else nullcontext():
+        mindful.log_session(
+            conn, 1, 10, "Zen", "2023-01-01", mood_before=3, mood_after=7
+        )
+        feed.log_session(1, "Zen 10m")
+        count = conn.execute("SELECT COUNT(*) FROM sessions WHERE user_id = 1")
+        if count.fetchone()[0] == 1:
+            challenges.award_badge(conn, 1, "First Session Completed")
+
+
+def run(iterations: int, grouped: bool, synchronous: str) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect_sqlite(os.path.join(tmp, "bench.db"))
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        mindful.init_db(conn)
+        conn.execute("INSERT INTO users (email) VALUES ('bench@example.com')")
+        conn.commit()
+        feed = ActivityFeed(conn)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            record_session(conn, feed, grouped)
+        elapsed = time.perf_counter() - start
+        conn.close()
+    return elapsed / iterations * 1e6
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f"create_session write latency over {iterations} requests (us/request)")
+    for synchronous in ("NORMAL", "FULL"):
+        separate = run(iterations, False, synchronous)
+        grouped = run(iterations, True, synchronous)
+        print(
+            f"  synchronous={synchronous:<6} per-helper commits: {separate:8.1f}"
+            f"  unit of work: {grouped:8.1f}  speedup: {separate / grouped:4.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
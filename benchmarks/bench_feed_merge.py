@@ -0,0 +1,66 @@
+"""Compare a full sort with the lazy heap merge for one page of ``build_feed``.
+
+Every followed user has a chronological list of sessions, as the sessions
+query returns them. The sort path builds and sorts an entry for every
+visible session; the merge path asks ``build_feed`` for a 20-entry page,
+which merges the users' lists with a heap and stops after the page.
+
+Usage: ``python benchmarks/bench_feed_merge.py [repeats] [sessions per user]``
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time as timer
+from datetime import date, time, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.feed import build_feed  # noqa: E402
+from src.sessions import MeditationSession  # noqa: E402
+
+PAGE = 20
+
+
+def make_sessions(users: int, per_user: int) -> dict:
+    rng = random.Random(0)
+    start = date(2020, 1, 1)
+    sessions = {}
+    for user_id in range(1, users + 1):
+        stamps = sorted(
+            (start + timedelta(days=rng.randint(0, 1000)), time(rng.randint(5, 22)))
+            for _ in range(per_user)
+        )
+        sessions[user_id] = [
+            MeditationSession(rng.randint(5, 60), "Zen", at, day, "Home")
+            for day, at in stamps
+        ]
+    return sessions
+
+
+def best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = timer.perf_counter()
+        fn()
+        best = min(best, timer.perf_counter() - start)
+    return best * 1e3
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"{'users':>6} {'sessions':>9} {'sort ms':>8} {'merge ms':>9} {'speedup':>8}")
+    for users in (10, 100, 500, 2_000):
+        sessions = make_sessions(users, per_user)
+        privacy = dict.fromkeys(sessions, True)
+        slow = best_of(lambda: build_feed(0, sessions, privacy)[:PAGE], repeats)
+        fast = best_of(lambda: build_feed(0, sessions, privacy, limit=PAGE), repeats)
+        total = users * per_user
+        print(f"{users:>6} {total:>9} {slow:>8.2f} {fast:>9.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the dataclass and ``SessionFrame`` paths for dashboard and analytics.
+
+Each run starts from the raw rows a cursor returns and computes the three
+dashboard numbers and the four analytics aggregations. The dataclass path
+builds one ``MeditationSession`` per row the way the API used to; the frame
+path builds a ``SessionFrame`` and uses the vectorized functions.
+
+Usage: ``python benchmarks/bench_session_frame.py [repeats]``
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time as timer
+from datetime import date, time, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import analytics, dashboard, frame  # noqa: E402
+from src.frame import SessionFrame  # noqa: E402
+from src.sessions import MeditationSession  # noqa: E402
+
+
+def make_rows(count: int) -> list:
+    rng = random.Random(0)
+    start = date(2015, 1, 1)
+    return [
+        (
+            rng.randint(5, 60),
+            rng.choice(["Zen", "Guided", "Body Scan", "Mantra"]),
+            (start + timedelta(days=i * 3650 // count)).isoformat(),
+            f"{rng.randint(5, 22):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            rng.choice(["Home", "Park", "Office", None]),
+            rng.choice([None, rng.randint(1, 10)]),
+            rng.randint(1, 10),
+        )
+        for i in range(count)
+    ]
+
+
+def dataclass_path(rows: list) -> None:
+    sessions = [
+        MeditationSession(
+            duration_minutes=r[0],
+            meditation_type=r[1],
+            session_date=date.fromisoformat(r[2]),
+            time_of_day=time.fromisoformat(r[3]) if r[3] else time(0, 0),
+            location=r[4] or "",
+            mood_before=r[5],
+            mood_after=r[6],
+        )
+        for r in rows
+    ]
+    dashboard.calculate_total_time(sessions)
+    dashboard.calculate_session_count(sessions)
+    dashboard.calculate_current_streak(sessions)
+    analytics.consistency_over_time(sessions)
+    analytics.mood_correlation_points(sessions)
+    analytics.time_of_day_distribution(sessions)
+    analytics.location_frequency(sessions)
+
+
+def frame_path(rows: list) -> None:
+    f = SessionFrame.from_rows(rows)
+    frame.calculate_total_time(f)
+    frame.calculate_session_count(f)
+    frame.calculate_current_streak(f)
+    frame.consistency_over_time(f)
+    frame.mood_correlation_points(f)
+    frame.time_of_day_distribution(f)
+    frame.location_frequency(f)
+
+
+def best_of(fn, rows: list, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = timer.perf_counter()
+        fn(rows)
+        best = min(best, timer.perf_counter() - start)
+    return best * 1e3
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'rows':>8} {'dataclass ms':>13} {'frame ms':>9} {'speedup':>8}")
+    for count in (1_000, 10_000, 100_000):
+        rows = make_rows(count)
+        slow = best_of(dataclass_path, rows, repeats)
+        fast = best_of(frame_path, rows, repeats)
+        print(f"{count:>8} {slow:>13.2f} {fast:>9.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
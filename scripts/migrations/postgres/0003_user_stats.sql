@@ -0,0 +1,14 @@
+-- Per-user session aggregates maintained by mindful.log_session so the
+-- dashboard and profile read one row instead of scanning every session.
+-- Rows are created lazily on first use, and `python -m src.stats`
+-- backfills or repairs them in bulk.
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY,
+    total_minutes INTEGER NOT NULL DEFAULT 0,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    first_session_date DATE,
+    last_session_date DATE,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
@@ -0,0 +1,28 @@
+-- Running mood moments per user and meditation type, updated by
+-- mindful.log_session so /analytics/me/mood-stats reads a handful of rows
+-- however long the history is. Only sessions with both moods count.
+-- m2_* are sums of squared deviations from the mean and comoment the sum of
+-- products of the before/after deviations (Welford's algorithm).
+CREATE TABLE IF NOT EXISTS mood_stats (
+    user_id INTEGER NOT NULL,
+    session_type TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mean_before DOUBLE PRECISION NOT NULL,
+    mean_after DOUBLE PRECISION NOT NULL,
+    m2_before DOUBLE PRECISION NOT NULL,
+    m2_after DOUBLE PRECISION NOT NULL,
+    comoment DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (user_id, session_type),
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
+
+INSERT INTO mood_stats (user_id, session_type, n, mean_before, mean_after,
+                        m2_before, m2_after, comoment)
+SELECT s.user_id, s.session_type, COUNT(*),
+       AVG(m.mood_before), AVG(m.mood_after),
+       SUM(m.mood_before * m.mood_before) - SUM(m.mood_before) * AVG(m.mood_before),
+       SUM(m.mood_after * m.mood_after) - SUM(m.mood_after) * AVG(m.mood_after),
+       SUM(m.mood_before * m.mood_after) - SUM(m.mood_before) * AVG(m.mood_after)
+FROM moods m JOIN sessions s ON s.id = m.session_id
+WHERE m.mood_before IS NOT NULL AND m.mood_after IS NOT NULL
+GROUP BY s.user_id, s.session_type;
@@ -0,0 +1,29 @@
+-- Materialized per-viewer feed: one row for every activity_feed item a user
+-- may see. Items are fanned out to the author and, for public authors, to
+-- their followers when written (src/timeline.py), and rows are added or
+-- removed when someone follows, unfollows or changes profile visibility.
+-- /feed reads a viewer's rows newest first with one index range scan.
+CREATE TABLE IF NOT EXISTS feed_timelines (
+    viewer_id INTEGER NOT NULL,
+    feed_item_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    timestamp TIMESTAMP,
+    PRIMARY KEY (viewer_id, feed_item_id),
+    FOREIGN KEY(viewer_id) REFERENCES users(id),
+    FOREIGN KEY(feed_item_id) REFERENCES activity_feed(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_feed_timelines_viewer_time ON feed_timelines(viewer_id, timestamp, feed_item_id);
+
+-- Unfollows and visibility changes remove one author's rows.
+CREATE INDEX IF NOT EXISTS idx_feed_timelines_author ON feed_timelines(author_id, viewer_id);
+
+INSERT INTO feed_timelines (viewer_id, feed_item_id, author_id, timestamp)
+SELECT f.user_id, f.id, f.user_id, f.timestamp FROM activity_feed f;
+
+INSERT INTO feed_timelines (viewer_id, feed_item_id, author_id, timestamp)
+SELECT fo.follower_id, f.id, f.user_id, f.timestamp
+FROM activity_feed f
+JOIN users u ON u.id = f.user_id
+JOIN follows fo ON fo.followed_id = f.user_id
+WHERE u.is_public AND fo.follower_id <> f.user_id;
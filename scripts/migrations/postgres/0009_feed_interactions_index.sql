@@ -0,0 +1,4 @@
+-- /feed?interactions=true loads the comments and encouragements of a page of
+-- items with one query that filters on related_feed_item_id, groups by type
+-- and orders each group newest first, all from this index.
+CREATE INDEX IF NOT EXISTS idx_activity_feed_related ON activity_feed(related_feed_item_id, item_type, timestamp, id);
@@ -0,0 +1,27 @@
+-- Secondary indexes for the per-user lookups made by the API.
+-- Each index leads with the column the queries filter on so a request only
+-- touches the requesting user's rows instead of scanning the whole table.
+
+-- Dashboard, analytics and profile stats filter sessions by user and the
+-- profile's recent activity orders them by date.
+CREATE INDEX IF NOT EXISTS idx_sessions_user_date ON sessions(user_id, session_date);
+
+-- Analytics joins moods onto sessions by session id.
+CREATE INDEX IF NOT EXISTS idx_moods_session ON moods(session_id);
+
+-- The feed selects items for a set of users, newest first.
+CREATE INDEX IF NOT EXISTS idx_activity_feed_user_time ON activity_feed(user_id, timestamp, id);
+
+-- Badges are listed per user in award order.
+CREATE INDEX IF NOT EXISTS idx_badges_user_awarded ON badges(user_id, awarded_at);
+
+-- Private challenges are listed per creator.
+CREATE INDEX IF NOT EXISTS idx_challenges_creator_private ON challenges(created_by, is_private);
+
+CREATE INDEX IF NOT EXISTS idx_user_notifications_user ON user_notifications(user_id);
+
+CREATE INDEX IF NOT EXISTS idx_custom_types_user ON custom_meditation_types(user_id);
+
+-- The follows primary key covers lookups by follower; followers of a user
+-- need the reverse direction.
+CREATE INDEX IF NOT EXISTS idx_follows_followed ON follows(followed_id, follower_id);
@@ -0,0 +1,3 @@
+-- Counter bumped whenever a user's session data changes. Cached analytics
+-- results are keyed by it, so any write invalidates them in every worker.
+ALTER TABLE user_stats ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0;
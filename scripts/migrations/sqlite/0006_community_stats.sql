@@ -0,0 +1,16 @@
+-- Community-wide session aggregates written by the batch job in
+-- src/community.py (`python -m src.community`) and served by
+-- /community/benchmarks. Each run replaces the whole table in one
+-- transaction. dimension is 'type', 'hour' or 'weekday' (0 = Monday) and
+-- bucket the meditation type, hour or weekday as text.
+CREATE TABLE IF NOT EXISTS community_stats (
+    dimension TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    session_count INTEGER NOT NULL,
+    total_minutes INTEGER NOT NULL,
+    user_count INTEGER NOT NULL,
+    mood_sessions INTEGER NOT NULL,
+    improvement_sum INTEGER NOT NULL,
+    computed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (dimension, bucket)
+);
@@ -0,0 +1,15 @@
+-- Serialized duration quantile sketches (src/sketches.py) per user and
+-- meditation type, updated by mindful.log_session and read by
+-- /analytics/me/durations. Run `python -m src.sketches` to build them all
+-- up front.
+CREATE TABLE IF NOT EXISTS duration_sketches (
+    user_id INTEGER NOT NULL,
+    session_type TEXT NOT NULL,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (user_id, session_type),
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
+
+-- Community duration percentiles, filled in by the community batch job.
+ALTER TABLE community_stats ADD COLUMN median_minutes REAL;
+ALTER TABLE community_stats ADD COLUMN p90_minutes REAL;
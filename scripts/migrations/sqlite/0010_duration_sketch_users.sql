@@ -0,0 +1,7 @@
+-- Users whose duration_sketches rows were built from their whole history.
+-- Starts empty, so each user's next logged session rebuilds their sketches,
+-- including any rows written incrementally before this table existed.
+CREATE TABLE IF NOT EXISTS duration_sketch_users (
+    user_id INTEGER PRIMARY KEY,
+    FOREIGN KEY(user_id) REFERENCES users(id)
+);
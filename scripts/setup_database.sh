@@ -1,9 +1,10 @@
 #!/bin/sh
-# Simple setup script to create the SQLite database using init_db.sql
+# Create or upgrade the SQLite database by applying pending migrations
+# (scripts/init_db.sql followed by scripts/migrations/sqlite).
 
 DB_FILE=${DB_FILE:-mindful.db}
 SCRIPT_DIR="$(dirname "$0")"
 
-sqlite3 "$DB_FILE" < "$SCRIPT_DIR/init_db.sql"
+PYTHONPATH="$SCRIPT_DIR/..${PYTHONPATH:+:$PYTHONPATH}" python -m src.migrations "$DB_FILE"
 
 echo "Database initialized: $DB_FILE"
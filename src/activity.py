@@ -2,8 +2,14 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Set, Optional
-import sqlite3
+from typing import Any, List, Optional
+
+from . import relationships, timeline
+from .broker import FeedBroker
+from .follow_graph import FollowGraph
+from .pool import borrow
+from .transaction import after_commit, commit
+from .user_cache import UserSummaryCache, load_summaries
 
 
 @dataclass
@@ -18,37 +24,84 @@ class FeedItem:
     target_user_id: Optional[int] = None
     related_feed_item_id: Optional[int] = None
 
+    @property
+    def cursor(self) -> str:
+        """Cursor for the page of the feed that follows this item."""
+        return timeline.encode_cursor(self.timestamp, self.item_id)
+
 
 class ActivityFeed:
-    """Database-backed activity feed for social interactions."""
+    """Database-backed activity feed for social interactions.
+
+    Every item written is fanned out to the viewers' timelines in the same
+    transaction (see :mod:`src.timeline`).
+
+    ``conn`` may be a single connection or a :class:`~src.pool.ConnectionPool`,
+    in which case a connection is borrowed for each call.
 
-    def __init__(self, conn: sqlite3.Connection) -> None:
+    :meth:`get_feed` shows the users a viewer follows, read through
+    ``graph`` when given and from ``follows`` otherwise.
+    With a ``broker``, new items are published to the viewers who are
+    streaming their feed once the write commits, with author names read
+    through ``users`` when given.
+    """
+
+    def __init__(
+        self,
+        conn: Any,
+        graph: Optional[FollowGraph] = None,
+        broker: Optional[FeedBroker] = None,
+        users: Optional[UserSummaryCache] = None,
+    ) -> None:
         self._conn = conn
-        self._friends: Dict[int, Set[int]] = {}
+        self._graph = graph
+        self._broker = broker
+        self._users = users
         self._has_related_column = self._detect_related_column()
 
     def _detect_related_column(self) -> bool:
         """Return ``True`` if ``related_feed_item_id`` exists on ``activity_feed``."""
-        try:
-            self._conn.execute(
-                "SELECT related_feed_item_id FROM activity_feed LIMIT 1"
-            )
-            return True
-        except Exception:
-            return False
+        with borrow(self._conn) as conn:
+            try:
+                conn.execute("SELECT related_feed_item_id FROM activity_feed LIMIT 1")
+                return True
+            except Exception:
+                conn.rollback()
+                return False
 
-    def add_friend(self, user_id: int, friend_id: int) -> None:
-        """Establish a friendship so ``user_id`` sees ``friend_id`` in their feed."""
-        self._friends.setdefault(user_id, set()).add(friend_id)
+    def _publish(self, conn: Any, item_id: int) -> None:
+        if self._broker is None:
+            return
+        listening = self._broker.listening()
+        if not listening:
+            return
+        viewers = [
+            r[0]
+            for r in conn.execute(timeline.SELECT_VIEWERS, (item_id,))
+            if r[0] in listening
+        ]
+        if viewers:
+            row = conn.execute(timeline.SELECT_ITEM, (item_id,)).fetchone()
+            if self._users is not None:
+                users = self._users.get_many(conn, [row[1]])
+            else:
+                users = load_summaries(conn, [row[1]])
+            item = timeline.feed_item(row, users)
+            broker = self._broker
+            after_commit(conn, lambda: broker.publish(viewers, item))
 
     def log_session(self, user_id: int, description: str) -> int:
         """Add a meditation session entry."""
-        cur = self._conn.execute(
-            "INSERT INTO activity_feed (user_id, item_type, message, timestamp) VALUES (?, ?, ?, ?)",
-            (user_id, "session", description, datetime.utcnow()),
-        )
-        self._conn.commit()
-        return cur.lastrowid
+        with borrow(self._conn) as conn:
+            cur = conn.execute(
+                "INSERT INTO activity_feed (user_id, item_type, message, timestamp) VALUES (?, ?, ?, ?) RETURNING id",
+                (user_id, "session", description, datetime.utcnow()),
+            )
+            item_id = cur.fetchone()[0]
+            timeline.fan_out(conn, item_id)
+            commit(conn)
+            self._publish(conn, item_id)
+            return item_id
 
     def add_comment(
         self,
@@ -59,12 +112,23 @@ class ActivityFeed:
         related_feed_item_id: int | None = None,
     ) -> int:
         """Post a comment directed at ``target_user_id``."""
-        cur = self._conn.execute(
-            "INSERT INTO activity_feed (user_id, item_type, message, timestamp, target_user_id, related_feed_item_id) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_id, "comment", text, datetime.utcnow(), target_user_id, related_feed_item_id),
-        )
-        self._conn.commit()
-        return cur.lastrowid
+        with borrow(self._conn) as conn:
+            cur = conn.execute(
+                "INSERT INTO activity_feed (user_id, item_type, message, timestamp, target_user_id, related_feed_item_id) VALUES (?, ?, ?, ?, ?, ?) RETURNING id",
+                (
+                    user_id,
+                    "comment",
+                    text,
+                    datetime.utcnow(),
+                    target_user_id,
+                    related_feed_item_id,
+                ),
+            )
+            item_id = cur.fetchone()[0]
+            timeline.fan_out(conn, item_id)
+            commit(conn)
+            self._publish(conn, item_id)
+            return item_id
 
     def add_encouragement(
         self,
@@ -75,35 +139,54 @@ class ActivityFeed:
         related_feed_item_id: int | None = None,
     ) -> int:
         """Send encouragement to ``target_user_id``."""
-        cur = self._conn.execute(
-            "INSERT INTO activity_feed (user_id, item_type, message, timestamp, target_user_id, related_feed_item_id) VALUES (?, ?, ?, ?, ?, ?)",
-            (
-                user_id,
-                "encouragement",
-                text,
-                datetime.utcnow(),
-                target_user_id,
-                related_feed_item_id,
-            ),
-        )
-        self._conn.commit()
-        return cur.lastrowid
-
-    def get_feed(self, user_id: int, limit: int = 10) -> List[FeedItem]:
-        """Return recent feed items from the user's friends."""
-        friends = self._friends.get(user_id, set())
-        if not friends:
-            return []
-        placeholders = ",".join("?" for _ in friends)
-        columns = "id, user_id, item_type, message, timestamp, target_user_id"
-        if self._has_related_column:
-            columns += ", related_feed_item_id"
-        query = (
-            f"SELECT {columns} FROM activity_feed WHERE user_id IN ({placeholders}) "
-            f"ORDER BY timestamp DESC, id DESC LIMIT ?"
-        )
-        cur = self._conn.execute(query, (*friends, limit))
-        rows = cur.fetchall()
+        with borrow(self._conn) as conn:
+            cur = conn.execute(
+                "INSERT INTO activity_feed (user_id, item_type, message, timestamp, target_user_id, related_feed_item_id) VALUES (?, ?, ?, ?, ?, ?) RETURNING id",
+                (
+                    user_id,
+                    "encouragement",
+                    text,
+                    datetime.utcnow(),
+                    target_user_id,
+                    related_feed_item_id,
+                ),
+            )
+            item_id = cur.fetchone()[0]
+            timeline.fan_out(conn, item_id)
+            commit(conn)
+            self._publish(conn, item_id)
+            return item_id
+
+    def get_feed(
+        self, user_id: int, limit: int = 10, *, cursor: Optional[str] = None
+    ) -> List[FeedItem]:
+        """Return recent feed items from the user's friends.
+
+        Pass the last item's :attr:`FeedItem.cursor` as ``cursor`` to get the
+        items that follow it. Raises ``ValueError`` for an invalid cursor.
+        """
+        seek: tuple = ()
+        if cursor is not None:
+            seek = timeline.decode_cursor(cursor)
+        with borrow(self._conn) as conn:
+            if self._graph is not None:
+                friends = list(self._graph.following(conn, user_id))
+            else:
+                friends = relationships.get_following(conn, user_id)
+            if not friends:
+                return []
+            placeholders = ",".join("?" for _ in friends)
+            columns = "id, user_id, item_type, message, timestamp, target_user_id"
+            if self._has_related_column:
+                columns += ", related_feed_item_id"
+            where = f"user_id IN ({placeholders})"
+            if seek:
+                where += " AND (timestamp, id) < (?, ?)"
+            query = (
+                f"SELECT {columns} FROM activity_feed WHERE {where} "
+                f"ORDER BY timestamp DESC, id DESC LIMIT ?"
+            )
+            rows = conn.execute(query, (*friends, *seek, limit)).fetchall()
         items: List[FeedItem] = []
         for r in rows:
             timestamp = datetime.fromisoformat(r[4]) if isinstance(r[4], str) else r[4]
@@ -4,6 +4,9 @@ from dataclasses import dataclass
 from typing import Any, List
 import random
 
+from .pool import borrow
+from .transaction import commit
+
 
 @dataclass
 class Ad:
@@ -14,27 +17,31 @@ class Ad:
 
 
 class AdManager:
-    """Database-backed ad rotation for the free tier."""
+    """Database-backed ad rotation for the free tier.
+
+    ``conn`` may be a connection or a :class:`~src.pool.ConnectionPool`.
+    """
 
     def __init__(self, conn: Any) -> None:
         self._conn = conn
 
     def add_ad(self, text: str, *, is_active: bool = True) -> int:
         """Insert an ad into the ``advertisements`` table and return its ID."""
-        cur = self._conn.execute(
-            "INSERT INTO advertisements (text, is_active) VALUES (?, ?) RETURNING ad_id",
-            (text, int(is_active)),
-        )
-        ad_id = cur.fetchone()[0]
-        self._conn.commit()
+        with borrow(self._conn) as conn:
+            cur = conn.execute(
+                "INSERT INTO advertisements (text, is_active) VALUES (?, ?) RETURNING ad_id",
+                (text, int(is_active)),
+            )
+            ad_id = cur.fetchone()[0]
+            commit(conn)
         return ad_id
 
     def get_random_ad(self) -> Ad:
         """Return a random active ad. Raises ``ValueError`` if none exist."""
-        cur = self._conn.execute(
-            "SELECT ad_id, text FROM advertisements WHERE is_active = 1"
-        )
-        rows = cur.fetchall()
+        with borrow(self._conn) as conn:
+            rows = conn.execute(
+                "SELECT ad_id, text FROM advertisements WHERE is_active = 1"
+            ).fetchall()
         if not rows:
             raise ValueError("No ads available")
         ad_id, text = random.choice(rows)
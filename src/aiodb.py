@@ -0,0 +1,328 @@
+"""Async database access for the API's hot endpoints.
+
+The adapters mirror the small ``execute``/``fetchone``/``fetchall``/``commit``
+surface that the rest of the code base uses on SQLite connections and
+:class:`~src.pgutil.PGConnectionWrapper`, but every call is awaitable:
+
+* :class:`AsyncSQLiteConnection` follows the ``aiosqlite`` model. Each
+  connection owns one worker thread and every operation is queued to it, so
+  the event loop never blocks on SQLite.
+* :class:`AsyncPGConnectionWrapper` is the async counterpart to
+  ``PGConnectionWrapper`` and runs on an ``asyncpg`` connection.
+
+Both expose :meth:`run_sync`, which runs one of the synchronous helpers in
+``src`` against a real DB-API connection. Write paths use it so their side
+effects stay in one place instead of being duplicated as coroutines.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence
+
+from .pgutil import numbered_query
+from .pool import ConnectionPool, borrow, connect_sqlite
+
+
+class AsyncCursor:
+    """Awaitable view over a DB-API cursor or a list of prefetched rows."""
+
+    def __init__(
+        self,
+        run: Callable[..., Awaitable[Any]] | None,
+        cursor: Any = None,
+        rows: Optional[List[Any]] = None,
+    ) -> None:
+        self._run = run
+        self._cursor = cursor
+        self._rows = rows
+        self.lastrowid = getattr(cursor, "lastrowid", None)
+        self.rowcount = (
+            len(rows) if rows is not None else getattr(cursor, "rowcount", -1)
+        )
+
+    async def fetchone(self) -> Any:
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return await self._run(self._cursor.fetchone)
+
+    async def fetchmany(self, size: int = 100) -> List[Any]:
+        if self._rows is not None:
+            batch, self._rows = self._rows[:size], self._rows[size:]
+            return batch
+        return await self._run(self._cursor.fetchmany, size)
+
+    async def fetchall(self) -> List[Any]:
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return await self._run(self._cursor.fetchall)
+
+
+class AsyncSQLiteConnection:
+    """Run a SQLite connection on its own thread and await every call."""
+
+    def __init__(self, conn: Any, executor: ThreadPoolExecutor) -> None:
+        self._conn = conn
+        self._executor = executor
+        self._closed = False
+
+    @classmethod
+    async def open(cls, connect: Callable[[], Any]) -> "AsyncSQLiteConnection":
+        """Create the worker thread and open the connection on it."""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aiosqlite")
+        future = executor.submit(connect)
+        try:
+            conn = await asyncio.wrap_future(future)
+        except Exception:
+            executor.shutdown(wait=False)
+            raise
+        return cls(conn, executor)
+
+    async def _run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        ctx = contextvars.copy_context()
+        future = self._executor.submit(ctx.run, partial(fn, *args, **kwargs))
+        return await asyncio.wrap_future(future)
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> AsyncCursor:
+        cursor = await self._run(self._conn.execute, query, params)
+        return AsyncCursor(self._run, cursor)
+
+    async def executemany(self, query: str, seq: Any) -> AsyncCursor:
+        cursor = await self._run(self._conn.executemany, query, seq)
+        return AsyncCursor(self._run, cursor)
+
+    async def commit(self) -> None:
+        await self._run(self._conn.commit)
+
+    async def rollback(self) -> None:
+        await self._run(self._conn.rollback)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``fn(conn, *args, **kwargs)`` on the connection's thread."""
+        return await self._run(fn, self._conn, *args, **kwargs)
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    async def close(self) -> None:
+        self._closed = True
+        try:
+            await self._run(self._conn.close)
+        finally:
+            self._executor.shutdown(wait=False)
+
+
+class AsyncPGConnectionWrapper:
+    """Wrap an ``asyncpg`` connection with the SQLite-like interface.
+
+    Like psycopg2, a transaction is opened implicitly by the first statement
+    and stays open until :meth:`commit` or :meth:`rollback`. ``sync_pool`` is
+    used by :meth:`run_sync` because asyncpg has no blocking API for the
+    synchronous helpers to call.
+    """
+
+    def __init__(self, conn: Any, sync_pool: ConnectionPool | None = None) -> None:
+        self._conn = conn
+        self._sync_pool = sync_pool
+        self._tx: Any = None
+
+    async def _begin(self) -> None:
+        if self._tx is None:
+            self._tx = self._conn.transaction()
+            await self._tx.start()
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> AsyncCursor:
+        await self._begin()
+        rows = await self._conn.fetch(numbered_query(query)[0], *params)
+        return AsyncCursor(None, rows=list(rows))
+
+    async def executemany(self, query: str, seq: Any) -> AsyncCursor:
+        await self._begin()
+        await self._conn.executemany(numbered_query(query)[0], list(seq))
+        return AsyncCursor(None, rows=[])
+
+    async def commit(self) -> None:
+        tx, self._tx = self._tx, None
+        if tx is not None:
+            await tx.commit()
+
+    async def rollback(self) -> None:
+        tx, self._tx = self._tx, None
+        if tx is not None:
+            await tx.rollback()
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``fn(conn, ...)`` in a worker thread with a pooled psycopg2 connection."""
+        if self._sync_pool is None:
+            raise RuntimeError("run_sync requires a synchronous connection pool")
+
+        def call() -> Any:
+            with borrow(self._sync_pool) as conn:
+                return fn(conn, *args, **kwargs)
+
+        ctx = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, ctx.run, call)
+
+    def is_closed(self) -> bool:
+        return self._conn.is_closed()
+
+    async def close(self) -> None:
+        await self._conn.close()
+
+
+class AsyncConnectionPool:
+    """Bounded pool of async connections.
+
+    Waiters are woken with ``call_soon_threadsafe`` instead of an
+    ``asyncio.Condition`` so the pool is not tied to a single event loop.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        *,
+        dialect: str = "sqlite",
+        max_size: int = 10,
+        timeout: float = 30.0,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.dialect = dialect
+        self._connect = connect
+        self._max_size = max_size
+        self._timeout = timeout
+        self._idle: List[Any] = []
+        self._waiters: List[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    async def acquire(self) -> Any:
+        """Borrow a connection, waiting up to ``timeout`` seconds for one."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._timeout
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    if not conn.is_closed():
+                        return conn
+                    self._size -= 1
+                    continue
+                if self._size < self._max_size:
+                    self._size += 1
+                    break
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                raise TimeoutError("timed out waiting for a database connection")
+        try:
+            return await self._connect()
+        except BaseException:
+            self._free_slot()
+            raise
+
+    async def release(self, conn: Any) -> None:
+        """Roll back any open transaction and return ``conn`` to the pool."""
+        try:
+            await conn.rollback()
+        except Exception:
+            self._free_slot()
+            await self._close_quietly(conn)
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append(conn)
+                self._wake_one()
+                return
+            self._size -= 1
+        await self._close_quietly(conn)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def close(self) -> None:
+        """Close idle connections; borrowed ones are closed when released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            await self._close_quietly(conn)
+
+    def _free_slot(self) -> None:
+        with self._lock:
+            self._size -= 1
+            self._wake_one()
+
+    def _wake_one(self) -> None:
+        # Caller holds ``self._lock``.
+        while self._waiters:
+            loop, waiter = self._waiters.pop(0)
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_set_result_if_pending, waiter)
+                return
+
+    @staticmethod
+    async def _close_quietly(conn: Any) -> None:
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+
+def _set_result_if_pending(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def create_async_pool(
+    db_url: str | None = None,
+    db_file: str = "mindful.db",
+    *,
+    max_size: int = 10,
+    timeout: float = 30.0,
+    sync_pool: ConnectionPool | None = None,
+) -> AsyncConnectionPool:
+    """Return an async pool matching :func:`src.pool.create_pool`'s selection."""
+    if db_url and db_url.startswith("postgresql"):
+
+        async def connect_pg() -> AsyncPGConnectionWrapper:
+            import asyncpg
+
+            return AsyncPGConnectionWrapper(await asyncpg.connect(db_url), sync_pool)
+
+        return AsyncConnectionPool(
+            connect_pg, dialect="postgres", max_size=max_size, timeout=timeout
+        )
+
+    async def connect_lite() -> AsyncSQLiteConnection:
+        return await AsyncSQLiteConnection.open(partial(connect_sqlite, db_file))
+
+    if db_file == ":memory:":
+        max_size = 1
+    return AsyncConnectionPool(
+        connect_lite, dialect="sqlite", max_size=max_size, timeout=timeout
+    )
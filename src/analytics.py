@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from collections import Counter
-from datetime import date
-from typing import Iterable, Dict, Tuple, List
+from datetime import date, time, timedelta
+from typing import Any, Collection, Iterable, Dict, Tuple, List
 
+from . import charts
 from .sessions import MeditationSession
 
 
@@ -36,93 +37,230 @@ def location_frequency(sessions: Iterable[MeditationSession]) -> Dict[str, int]:
     return dict(sorted(counts.items()))
 
 
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_start(day: date, bucket: str = "day") -> date:
+    """Return the first day of the ``bucket`` containing ``day``; weeks start on Monday."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_counts(counts: Dict[date, int], bucket: str = "day") -> Dict[date, int]:
+    """Merge per-day ``counts`` into ``day``, ``week`` or ``month`` buckets."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"unknown bucket: {bucket}")
+    if bucket == "day":
+        return counts
+    merged: Counter = Counter()
+    for day, count in counts.items():
+        merged[bucket_start(day, bucket)] += count
+    return dict(sorted(merged.items()))
+
+
+def session_filter(
+    user_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    *,
+    alias: str = "",
+) -> Tuple[str, Tuple[Any, ...]]:
+    """Return a condition and parameters selecting ``user_id``'s sessions.
+
+    ``start`` and ``end`` are inclusive and bound as ``date`` objects, which
+    asyncpg requires for the PostgreSQL ``DATE`` column. The condition
+    matches the ``(user_id, session_date)`` index, so a date window is a
+    range scan.
+    """
+    prefix = f"{alias}." if alias else ""
+    clauses = [f"{prefix}user_id = ?"]
+    params: List[Any] = [user_id]
+    if start is not None:
+        clauses.append(f"{prefix}session_date >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{prefix}session_date <= ?")
+        params.append(end)
+    return " AND ".join(clauses), tuple(params)
+
+
+# Database-side versions of the aggregations above. Each template is
+# completed by :func:`build_query` and returns one row per group, so only
+# the grouped counts leave the database. The SQL is portable between SQLite
+# and PostgreSQL; results are sorted in Python so both match the reference
+# functions exactly.
+CONSISTENCY_QUERY = (
+    "SELECT session_date, COUNT(*) FROM sessions " "WHERE {where} GROUP BY session_date"
+)
+TIME_OF_DAY_QUERY = (
+    "SELECT CASE WHEN session_time IS NULL OR session_time = '' THEN 0 "
+    "ELSE CAST(SUBSTR(session_time, 1, 2) AS INTEGER) END AS hour, COUNT(*) "
+    "FROM sessions WHERE {where} GROUP BY 1"
+)
+LOCATION_FREQUENCY_QUERY = (
+    "SELECT COALESCE(location, ''), COUNT(*) FROM sessions " "WHERE {where} GROUP BY 1"
+)
+
+
+def build_query(
+    template: str,
+    user_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    *,
+    alias: str = "",
+) -> Tuple[str, Tuple[Any, ...]]:
+    """Return ``template`` and its parameters for ``user_id``'s sessions in a window."""
+    where, params = session_filter(user_id, start, end, alias=alias)
+    return template.format(where=where), params
+
+
+def consistency_from_rows(rows: Iterable[Tuple[Any, int]]) -> Dict[date, int]:
+    """Return :data:`CONSISTENCY_QUERY` rows as :func:`consistency_over_time` does."""
+    return dict(
+        sorted(
+            (d if isinstance(d, date) else date.fromisoformat(d), count)
+            for d, count in rows
+        )
+    )
+
+
+def counts_from_rows(rows: Iterable[Tuple[Any, int]]) -> Dict[Any, int]:
+    """Return grouped ``(key, count)`` rows as a dict sorted by key."""
+    return dict(sorted(rows))
+
+
+def query_consistency_over_time(
+    conn: Any,
+    user_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    bucket: str = "day",
+) -> Dict[date, int]:
+    """Database-side :func:`consistency_over_time` for ``user_id``."""
+    rows = conn.execute(*build_query(CONSISTENCY_QUERY, user_id, start, end))
+    return bucket_counts(consistency_from_rows(rows), bucket)
+
+
+def query_time_of_day_distribution(
+    conn: Any, user_id: int, start: date | None = None, end: date | None = None
+) -> Dict[int, int]:
+    """Database-side :func:`time_of_day_distribution` for ``user_id``."""
+    rows = conn.execute(*build_query(TIME_OF_DAY_QUERY, user_id, start, end))
+    return counts_from_rows(rows)
+
+
+def query_location_frequency(
+    conn: Any, user_id: int, start: date | None = None, end: date | None = None
+) -> Dict[str, int]:
+    """Database-side :func:`location_frequency` for ``user_id``."""
+    rows = conn.execute(*build_query(LOCATION_FREQUENCY_QUERY, user_id, start, end))
+    return counts_from_rows(rows)
+
+
+SUMMARY_FIELDS = (
+    "consistency",
+    "mood_correlation",
+    "time_of_day",
+    "location_frequency",
+)
+
+
+def summarize_rows(
+    rows: Iterable[Tuple[Any, Any, Any, Any, Any]],
+    fields: Collection[str] = SUMMARY_FIELDS,
+) -> Dict[str, Any]:
+    """Compute the selected aggregations in one pass over raw session rows.
+
+    ``rows`` are ``(session_date, session_time, location, mood_before,
+    mood_after)`` tuples as stored in the database. Each result matches the
+    function above for the same sessions. Dates and times are counted as
+    stored and only the distinct values are parsed.
+    """
+    unknown = set(fields) - set(SUMMARY_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown summary field(s): {', '.join(sorted(unknown))}")
+    want_days = "consistency" in fields
+    want_moods = "mood_correlation" in fields
+    want_hours = "time_of_day" in fields
+    want_places = "location_frequency" in fields
+
+    days: Counter = Counter()
+    times: Counter = Counter()
+    places: Counter = Counter()
+    moods: List[Tuple[int, int]] = []
+    for session_date, session_time, location, mood_before, mood_after in rows:
+        if want_days:
+            days[session_date] += 1
+        if want_hours:
+            times[session_time] += 1
+        if want_places:
+            places[location or ""] += 1
+        if want_moods and mood_before is not None and mood_after is not None:
+            moods.append((mood_before, mood_after))
+
+    summary: Dict[str, Any] = {}
+    if want_days:
+        by_date: Counter = Counter()
+        for value, count in days.items():
+            by_date[
+                value if isinstance(value, date) else date.fromisoformat(value)
+            ] += count
+        summary["consistency"] = dict(sorted(by_date.items()))
+    if want_moods:
+        summary["mood_correlation"] = moods
+    if want_hours:
+        hours: Counter = Counter()
+        for value, count in times.items():
+            hours[time.fromisoformat(value).hour if value else 0] += count
+        summary["time_of_day"] = dict(sorted(hours.items()))
+    if want_places:
+        summary["location_frequency"] = dict(sorted(places.items()))
+    return summary
+
+
+def _save_chart(kind: str, points: List[Tuple[Any, Any]], output_path: str) -> None:
+    try:
+        import matplotlib  # noqa: F401
+    except Exception:  # pragma: no cover - matplotlib optional
+        return
+    if not points:
+        return
+    fmt = "svg" if str(output_path).lower().endswith(".svg") else "png"
+    with open(output_path, "wb") as out:
+        out.write(charts.render_chart(kind, points, fmt))
+
+
 def plot_consistency_over_time(
     sessions: Iterable[MeditationSession], output_path: str
 ) -> None:
     """Plot a line chart of sessions per date."""
-    try:
-        import matplotlib.pyplot as plt
-    except Exception:  # pragma: no cover - matplotlib optional
-        return
     data = consistency_over_time(sessions)
-    if not data:
-        return
-    dates = list(data.keys())
-    counts = list(data.values())
-    plt.figure()
-    plt.plot(dates, counts, marker="o")
-    plt.xlabel("Date")
-    plt.ylabel("Sessions")
-    plt.title("Consistency Over Time")
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    points = [(d.isoformat(), c) for d, c in data.items()]
+    _save_chart("consistency", points, output_path)
 
 
 def plot_mood_correlation(
     sessions: Iterable[MeditationSession], output_path: str
 ) -> None:
     """Plot a scatter chart of mood before vs. mood after."""
-    try:
-        import matplotlib.pyplot as plt
-    except Exception:  # pragma: no cover - matplotlib optional
-        return
-    points = mood_correlation_points(sessions)
-    if not points:
-        return
-    before, after = zip(*points)
-    plt.figure()
-    plt.scatter(before, after)
-    plt.xlabel("Mood Before")
-    plt.ylabel("Mood After")
-    plt.title("Mood Correlation")
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    _save_chart("mood-correlation", mood_correlation_points(sessions), output_path)
 
 
 def plot_time_of_day_distribution(
     sessions: Iterable[MeditationSession], output_path: str
 ) -> None:
     """Plot a bar chart showing sessions by hour of day."""
-    try:
-        import matplotlib.pyplot as plt
-    except Exception:  # pragma: no cover - matplotlib optional
-        return
     data = time_of_day_distribution(sessions)
-    if not data:
-        return
-    hours = list(data.keys())
-    counts = list(data.values())
-    plt.figure()
-    plt.bar(hours, counts)
-    plt.xlabel("Hour")
-    plt.ylabel("Sessions")
-    plt.title("Sessions by Time of Day")
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    _save_chart("time-of-day", list(data.items()), output_path)
 
 
 def plot_location_frequency(
     sessions: Iterable[MeditationSession], output_path: str
 ) -> None:
     """Plot a bar chart showing sessions per location."""
-    try:
-        import matplotlib.pyplot as plt
-    except Exception:  # pragma: no cover - matplotlib optional
-        return
     data = location_frequency(sessions)
-    if not data:
-        return
-    names = list(data.keys())
-    counts = list(data.values())
-    plt.figure()
-    plt.bar(names, counts)
-    plt.xlabel("Location")
-    plt.ylabel("Sessions")
-    plt.title("Sessions by Location")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    _save_chart("location-frequency", list(data.items()), output_path)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 
 class DateValuePoint(BaseModel):
@@ -30,6 +30,52 @@ class MoodCorrelationResponse(BaseModel):
     points: List[MoodCorrelationPoint]
 
 
+class MoodEffect(BaseModel):
+    """Summary statistics of paired before/after moods."""
+
+    count: int
+    mean_before: Optional[float] = None
+    mean_after: Optional[float] = None
+    mean_improvement: Optional[float] = None
+    improvement_sd: Optional[float] = None
+    correlation: Optional[float] = None
+    effect_size: Optional[float] = None
+
+
+class MoodTypeEffect(MoodEffect):
+    """Mood statistics for a single meditation type."""
+
+    session_type: str
+
+
+class MoodStatsResponse(BaseModel):
+    """Response model for mood statistics, overall and per meditation type."""
+
+    overall: MoodEffect
+    by_type: List[MoodTypeEffect]
+
+
+class DurationPercentiles(BaseModel):
+    """Session length percentiles in minutes."""
+
+    count: int
+    median: Optional[float] = None
+    p90: Optional[float] = None
+
+
+class DurationTypePercentiles(DurationPercentiles):
+    """Session length percentiles for a single meditation type."""
+
+    session_type: str
+
+
+class DurationStatsResponse(BaseModel):
+    """Response model for session length percentiles."""
+
+    overall: DurationPercentiles
+    by_type: List[DurationTypePercentiles]
+
+
 class HourValuePoint(BaseModel):
     """Value aggregated by hour of day."""
 
@@ -56,6 +102,36 @@ class LocationFrequencyResponse(BaseModel):
     points: List[StringValuePoint]
 
 
+class AnalyticsSummaryResponse(BaseModel):
+    """Selected analytics aggregations computed from a single query."""
+
+    consistency: Optional[List[DateValuePoint]] = None
+    mood_correlation: Optional[List[MoodCorrelationPoint]] = None
+    time_of_day: Optional[List[HourValuePoint]] = None
+    location_frequency: Optional[List[StringValuePoint]] = None
+
+
+class CommunityBucket(BaseModel):
+    """Community aggregates for one meditation type, hour or weekday."""
+
+    key: str
+    session_count: int
+    user_count: int
+    avg_minutes: float
+    mean_improvement: Optional[float] = None
+    median_minutes: Optional[float] = None
+    p90_minutes: Optional[float] = None
+
+
+class CommunityBenchmarksResponse(BaseModel):
+    """Community-wide benchmarks from the latest batch run."""
+
+    computed_at: Optional[str] = None
+    by_type: List[CommunityBucket]
+    by_hour: List[CommunityBucket]
+    by_weekday: List[CommunityBucket]
+
+
 class AdResponse(BaseModel):
     """API representation of an advertisement."""
 
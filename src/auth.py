@@ -7,6 +7,9 @@ from typing import Optional
 
 from passlib.context import CryptContext
 
+from .transaction import commit
+from .user_cache import UserSummaryCache
+
 # Use bcrypt with a reasonable work factor. ``passlib`` will automatically
 # generate a unique salt for each password hash.
 pwd_context = CryptContext(
@@ -60,8 +63,12 @@ def register_user(
     bio: str = "",
     photo_url: str | None = None,
     is_public: bool = True,
+    users: Optional[UserSummaryCache] = None,
 ) -> int:
-    """Register a user with an email and password and return the new user id."""
+    """Register a user with an email and password and return the new user id.
+
+    ``users`` drops any cached entry for the new id once the user is committed.
+    """
     password_hash = hash_password(password)
     user_id = _insert_user(
         conn,
@@ -72,7 +79,9 @@ def register_user(
         photo_url,
         is_public,
     )
-    conn.commit()
+    commit(conn)
+    if users is not None:
+        users.invalidate_after_commit(conn, user_id)
     return user_id
 
 
@@ -86,6 +95,7 @@ def register_social_user(
     bio: str = "",
     photo_url: str | None = None,
     is_public: bool = True,
+    users: Optional[UserSummaryCache] = None,
 ) -> int:
     """Register a user using a social login provider."""
     user_id = _insert_user(
@@ -101,5 +111,7 @@ def register_social_user(
         "INSERT INTO social_accounts (user_id, provider, provider_user_id) VALUES (?, ?, ?)",
         (user_id, provider, provider_user_id),
     )
-    conn.commit()
+    commit(conn)
+    if users is not None:
+        users.invalidate_after_commit(conn, user_id)
     return user_id
@@ -0,0 +1,131 @@
+"""Group-commit writer for bursts of small inserts.
+
+When many requests log sessions or feed items at once, committing each one
+separately turns SQLite's single writer lock into a convoy. A
+:class:`WriteBatcher` runs submitted writes on one background thread and
+groups the writes that arrive within ``max_delay`` seconds (up to
+``max_batch`` of them) into a single transaction.
+
+Every write runs inside its own savepoint, so a failing write only undoes
+its own changes and :func:`~src.transaction.after_commit` callbacks. The future returned by :meth:`WriteBatcher.submit`
+resolves with the write's return value, such as a generated id, only after
+the batch has committed. A resolved future therefore means the write is
+durable. If the commit fails, every future in the batch fails with the
+commit error.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple
+
+from .pool import ConnectionPool
+from .transaction import savepoint, unit_of_work
+
+_STOP = object()
+
+_Job = Tuple[Callable[..., Any], tuple, dict, Future]
+
+
+class WriteBatcher:
+    """Background writer that commits concurrent writes in batches."""
+
+    def __init__(
+        self, pool: ConnectionPool, *, max_delay: float = 0.005, max_batch: int = 64
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self._pool = pool
+        self._max_delay = max_delay
+        self._max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue ``fn(conn, *args, **kwargs)`` and return a future for its result."""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("write batcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="write-batcher", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write everything already queued, then stop the writer thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            batch: List[_Job] = [job]
+            stop = False
+            deadline = time.monotonic() + self._max_delay
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        job = self._queue.get(timeout=remaining)
+                    else:
+                        job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stop = True
+                    break
+                batch.append(job)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[_Job]) -> None:
+        outcomes: List[Tuple[Future, Any, bool]] = []
+        try:
+            with self._pool.connection() as conn:
+                with unit_of_work(conn):
+                    if self._pool.dialect == "sqlite" and not conn.in_transaction:
+                        # Take the write lock once for the whole batch.
+                        conn.execute("BEGIN IMMEDIATE")
+                    for fn, args, kwargs, future in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        try:
+                            with savepoint(conn, "batched_write"):
+                                result = fn(conn, *args, **kwargs)
+                        except Exception as exc:
+                            outcomes.append((future, exc, False))
+                        else:
+                            outcomes.append((future, result, True))
+        except Exception as exc:
+            for _, _, _, future in batch:
+                if future.running():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.writes += len(outcomes)
+        for future, value, ok in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
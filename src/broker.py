@@ -0,0 +1,128 @@
+"""In-process publish/subscribe for live feed updates.
+
+``/feed/stream`` subscribes the viewer to a :class:`FeedBroker`, and
+:class:`~src.activity.ActivityFeed` publishes every new item, once committed,
+to the subscribed viewers whose timelines received it. Publishing is safe
+from any thread: events are handed to each subscriber's event loop.
+
+Each subscription buffers at most ``queue_size`` events. A client that
+falls that far behind is sent :data:`OVERFLOW` instead of more events and is
+expected to reconnect and reload ``/feed``, so a slow client never grows
+server memory. The broker only reaches clients connected to the same
+process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+# Delivered in place of the buffered events when a subscriber falls behind.
+OVERFLOW = object()
+
+
+class Subscription:
+    """One viewer's queue of pending events."""
+
+    def __init__(
+        self, viewer_id: int, loop: asyncio.AbstractEventLoop, queue_size: int
+    ) -> None:
+        self.viewer_id = viewer_id
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def _offer(self, event: Any) -> None:
+        # Runs on the subscriber's loop.
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        """Return the next event, or ``None`` if ``timeout`` seconds pass."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class FeedBroker:
+    """Fan new feed items out to the viewers' open streams."""
+
+    def __init__(self, queue_size: int = 100) -> None:
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self._queue_size = queue_size
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def subscribe(self, viewer_id: int) -> Subscription:
+        """Open a subscription for ``viewer_id`` on the running event loop."""
+        subscription = Subscription(
+            viewer_id, asyncio.get_running_loop(), self._queue_size
+        )
+        with self._lock:
+            self._subscriptions.setdefault(viewer_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.viewer_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.viewer_id, None)
+        if subscription.overflowed:
+            self.overflows += 1
+
+    def listening(self) -> Set[int]:
+        """Return the ids of viewers with an open subscription."""
+        with self._lock:
+            return set(self._subscriptions)
+
+    def publish(self, viewer_ids: Iterable[int], event: Any) -> None:
+        """Queue ``event`` for every subscription of ``viewer_ids``."""
+        with self._lock:
+            targets = [
+                subscription
+                for viewer_id in viewer_ids
+                for subscription in self._subscriptions.get(viewer_id, ())
+            ]
+        self.published += 1
+        for subscription in targets:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError:
+                # The subscriber's loop has closed.
+                self.unsubscribe(subscription)
+            else:
+                self.delivered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for monitoring the live streams."""
+        with self._lock:
+            subscriptions = sum(len(s) for s in self._subscriptions.values())
+        return {
+            "subscriptions": subscriptions,
+            "queue_size": self._queue_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+def encode_event(data: Any, *, event: Optional[str] = None) -> str:
+    """Return ``data`` as a Server-Sent Events message."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,380 @@
+"""Bulk import of historical meditation sessions.
+
+Imports arrive as NDJSON (one JSON object per line) or CSV with a header
+row, using the same field names as ``POST /sessions``. Rows are parsed and
+validated one line at a time so a large upload is never held in memory, and
+valid rows are inserted in chunks: ``executemany`` on SQLite and ``COPY`` on
+PostgreSQL. Session ids are reserved up front so mood rows can reference
+their sessions without a round trip per row.
+
+Imported sessions are history, so no feed items or badges are created for
+them.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date, time
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence
+
+from . import mood_stats, sketches, stats
+from .transaction import commit
+
+FORMATS = ("ndjson", "csv")
+FIELDS = (
+    "date",
+    "time",
+    "duration",
+    "type",
+    "location",
+    "notes",
+    "moodBefore",
+    "moodAfter",
+)
+
+# Only the first errors are listed in the report; the rest are counted.
+MAX_REPORTED_ERRORS = 1000
+
+
+class SessionRow(NamedTuple):
+    """A validated session ready for insertion."""
+
+    session_date: str
+    session_time: Optional[str]
+    duration: int
+    session_type: str
+    location: Optional[str]
+    notes: Optional[str]
+    mood_before: Optional[int]
+    mood_after: Optional[int]
+
+
+class RowError(ValueError):
+    """Raised for an input row that cannot be imported."""
+
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(message)
+        self.line = line
+
+
+def _optional_text(value: Any, field: str) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+
+def _optional_int(value: Any, field: str) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be an integer")
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{field} must be an integer") from None
+    if not isinstance(value, int):
+        raise ValueError(f"{field} must be an integer")
+    return value
+
+
+def validate(record: Dict[str, Any]) -> SessionRow:
+    """Return ``record`` as a :class:`SessionRow` or raise ``ValueError``."""
+    unknown = set(record) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
+
+    session_date = _optional_text(record.get("date"), "date")
+    if session_date is None:
+        raise ValueError("date is required")
+    try:
+        date.fromisoformat(session_date)
+    except ValueError:
+        raise ValueError("date must be YYYY-MM-DD") from None
+
+    session_time = _optional_text(record.get("time"), "time")
+    if session_time is not None:
+        try:
+            time.fromisoformat(session_time)
+        except ValueError:
+            raise ValueError("time must be HH:MM or HH:MM:SS") from None
+
+    duration = _optional_int(record.get("duration"), "duration")
+    if duration is None or duration <= 0:
+        raise ValueError("duration must be a positive integer")
+
+    session_type = _optional_text(record.get("type"), "type")
+    if session_type is None:
+        raise ValueError("type is required")
+
+    return SessionRow(
+        session_date,
+        session_time,
+        duration,
+        session_type,
+        _optional_text(record.get("location"), "location"),
+        _optional_text(record.get("notes"), "notes"),
+        _optional_int(record.get("moodBefore"), "moodBefore"),
+        _optional_int(record.get("moodAfter"), "moodAfter"),
+    )
+
+
+class RowParser:
+    """Turn NDJSON or CSV input, fed line by line, into validated rows.
+
+    CSV records may span several lines when a quoted field contains a
+    newline; such lines are buffered until the record is complete.
+    """
+
+    def __init__(self, fmt: str = "ndjson") -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unsupported format: {fmt}")
+        self.fmt = fmt
+        self.line = 0
+        self._header: Optional[List[str]] = None
+        self._pending = ""
+        self._pending_start = 0
+
+    def feed(self, line: str) -> Optional[SessionRow]:
+        """Parse one input line; return a row, ``None`` or raise :class:`RowError`."""
+        self.line += 1
+        if self.fmt == "ndjson":
+            return self._feed_json(line)
+        if not self._pending:
+            self._pending_start = self.line
+        self._pending += line + "\n"
+        # An odd number of quotes means a quoted field continues on the
+        # next line.
+        if self._pending.count('"') % 2:
+            return None
+        text, self._pending = self._pending, ""
+        return self._feed_csv(text)
+
+    def close(self) -> None:
+        """Raise :class:`RowError` if the input ended inside a CSV record."""
+        if self._pending:
+            self._pending = ""
+            raise RowError(self._pending_start, "unterminated quoted field")
+
+    def _feed_json(self, line: str) -> Optional[SessionRow]:
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise RowError(self.line, "invalid JSON") from None
+        if not isinstance(record, dict):
+            raise RowError(self.line, "expected a JSON object")
+        return self._validate(record, self.line)
+
+    def _feed_csv(self, text: str) -> Optional[SessionRow]:
+        if not text.strip():
+            return None
+        try:
+            values = next(csv.reader(io.StringIO(text)))
+        except csv.Error as exc:
+            raise RowError(self._pending_start, f"invalid CSV: {exc}") from None
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            unknown = set(self._header) - set(FIELDS)
+            if unknown:
+                self._header = None
+                raise RowError(
+                    self._pending_start,
+                    f"unknown column(s): {', '.join(sorted(unknown))}",
+                )
+            return None
+        if len(values) != len(self._header):
+            raise RowError(
+                self._pending_start,
+                f"expected {len(self._header)} columns, got {len(values)}",
+            )
+        return self._validate(dict(zip(self._header, values)), self._pending_start)
+
+    @staticmethod
+    def _validate(record: Dict[str, Any], line: int) -> SessionRow:
+        try:
+            return validate(record)
+        except ValueError as exc:
+            raise RowError(line, str(exc)) from None
+
+
+class ImportReport:
+    """Running totals for an import."""
+
+    def __init__(self) -> None:
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, error: RowError) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": error.line, "error": str(error)})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+
+def _reserve_ids(conn: Any, count: int, dialect: str) -> List[int]:
+    if dialect == "postgres":
+        cur = conn.execute(
+            "SELECT nextval(pg_get_serial_sequence('sessions', 'id')) "
+            "FROM generate_series(1, ?)",
+            (count,),
+        )
+        return [row[0] for row in cur.fetchall()]
+    if not conn.in_transaction:
+        # Hold the write lock so nobody else takes the reserved ids.
+        conn.execute("BEGIN IMMEDIATE")
+    cur = conn.execute(
+        "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM sessions "
+        "UNION ALL SELECT seq FROM sqlite_sequence WHERE name = 'sessions')"
+    )
+    start = (cur.fetchone()[0] or 0) + 1
+    return list(range(start, start + count))
+
+
+def _copy(conn: Any, table: str, columns: Sequence[str], rows: List[tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur = conn.cursor()
+    try:
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cur.close()
+
+
+def insert_rows(
+    conn: Any, user_id: int, rows: Sequence[SessionRow], dialect: str = "sqlite"
+) -> int:
+    """Insert validated ``rows`` for ``user_id`` and return how many were stored.
+
+    Commits the rows. ``user_stats`` is not updated, so call
+    :func:`src.stats.refresh_user_stats` once the import is done.
+    """
+    if not rows:
+        return 0
+    ids = _reserve_ids(conn, len(rows), dialect)
+    session_columns = (
+        "id",
+        "user_id",
+        "duration",
+        "session_type",
+        "session_date",
+        "session_time",
+        "location",
+        "notes",
+    )
+    sessions = [
+        (
+            session_id,
+            user_id,
+            row.duration,
+            row.session_type,
+            row.session_date,
+            row.session_time,
+            row.location,
+            row.notes,
+        )
+        for session_id, row in zip(ids, rows)
+    ]
+    moods = [
+        (session_id, row.mood_before, row.mood_after)
+        for session_id, row in zip(ids, rows)
+        if row.mood_before is not None or row.mood_after is not None
+    ]
+    if dialect == "postgres":
+        _copy(conn, "sessions", session_columns, sessions)
+        if moods:
+            _copy(conn, "moods", ("session_id", "mood_before", "mood_after"), moods)
+    else:
+        conn.executemany(
+            f"INSERT INTO sessions ({', '.join(session_columns)}) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            sessions,
+        )
+        if moods:
+            conn.executemany(
+                "INSERT INTO moods (session_id, mood_before, mood_after) "
+                "VALUES (?, ?, ?)",
+                moods,
+            )
+    mood_stats.record_moods(
+        conn, user_id, ((r.session_type, r.mood_before, r.mood_after) for r in rows)
+    )
+    sketches.record_durations(
+        conn, user_id, ((r.session_type, r.duration) for r in rows)
+    )
+    commit(conn)
+    return len(rows)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield decoded lines from a stream of byte chunks."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+    if buffer:
+        yield buffer.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+async def import_stream(
+    conn: Any,
+    user_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str = "ndjson",
+    *,
+    dialect: str = "sqlite",
+    chunk_size: int = 500,
+) -> Dict[str, Any]:
+    """Import sessions from ``chunks`` using an async connection from :mod:`src.aiodb`.
+
+    Each chunk of ``chunk_size`` valid rows is committed on its own, so rows
+    before a failure stay imported. The user's stats are recomputed once at
+    the end. Returns the :class:`ImportReport` as a dict.
+    """
+    parser = RowParser(fmt)
+    report = ImportReport()
+    pending: List[SessionRow] = []
+    try:
+        async for line in iter_lines(chunks):
+            try:
+                row = parser.feed(line)
+            except RowError as exc:
+                report.add_error(exc)
+                continue
+            if row is None:
+                continue
+            pending.append(row)
+            if len(pending) >= chunk_size:
+                report.inserted += await conn.run_sync(
+                    insert_rows, user_id, pending, dialect
+                )
+                pending = []
+        try:
+            parser.close()
+        except RowError as exc:
+            report.add_error(exc)
+        report.inserted += await conn.run_sync(insert_rows, user_id, pending, dialect)
+    except Exception:
+        # Drop the failed chunk so refreshing the stats does not commit it.
+        await conn.rollback()
+        raise
+    finally:
+        if report.inserted:
+            # Imports are usually backdated, so recompute rather than fold in
+            # rows, and only once rather than rescanning after every chunk.
+            await conn.run_sync(stats.refresh_user_stats, user_id)
+    return report.as_dict()
@@ -0,0 +1,91 @@
+"""Bounded in-process cache for per-user computed results.
+
+Entries are keyed by user and a result key, such as an endpoint and its
+query parameters, and are stamped with the user's data version from
+``user_stats.data_version``. A lookup with a different version is a miss,
+so a write in any worker invalidates the entry without cross-process
+messaging. Entries also expire after ``ttl`` seconds, which bounds
+staleness after writes that bypass the version bump. The least recently
+used entry is evicted once ``max_entries`` is reached.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Returned by :meth:`ResultCache.get` when nothing usable is cached.
+MISSING = object()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL and per-user versions."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 300.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[Tuple[int, Hashable], Tuple[Any, float, Any]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int, key: Hashable, version: Any) -> Any:
+        """Return the cached value or :data:`MISSING`."""
+        entry_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                cached_version, expires_at, value = entry
+                if cached_version == version and self._clock() < expires_at:
+                    self._entries.move_to_end(entry_key)
+                    self.hits += 1
+                    return value
+                del self._entries[entry_key]
+            self.misses += 1
+            return MISSING
+
+    def put(self, user_id: int, key: Hashable, version: Any, value: Any) -> None:
+        """Store ``value`` computed from ``user_id``'s data at ``version``."""
+        entry_key = (user_id, key)
+        with self._lock:
+            self._entries[entry_key] = (version, self._clock() + self._ttl, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop every entry for ``user_id`` in this process."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[entry_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for tuning the size and TTL."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "ttl": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
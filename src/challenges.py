@@ -6,6 +6,8 @@ import sqlite3
 from datetime import date, timedelta
 from typing import Iterable
 
+from .transaction import commit
+
 
 def create_challenge(
     conn: sqlite3.Connection,
@@ -33,7 +35,7 @@ def create_challenge(
         ),
     )
     challenge_id = cur.fetchone()[0]
-    conn.commit()
+    commit(conn)
     return challenge_id
 
 
@@ -43,7 +45,7 @@ def award_badge(conn: sqlite3.Connection, user_id: int, badge_name: str) -> None
         "INSERT INTO badges (user_id, badge_name) VALUES (?, ?)",
         (user_id, badge_name),
     )
-    conn.commit()
+    commit(conn)
 
 
 def get_user_badges(conn: sqlite3.Connection, user_id: int) -> list[tuple[str, str]]:
@@ -89,16 +91,18 @@ def update_private_challenge(
             user_id,
         ),
     )
-    conn.commit()
+    commit(conn)
 
 
-def delete_private_challenge(conn: sqlite3.Connection, user_id: int, challenge_id: int) -> None:
+def delete_private_challenge(
+    conn: sqlite3.Connection, user_id: int, challenge_id: int
+) -> None:
     """Delete a private challenge owned by ``user_id``."""
     conn.execute(
         "DELETE FROM challenges WHERE id = ? AND created_by = ? AND is_private = 1",
         (challenge_id, user_id),
     )
-    conn.commit()
+    commit(conn)
 
 
 def current_streak(dates: Iterable[date]) -> int:
@@ -0,0 +1,155 @@
+"""Render analytics charts as PNG or SVG images off the request path.
+
+Charts are drawn with matplotlib's object-oriented API: every call builds
+its own ``Figure`` and Agg canvas and never touches the global
+``matplotlib.pyplot`` state, so concurrent renders cannot interfere with
+each other. :class:`ChartRenderer` runs :func:`render_chart` in a process
+pool, so rendering does not hold the GIL of the API workers. Finished images
+are cached by a hash of the chart type, format and aggregated data, so a
+chart is only drawn again when its data changes.
+
+Chart data is the plain output of the analytics aggregations as a list of
+pairs, for example ``[("2023-01-01", 2), ...]`` for ``consistency``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, Sequence, Tuple
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# kind -> (title, x label, y label)
+CHARTS: Dict[str, Tuple[str, str, str]] = {
+    "consistency": ("Consistency Over Time", "Date", "Sessions"),
+    "mood-correlation": ("Mood Correlation", "Mood Before", "Mood After"),
+    "time-of-day": ("Sessions by Time of Day", "Hour", "Sessions"),
+    "location-frequency": ("Sessions by Location", "Location", "Sessions"),
+}
+
+_Points = Sequence[Tuple[Any, Any]]
+
+
+def render_chart(kind: str, points: _Points, fmt: str = "png") -> bytes:
+    """Return the ``kind`` chart of ``points`` encoded as ``fmt``."""
+    if kind not in CHARTS:
+        raise ValueError(f"Unknown chart: {kind}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    title, xlabel, ylabel = CHARTS[kind]
+    fig = Figure(figsize=(6.4, 4.8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if points:
+        xs, ys = zip(*points)
+        if kind == "consistency":
+            ax.plot([date.fromisoformat(str(x)[:10]) for x in xs], ys, marker="o")
+            ax.tick_params(axis="x", labelrotation=45)
+        elif kind == "mood-correlation":
+            ax.scatter(xs, ys)
+        elif kind == "time-of-day":
+            ax.bar(xs, ys)
+        else:
+            ax.bar([str(x) for x in xs], ys)
+            ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    fig.tight_layout()
+    out = io.BytesIO()
+    fig.savefig(out, format=fmt)
+    return out.getvalue()
+
+
+def chart_key(kind: str, points: _Points, fmt: str) -> str:
+    """Return a stable hash of a chart's type, format and data."""
+    payload = json.dumps([kind, fmt, [list(p) for p in points]], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartRenderer:
+    """Render charts in worker processes and cache the images by data hash.
+
+    With ``workers=0`` charts are drawn on a background thread instead, which
+    avoids process start-up costs in tests and small deployments.
+    """
+
+    def __init__(self, workers: int = 2, *, max_entries: int = 256) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._workers = workers
+        self._max_entries = max_entries
+        self._executor: Executor | None = None
+        self._images: OrderedDict[str, Future] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self._workers > 0:
+                # The API process runs threads, so never fork it.
+                self._executor = ProcessPoolExecutor(
+                    self._workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="charts")
+        return self._executor
+
+    def render(
+        self, kind: str, points: _Points, fmt: str = "png"
+    ) -> Tuple[str, Future]:
+        """Return the chart's hash and a future for its image bytes.
+
+        Concurrent requests for the same chart share one render.
+        """
+        points = [tuple(p) for p in points]
+        key = chart_key(kind, points, fmt)
+        with self._lock:
+            future = self._images.get(key)
+            if future is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return key, future
+            self.misses += 1
+            future = self._get_executor().submit(render_chart, kind, points, fmt)
+            self._images[key] = future
+            while len(self._images) > self._max_entries:
+                self._images.popitem(last=False)
+        future.add_done_callback(lambda f: self._forget_failed(key, f))
+        return key, future
+
+    def _forget_failed(self, key: str, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                if self._images.get(key) is future:
+                    del self._images[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters like :meth:`src.cache.ResultCache.stats`."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._images),
+            "max_entries": self._max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,236 @@
+"""Community-wide benchmarks computed by an offline batch job.
+
+:func:`run` splits users into id ranges and aggregates each range in a
+separate process. Workers load a shard's sessions into a
+:class:`~src.frame.SessionFrame` and count sessions, minutes, distinct users
+and mood improvements per meditation type, hour of day and weekday, parsing
+times the same way as :mod:`src.analytics`. Each bucket also gets a
+:class:`~src.sketches.DurationSketch` for its duration percentiles. Shards
+never share a user, so their counts, distinct users included, simply add
+up, and their sketches merge exactly. The totals replace the contents of
+``community_stats`` in one transaction, and ``/community/benchmarks`` serves
+that table.
+
+Run ``python -m src.community [DB_FILE] [--workers N] [--shard-size N]``,
+for example from cron.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .frame import MOOD_MISSING, SessionFrame
+from .pool import create_pool
+from .sketches import DurationSketch
+from .transaction import commit
+
+DIMENSIONS = ("type", "hour", "weekday")
+
+SELECT_COMMUNITY_STATS = (
+    "SELECT dimension, bucket, session_count, total_minutes, user_count, "
+    "mood_sessions, improvement_sum, median_minutes, p90_minutes, computed_at "
+    "FROM community_stats"
+)
+
+_SHARD_QUERY = (
+    "SELECT s.user_id, s.duration, s.session_type, s.session_date, s.session_time, "
+    "s.location, m.mood_before, m.mood_after FROM sessions s "
+    "LEFT JOIN moods m ON s.id = m.session_id "
+    "WHERE s.user_id >= ? AND s.user_id < ?"
+)
+
+_HOURS = [str(hour) for hour in range(24)]
+_WEEKDAYS = [str(day) for day in range(7)]
+
+# (dimension, bucket) -> [sessions, minutes, users, mood sessions, improvement,
+# duration sketch]
+Partial = Dict[Tuple[str, str], List[Any]]
+
+
+def aggregate_rows(rows: Sequence[Sequence[Any]]) -> Partial:
+    """Aggregate ``(user_id, *frame.ROW_COLUMNS)`` rows for one shard."""
+    if not rows:
+        return {}
+    users = np.fromiter(map(itemgetter(0), rows), dtype=np.int64, count=len(rows))
+    frame = SessionFrame.from_rows([row[1:] for row in rows])
+    has_mood = (frame.mood_before != MOOD_MISSING) & (frame.mood_after != MOOD_MISSING)
+    improvement = frame.mood_after.astype(np.int64) - frame.mood_before
+    stride = int(users.max()) + 1
+    # Monday is 0, as in date.weekday(); ordinal 1 was a Monday.
+    weekdays = (frame.days.astype(np.int64) - 1) % 7
+
+    partial: Partial = {}
+    for dimension, codes, labels in (
+        ("type", frame.type_codes.astype(np.int64), frame.types),
+        ("hour", frame.hours.astype(np.int64), _HOURS),
+        ("weekday", weekdays, _WEEKDAYS),
+    ):
+        size = len(labels)
+        sessions = np.bincount(codes, minlength=size)
+        minutes = np.bincount(codes, weights=frame.durations, minlength=size)
+        distinct = np.unique(codes * stride + users) // stride
+        user_counts = np.bincount(distinct, minlength=size)
+        moods = np.bincount(codes[has_mood], minlength=size)
+        gains = np.bincount(
+            codes[has_mood], weights=improvement[has_mood], minlength=size
+        )
+        for idx in np.flatnonzero(sessions).tolist():
+            partial[(dimension, labels[idx])] = [
+                int(sessions[idx]),
+                round(minutes[idx]),
+                int(user_counts[idx]),
+                int(moods[idx]),
+                round(gains[idx]),
+                _sketch(frame.durations[codes == idx]),
+            ]
+    return partial
+
+
+def _sketch(durations: np.ndarray) -> DurationSketch:
+    sketch = DurationSketch()
+    sketch.add_many(durations)
+    return sketch
+
+
+def merge(partials: Iterable[Partial]) -> Partial:
+    """Add up partial results from disjoint sets of users."""
+    totals: Partial = {}
+    for partial in partials:
+        for key, values in partial.items():
+            current = totals.get(key)
+            if current is None:
+                totals[key] = list(values)
+            else:
+                for idx, value in enumerate(values[:5]):
+                    current[idx] += value
+                current[5].merge(values[5])
+    return totals
+
+
+def aggregate_shard(db_url: Optional[str], db_file: str, lo: int, hi: int) -> Partial:
+    """Aggregate the sessions of users with ``lo <= id < hi``.
+
+    Runs in a worker process, so it opens its own connection.
+    """
+    pool = create_pool(db_url, db_file, max_size=1)
+    try:
+        with pool.connection() as conn:
+            rows = conn.execute(_SHARD_QUERY, (lo, hi)).fetchall()
+    finally:
+        pool.close()
+    return aggregate_rows(rows)
+
+
+def shard_ranges(conn: Any, shard_size: int) -> List[Tuple[int, int]]:
+    """Split the user id space into half-open ranges of ``shard_size`` ids."""
+    low, high = conn.execute("SELECT MIN(id), MAX(id) FROM users").fetchone()
+    if low is None:
+        return []
+    return [
+        (lo, min(lo + shard_size, high + 1)) for lo in range(low, high + 1, shard_size)
+    ]
+
+
+def write_results(conn: Any, totals: Partial, computed_at: datetime) -> int:
+    """Replace ``community_stats`` with ``totals`` and return the row count."""
+    stamp = computed_at.isoformat()
+    conn.execute("DELETE FROM community_stats")
+    conn.executemany(
+        "INSERT INTO community_stats (dimension, bucket, session_count, "
+        "total_minutes, user_count, mood_sessions, improvement_sum, "
+        "median_minutes, p90_minutes, computed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            key
+            + tuple(values[:5])
+            + (values[5].quantile(0.5), values[5].quantile(0.9), stamp)
+            for key, values in sorted(totals.items())
+        ],
+    )
+    commit(conn)
+    return len(totals)
+
+
+def run(
+    db_url: Optional[str],
+    db_file: str,
+    *,
+    workers: int = 4,
+    shard_size: int = 1000,
+) -> int:
+    """Recompute the community aggregates and return the rows written.
+
+    With ``workers=0`` shards are aggregated in this process.
+    """
+    pool = create_pool(db_url, db_file, max_size=1)
+    try:
+        with pool.connection() as conn:
+            ranges = shard_ranges(conn, shard_size)
+        args = [(db_url, db_file, lo, hi) for lo, hi in ranges]
+        if workers > 0 and len(args) > 1:
+            with ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                totals = merge(executor.map(aggregate_shard, *zip(*args)))
+        else:
+            totals = merge(aggregate_shard(*a) for a in args)
+        with pool.connection() as conn:
+            return write_results(conn, totals, datetime.now(timezone.utc))
+    finally:
+        pool.close()
+
+
+def benchmarks_from_rows(rows: Iterable[Sequence[Any]]) -> Dict[str, Any]:
+    """Return :data:`SELECT_COMMUNITY_STATS` rows grouped by dimension."""
+    result: Dict[str, Any] = {"computed_at": None}
+    for dimension in DIMENSIONS:
+        result[f"by_{dimension}"] = []
+    for row in rows:
+        dimension, bucket, sessions, minutes, users, moods, gains = row[:7]
+        median, p90, stamp = row[7:]
+        if dimension not in DIMENSIONS:
+            continue
+        result["computed_at"] = (
+            stamp.isoformat() if isinstance(stamp, datetime) else str(stamp)
+        )
+        result[f"by_{dimension}"].append(
+            {
+                "key": bucket,
+                "session_count": sessions,
+                "user_count": users,
+                "avg_minutes": minutes / sessions,
+                "mean_improvement": gains / moods if moods else None,
+                "median_minutes": median,
+                "p90_minutes": p90,
+            }
+        )
+    result["by_type"].sort(key=itemgetter("key"))
+    result["by_hour"].sort(key=lambda item: int(item["key"]))
+    result["by_weekday"].sort(key=lambda item: int(item["key"]))
+    return result
+
+
+if __name__ == "__main__":  # pragma: no cover - command line entry point
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "db_file", nargs="?", default=os.getenv("DB_FILE", "mindful.db")
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=1000)
+    options = parser.parse_args()
+    written = run(
+        os.getenv("DATABASE_URL"),
+        options.db_file,
+        workers=options.workers,
+        shard_size=options.shard_size,
+    )
+    print(f"Wrote {written} community aggregates")
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import heapq
 from dataclasses import dataclass
-from typing import Dict, Iterable, List
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
 
 from .sessions import MeditationSession
 
@@ -14,30 +16,74 @@ class FeedEntry:
     session: MeditationSession
 
 
+def _sort_key(entry: FeedEntry) -> tuple:
+    return (entry.session.session_date, entry.session.time_of_day)
+
+
+def _visible(viewer_id: int, user_id: int, privacy_settings: Dict[int, bool]) -> bool:
+    return user_id == viewer_id or privacy_settings.get(user_id, False)
+
+
+def _newest_first(
+    user_id: int, sess_list: Iterable[MeditationSession]
+) -> Iterator[FeedEntry]:
+    if not isinstance(sess_list, Sequence):
+        sess_list = list(sess_list)
+    previous = None
+    for session in reversed(sess_list):
+        entry = FeedEntry(user_id, session)
+        key = _sort_key(entry)
+        if previous is not None and key > previous:
+            raise ValueError(f"Sessions of user {user_id} are not in date order")
+        previous = key
+        yield entry
+
+
+def iter_feed(
+    viewer_id: int,
+    sessions: Dict[int, Iterable[MeditationSession]],
+    privacy_settings: Dict[int, bool],
+) -> Iterator[FeedEntry]:
+    """Yield the entries of :func:`build_feed` lazily, newest first.
+
+    Each user's sessions must be in chronological order, by ``session_date``
+    and then ``time_of_day``; a ``ValueError`` is raised on reaching one
+    that is out of order. The users' sessions are merged with a heap, so the
+    first ``k`` entries cost ``O(n + k log n)`` for ``n`` users instead of a
+    sort of every session.
+    """
+    streams = [
+        _newest_first(user_id, sess_list)
+        for user_id, sess_list in sessions.items()
+        if _visible(viewer_id, user_id, privacy_settings)
+    ]
+    return heapq.merge(*streams, key=_sort_key, reverse=True)
+
+
 def build_feed(
     viewer_id: int,
     sessions: Dict[int, Iterable[MeditationSession]],
     privacy_settings: Dict[int, bool],
+    limit: Optional[int] = None,
 ) -> List[FeedEntry]:
     """Return feed entries visible to ``viewer_id``.
 
     Sessions from other users are included only if that user has opted in via
     ``privacy_settings``. A user's own sessions are always visible to them.
     Entries are returned in reverse chronological order.
+
+    With a ``limit`` only the newest ``limit`` entries are built, using
+    :func:`iter_feed`, so each user's sessions must be in chronological order.
     """
+    if limit is not None:
+        return list(islice(iter_feed(viewer_id, sessions, privacy_settings), limit))
     entries: List[FeedEntry] = []
     for user_id, sess_list in sessions.items():
-        if user_id != viewer_id and not privacy_settings.get(user_id, False):
+        if not _visible(viewer_id, user_id, privacy_settings):
             # Skip sessions from users who have not opted in
             continue
         for session in sess_list:
             entries.append(FeedEntry(user_id, session))
 
-    entries.sort(
-        key=lambda e: (
-            e.session.session_date,
-            e.session.time_of_day,
-        ),
-        reverse=True,
-    )
+    entries.sort(key=_sort_key, reverse=True)
     return entries
@@ -0,0 +1,145 @@
+"""In-process cache of the follow graph.
+
+Each user's following and follower lists are loaded from ``follows`` on first
+use and kept as sorted ``array('q')`` rows, one per user and direction, like
+the rows of a compressed sparse row matrix. A row costs eight bytes per edge,
+membership is a binary search and counts are the row length. Follows and
+unfollows made through :mod:`src.relationships` update the loaded rows in
+place once they commit.
+
+The cache holds at most ``max_edges`` ids; the least recently used rows are
+dropped first. Rows also expire after ``ttl`` seconds, which bounds how long
+a change made by another worker process can go unseen.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+FOLLOWING = "following"
+FOLLOWERS = "followers"
+
+_QUERIES = {
+    FOLLOWING: "SELECT followed_id FROM follows WHERE follower_id = ? "
+    "ORDER BY followed_id",
+    FOLLOWERS: "SELECT follower_id FROM follows WHERE followed_id = ? "
+    "ORDER BY follower_id",
+}
+
+
+def _contains(row: array, user_id: int) -> bool:
+    idx = bisect_left(row, user_id)
+    return idx < len(row) and row[idx] == user_id
+
+
+class FollowGraph:
+    """Thread-safe LRU cache of sorted adjacency rows."""
+
+    def __init__(
+        self,
+        max_edges: int = 1_000_000,
+        ttl: float = 60.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_edges < 1:
+            raise ValueError("max_edges must be at least 1")
+        self._max_edges = max_edges
+        self._ttl = ttl
+        self._clock = clock
+        self._rows: OrderedDict[Tuple[str, int], Tuple[float, array]] = OrderedDict()
+        self._edges = 0
+        # Bumped by every update so a load that raced one is not cached.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _row(self, conn: Any, direction: str, user_id: int) -> array:
+        key = (direction, user_id)
+        with self._lock:
+            entry = self._rows.get(key)
+            if entry is not None:
+                if self._clock() < entry[0]:
+                    self._rows.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(key)
+            self.misses += 1
+            generation = self._generation
+        row = array("q", [r[0] for r in conn.execute(_QUERIES[direction], (user_id,))])
+        with self._lock:
+            if generation == self._generation and key not in self._rows:
+                self._rows[key] = (self._clock() + self._ttl, row)
+                self._edges += len(row)
+                while self._edges > self._max_edges and len(self._rows) > 1:
+                    self._drop(next(iter(self._rows)))
+                    self.evictions += 1
+        return row
+
+    def _drop(self, key: Tuple[str, int]) -> None:
+        self._edges -= len(self._rows.pop(key)[1])
+
+    def following(self, conn: Any, user_id: int) -> array:
+        """Return the sorted ids ``user_id`` follows."""
+        return array("q", self._row(conn, FOLLOWING, user_id))
+
+    def followers(self, conn: Any, user_id: int) -> array:
+        """Return the sorted ids of ``user_id``'s followers."""
+        return array("q", self._row(conn, FOLLOWERS, user_id))
+
+    def count_following(self, conn: Any, user_id: int) -> int:
+        return len(self._row(conn, FOLLOWING, user_id))
+
+    def count_followers(self, conn: Any, user_id: int) -> int:
+        return len(self._row(conn, FOLLOWERS, user_id))
+
+    def is_following(self, conn: Any, follower_id: int, followed_id: int) -> bool:
+        """Return ``True`` if ``follower_id`` follows ``followed_id``."""
+        return _contains(self._row(conn, FOLLOWING, follower_id), followed_id)
+
+    def add(self, follower_id: int, followed_id: int) -> None:
+        """Record a new follow in the rows that are loaded."""
+        with self._lock:
+            self._generation += 1
+            for key, other in (
+                ((FOLLOWING, follower_id), followed_id),
+                ((FOLLOWERS, followed_id), follower_id),
+            ):
+                entry = self._rows.get(key)
+                if entry is not None and not _contains(entry[1], other):
+                    entry[1].insert(bisect_left(entry[1], other), other)
+                    self._edges += 1
+
+    def remove(self, follower_id: int, followed_id: int) -> None:
+        """Remove a follow from the rows that are loaded."""
+        with self._lock:
+            self._generation += 1
+            for key, other in (
+                ((FOLLOWING, follower_id), followed_id),
+                ((FOLLOWERS, followed_id), follower_id),
+            ):
+                entry = self._rows.get(key)
+                if entry is not None and _contains(entry[1], other):
+                    del entry[1][bisect_left(entry[1], other)]
+                    self._edges -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters like :meth:`src.cache.ResultCache.stats`."""
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(self._rows),
+            "edges": self._edges,
+            "max_edges": self._max_edges,
+            "ttl": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,212 @@
+"""Columnar, NumPy-backed view of a user's sessions.
+
+A :class:`SessionFrame` stores each session attribute as a typed array
+instead of one :class:`~src.sessions.MeditationSession` object per row.
+Frames are built straight from cursor rows: dates, times, types and
+locations are dictionary-encoded, so each distinct value is parsed once
+rather than once per row.
+
+The functions below are vectorized equivalents of :mod:`src.dashboard` and
+:mod:`src.analytics` and return the same values as the reference
+implementations.
+"""
+
+from __future__ import annotations
+
+from datetime import date, time
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from .sessions import MeditationSession
+
+# Stored in the mood columns for sessions without mood data. Moods are not
+# range checked, so the columns are as wide as the INTEGER they come from.
+MOOD_MISSING = np.iinfo(np.int64).min
+
+# Column order expected by :meth:`SessionFrame.from_rows`.
+ROW_COLUMNS = (
+    "duration",
+    "session_type",
+    "session_date",
+    "session_time",
+    "location",
+    "mood_before",
+    "mood_after",
+)
+
+
+def _encode(
+    values: Sequence[Any], label: Callable[[Any], Any] = lambda v: v
+) -> Tuple[List[Any], np.ndarray]:
+    """Dictionary-encode ``values``.
+
+    Returns the sorted distinct ``label(value)`` results and, for each value,
+    the index of its label. ``label`` runs once per distinct value.
+    """
+    table: Dict[Any, Any] = dict.fromkeys(values)
+    labels = {value: label(value) for value in table}
+    distinct = sorted(set(labels.values()))
+    position = {name: idx for idx, name in enumerate(distinct)}
+    for value, name in labels.items():
+        table[value] = position[name]
+    codes = np.fromiter(
+        map(table.__getitem__, values), dtype=np.int32, count=len(values)
+    )
+    return distinct, codes
+
+
+def _ordinal(value: Any) -> int:
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)).toordinal()
+
+
+def _hour(value: Any) -> int:
+    return time.fromisoformat(str(value)).hour if value else 0
+
+
+def _mood(value: Any) -> int:
+    return MOOD_MISSING if value is None else value
+
+
+class SessionFrame:
+    """Sessions stored column by column.
+
+    ``days`` holds proleptic Gregorian ordinals (``date.toordinal()``) and
+    ``hours`` the hour of day. ``type_codes`` and ``location_codes`` index
+    into the sorted ``types`` and ``locations`` lists.
+    """
+
+    __slots__ = (
+        "durations",
+        "days",
+        "hours",
+        "mood_before",
+        "mood_after",
+        "type_codes",
+        "types",
+        "location_codes",
+        "locations",
+    )
+
+    def __init__(
+        self,
+        durations: np.ndarray,
+        days: np.ndarray,
+        hours: np.ndarray,
+        mood_before: np.ndarray,
+        mood_after: np.ndarray,
+        type_codes: np.ndarray,
+        types: List[str],
+        location_codes: np.ndarray,
+        locations: List[str],
+    ) -> None:
+        self.durations = durations
+        self.days = days
+        self.hours = hours
+        self.mood_before = mood_before
+        self.mood_after = mood_after
+        self.type_codes = type_codes
+        self.types = types
+        self.location_codes = location_codes
+        self.locations = locations
+
+    def __len__(self) -> int:
+        return len(self.durations)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "SessionFrame":
+        """Build a frame from rows in :data:`ROW_COLUMNS` order."""
+        count = len(rows)
+
+        def column(idx: int) -> List[Any]:
+            return list(map(itemgetter(idx), rows))
+
+        day_table, day_codes = _encode(column(2), _ordinal)
+        hour_table, hour_codes = _encode(column(3), _hour)
+        types, type_codes = _encode(column(1))
+        locations, location_codes = _encode(column(4), lambda v: v or "")
+        before_table, before_codes = _encode(column(5), _mood)
+        after_table, after_codes = _encode(column(6), _mood)
+        return cls(
+            durations=np.fromiter(column(0), dtype=np.int32, count=count),
+            days=np.array(day_table, dtype=np.int32)[day_codes],
+            hours=np.array(hour_table, dtype=np.uint8)[hour_codes],
+            mood_before=np.array(before_table, dtype=np.int64)[before_codes],
+            mood_after=np.array(after_table, dtype=np.int64)[after_codes],
+            type_codes=type_codes,
+            types=types,
+            location_codes=location_codes,
+            locations=locations,
+        )
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[MeditationSession]) -> "SessionFrame":
+        """Build a frame from :class:`MeditationSession` objects."""
+        return cls.from_rows(
+            [
+                (
+                    s.duration_minutes,
+                    s.meditation_type,
+                    s.session_date,
+                    s.time_of_day.isoformat(),
+                    s.location,
+                    s.mood_before,
+                    s.mood_after,
+                )
+                for s in sessions
+            ]
+        )
+
+
+def calculate_total_time(frame: SessionFrame) -> int:
+    """Vectorized :func:`src.dashboard.calculate_total_time`."""
+    return int(frame.durations.sum(dtype=np.int64))
+
+
+def calculate_session_count(frame: SessionFrame) -> int:
+    """Vectorized :func:`src.dashboard.calculate_session_count`."""
+    return len(frame)
+
+
+def calculate_current_streak(frame: SessionFrame) -> int:
+    """Vectorized :func:`src.dashboard.calculate_current_streak`."""
+    days = np.unique(frame.days)
+    if not days.size:
+        return 0
+    breaks = np.flatnonzero(np.diff(days) != 1)
+    return int(days.size - (breaks[-1] + 1 if breaks.size else 0))
+
+
+def consistency_over_time(frame: SessionFrame) -> Dict[date, int]:
+    """Vectorized :func:`src.analytics.consistency_over_time`."""
+    days, counts = np.unique(frame.days, return_counts=True)
+    return {
+        date.fromordinal(day): count
+        for day, count in zip(days.tolist(), counts.tolist())
+    }
+
+
+def mood_correlation_points(frame: SessionFrame) -> List[Tuple[int, int]]:
+    """Vectorized :func:`src.analytics.mood_correlation_points`."""
+    mask = (frame.mood_before != MOOD_MISSING) & (frame.mood_after != MOOD_MISSING)
+    return list(zip(frame.mood_before[mask].tolist(), frame.mood_after[mask].tolist()))
+
+
+def time_of_day_distribution(frame: SessionFrame) -> Dict[int, int]:
+    """Vectorized :func:`src.analytics.time_of_day_distribution`."""
+    counts = np.bincount(frame.hours, minlength=24)
+    hours = np.flatnonzero(counts)
+    return dict(zip(hours.tolist(), counts[hours].tolist()))
+
+
+def location_frequency(frame: SessionFrame) -> Dict[str, int]:
+    """Vectorized :func:`src.analytics.location_frequency`."""
+    counts = np.bincount(frame.location_codes, minlength=len(frame.locations))
+    return {
+        frame.locations[code]: count
+        for code, count in enumerate(counts.tolist())
+        if count
+    }
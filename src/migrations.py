@@ -0,0 +1,176 @@
+"""Versioned schema migrations for SQLite and PostgreSQL.
+
+Version 1 is the baseline schema in ``scripts/init_db.sql`` (or
+``scripts/init_db_postgres.sql``). Later migrations live in
+``scripts/migrations/<dialect>/NNNN_name.sql`` and are applied once, in
+order, with the applied versions recorded in ``schema_migrations``. When the
+database is already up to date, starting the app costs a single query.
+
+Run ``python -m src.migrations [DB_FILE]`` to migrate a SQLite database, or
+set ``DATABASE_URL`` to migrate PostgreSQL.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, List, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1] / "scripts"
+MIGRATIONS_DIR = SCRIPTS_DIR / "migrations"
+BASELINE_SCRIPTS = {"sqlite": "init_db.sql", "postgres": "init_db_postgres.sql"}
+
+# Arbitrary key for ``pg_advisory_xact_lock`` so concurrent workers migrate
+# one at a time.
+_PG_LOCK_KEY = 7_400_117
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A numbered schema change."""
+
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=None)
+def discover(dialect: str = "sqlite") -> Tuple[Migration, ...]:
+    """Return all migrations for ``dialect`` ordered by version."""
+    found = [Migration(1, "initial", SCRIPTS_DIR / BASELINE_SCRIPTS[dialect])]
+    for path in sorted((MIGRATIONS_DIR / dialect).glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        found.append(Migration(int(version), name, path))
+    versions = [m.version for m in found]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"duplicate migration versions for {dialect}")
+    return tuple(sorted(found, key=lambda m: m.version))
+
+
+def _statements(sql: str, dialect: str) -> List[str]:
+    """Split a migration script into individual statements."""
+    statements: List[str] = []
+    if dialect == "sqlite":
+        buffer = ""
+        for line in sql.splitlines(keepends=True):
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(buffer.strip())
+                buffer = ""
+        tail = buffer
+    else:
+        statements, tail = _split_postgres(sql)
+    if tail.strip():
+        statements.append(tail.strip())
+    return [s for s in statements if _has_code(s)]
+
+
+_DOLLAR_TAG = re.compile(r"\$[A-Za-z_][A-Za-z0-9_]*\$|\$\$")
+
+
+def _split_postgres(sql: str) -> Tuple[List[str], str]:
+    """Split on semicolons outside comments, quotes and dollar quotes.
+
+    Returns the complete statements and the unterminated remainder.
+    """
+    statements: List[str] = []
+    start = pos = 0
+    while pos < len(sql):
+        char = sql[pos]
+        if sql.startswith("--", pos):
+            end = sql.find("\n", pos)
+            pos = len(sql) if end == -1 else end
+        elif sql.startswith("/*", pos):
+            end = sql.find("*/", pos + 2)
+            pos = len(sql) if end == -1 else end + 2
+        elif char in "'\"":
+            end = sql.find(char, pos + 1)
+            pos = len(sql) if end == -1 else end + 1
+        elif char == "$" and _DOLLAR_TAG.match(sql, pos):
+            tag = _DOLLAR_TAG.match(sql, pos).group()
+            end = sql.find(tag, pos + len(tag))
+            pos = len(sql) if end == -1 else end + len(tag)
+        elif char == ";":
+            statements.append(sql[start : pos + 1].strip())
+            start = pos = pos + 1
+        else:
+            pos += 1
+    return statements, sql[start:]
+
+
+def _has_code(statement: str) -> bool:
+    return any(
+        line.strip() and not line.strip().startswith("--")
+        for line in statement.splitlines()
+    )
+
+
+def _ensure_version_table(conn: Any) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name TEXT NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.commit()
+
+
+def current_version(conn: Any) -> int:
+    """Return the highest applied migration version, or ``0``."""
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: Any, dialect: str = "sqlite") -> List[int]:
+    """Apply pending migrations and return the versions that were applied."""
+    migrations = discover(dialect)
+    _ensure_version_table(conn)
+    if current_version(conn) >= migrations[-1].version:
+        return []
+
+    if dialect == "sqlite":
+        conn.commit()
+        # Take the write lock up front so concurrent workers queue here.
+        conn.execute("BEGIN IMMEDIATE")
+    else:
+        conn.execute("SELECT pg_advisory_xact_lock(?)", (_PG_LOCK_KEY,))
+
+    applied: List[int] = []
+    try:
+        done = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+        for migration in migrations:
+            if migration.version in done:
+                continue
+            for statement in _statements(migration.sql, dialect):
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                (migration.version, migration.name),
+            )
+            applied.append(migration.version)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied
+
+
+if __name__ == "__main__":  # pragma: no cover - command line entry point
+    import os
+    import sys
+
+    from .pool import create_pool
+
+    db_file = sys.argv[1] if len(sys.argv) > 1 else os.getenv("DB_FILE", "mindful.db")
+    pool = create_pool(os.getenv("DATABASE_URL"), db_file, max_size=1)
+    with pool.connection() as conn:
+        versions = migrate(conn, pool.dialect)
+    pool.close()
+    print(f"Applied migrations: {versions}" if versions else "Schema is up to date")
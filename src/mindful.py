@@ -3,7 +3,7 @@
 This module includes a basic math helper used in tests and minimal
 database helpers for managing custom meditation types. The database
 functions operate on a SQLite connection and rely on the schema in
-``scripts/init_db.sql``.
+``scripts/init_db.sql`` plus the migrations in ``scripts/migrations``.
 """
 
 from __future__ import annotations
@@ -11,7 +11,10 @@ from __future__ import annotations
 import sqlite3
 from typing import Any
 from uuid import uuid4
-from pathlib import Path
+
+from . import mood_stats, sketches, stats
+from .migrations import migrate
+from .transaction import commit
 
 
 def add_numbers(a: int, b: int) -> int:
@@ -20,26 +23,13 @@ def add_numbers(a: int, b: int) -> int:
 
 
 def init_db(conn: sqlite3.Connection) -> None:
-    """Initialize the database schema using ``init_db.sql``."""
-    script_path = Path(__file__).resolve().parents[1] / "scripts" / "init_db.sql"
-    with open(script_path, "r", encoding="utf-8") as f:
-        conn.executescript(f.read())
-    conn.commit()
+    """Bring a SQLite database up to the latest schema version."""
+    migrate(conn, "sqlite")
 
 
 def init_postgres_db(conn: Any) -> None:
-    """Initialize a PostgreSQL database using ``init_db_postgres.sql``."""
-    script_path = (
-        Path(__file__).resolve().parents[1] / "scripts" / "init_db_postgres.sql"
-    )
-    with open(script_path, "r", encoding="utf-8") as f:
-        sql = f.read()
-    cur = conn.cursor()
-    for statement in sql.split(";"):
-        stmt = statement.strip()
-        if stmt:
-            cur.execute(stmt + ";")
-    conn.commit()
+    """Bring a PostgreSQL database up to the latest schema version."""
+    migrate(conn, "postgres")
 
 
 def add_custom_meditation_type(
@@ -51,7 +41,7 @@ def add_custom_meditation_type(
         "INSERT INTO custom_meditation_types (id, user_id, type_name) VALUES (?, ?, ?)",
         (type_id, user_id, type_name),
     )
-    conn.commit()
+    commit(conn)
     return type_id
 
 
@@ -74,7 +64,7 @@ def update_custom_meditation_type(
         "UPDATE custom_meditation_types SET type_name = ? WHERE id = ? AND user_id = ?",
         (new_name, type_id, user_id),
     )
-    conn.commit()
+    commit(conn)
 
 
 def delete_custom_meditation_type(
@@ -85,7 +75,7 @@ def delete_custom_meditation_type(
         "DELETE FROM custom_meditation_types WHERE id = ? AND user_id = ?",
         (type_id, user_id),
     )
-    conn.commit()
+    commit(conn)
 
 
 def create_challenge(
@@ -102,7 +92,7 @@ def create_challenge(
         (name, target_minutes, start_date, end_date),
     )
     challenge_id = cur.fetchone()[0]
-    conn.commit()
+    commit(conn)
     return challenge_id
 
 
@@ -113,7 +103,7 @@ def join_challenge(conn: sqlite3.Connection, user_id: int, challenge_id: int) ->
         " ON CONFLICT(user_id, challenge_id) DO NOTHING",
         (user_id, challenge_id),
     )
-    conn.commit()
+    commit(conn)
 
 
 def log_challenge_progress(
@@ -125,7 +115,7 @@ def log_challenge_progress(
         "WHERE user_id = ? AND challenge_id = ?",
         (minutes, user_id, challenge_id),
     )
-    conn.commit()
+    commit(conn)
 
 
 def get_challenge_progress(
@@ -159,7 +149,16 @@ def log_session(
     cur = conn.execute(
         "INSERT INTO sessions (user_id, duration, session_type, session_date, session_time, location, photo_url, notes) "
         "VALUES (?, ?, ?, ?, ?, ?, ?, ?) RETURNING id",
-        (user_id, duration, session_type, session_date, session_time, location, photo_url, notes),
+        (
+            user_id,
+            duration,
+            session_type,
+            session_date,
+            session_time,
+            location,
+            photo_url,
+            notes,
+        ),
     )
     session_id = cur.fetchone()[0]
 
@@ -168,8 +167,13 @@ def log_session(
             "INSERT INTO moods (session_id, mood_before, mood_after) VALUES (?, ?, ?)",
             (session_id, mood_before, mood_after),
         )
+        mood_stats.record_moods(
+            conn, user_id, [(session_type, mood_before, mood_after)]
+        )
 
-    conn.commit()
+    stats.record_session(conn, user_id, duration, session_date)
+    sketches.record_durations(conn, user_id, [(session_type, duration)])
+    commit(conn)
     return session_id
 
 
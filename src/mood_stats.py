@@ -0,0 +1,171 @@
+"""Running mood statistics kept in the ``mood_stats`` table.
+
+Each row holds the count, means, sums of squared deviations and co-moment of
+``mood_before`` and ``mood_after`` for one user and meditation type, the
+state of Welford's online algorithm. :func:`record_moods` merges new
+observations into a row with one upsert, using the pairwise combination of
+Chan et al., so a single session and a whole bulk-import chunk go through
+the same statement. Reads combine the per-type rows in the same way, so
+:func:`get_mood_stats` costs the same however many sessions a user has.
+
+Only sessions with both moods recorded are counted.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SELECT_MOOD_STATS = (
+    "SELECT session_type, n, mean_before, mean_after, m2_before, m2_after, "
+    "comoment FROM mood_stats WHERE user_id = ? ORDER BY session_type"
+)
+
+# Column references on the right-hand side see the row before the update.
+_MERGE = (
+    "INSERT INTO mood_stats (user_id, session_type, n, mean_before, mean_after, "
+    "m2_before, m2_after, comoment) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id, session_type) DO UPDATE SET "
+    "n = mood_stats.n + excluded.n, "
+    "mean_before = mood_stats.mean_before + (excluded.mean_before - "
+    "mood_stats.mean_before) * excluded.n / (mood_stats.n + excluded.n), "
+    "mean_after = mood_stats.mean_after + (excluded.mean_after - "
+    "mood_stats.mean_after) * excluded.n / (mood_stats.n + excluded.n), "
+    "m2_before = mood_stats.m2_before + excluded.m2_before + "
+    "(excluded.mean_before - mood_stats.mean_before) * "
+    "(excluded.mean_before - mood_stats.mean_before) * "
+    "mood_stats.n * excluded.n / (mood_stats.n + excluded.n), "
+    "m2_after = mood_stats.m2_after + excluded.m2_after + "
+    "(excluded.mean_after - mood_stats.mean_after) * "
+    "(excluded.mean_after - mood_stats.mean_after) * "
+    "mood_stats.n * excluded.n / (mood_stats.n + excluded.n), "
+    "comoment = mood_stats.comoment + excluded.comoment + "
+    "(excluded.mean_before - mood_stats.mean_before) * "
+    "(excluded.mean_after - mood_stats.mean_after) * "
+    "mood_stats.n * excluded.n / (mood_stats.n + excluded.n)"
+)
+
+
+class MoodMoments(NamedTuple):
+    """Welford state for paired before/after moods."""
+
+    n: int = 0
+    mean_before: float = 0.0
+    mean_after: float = 0.0
+    m2_before: float = 0.0
+    m2_after: float = 0.0
+    comoment: float = 0.0
+
+    def add(self, mood_before: float, mood_after: float) -> "MoodMoments":
+        """Return the moments with one more observation."""
+        n = self.n + 1
+        d_before = mood_before - self.mean_before
+        d_after = mood_after - self.mean_after
+        mean_before = self.mean_before + d_before / n
+        mean_after = self.mean_after + d_after / n
+        return MoodMoments(
+            n,
+            mean_before,
+            mean_after,
+            self.m2_before + d_before * (mood_before - mean_before),
+            self.m2_after + d_after * (mood_after - mean_after),
+            self.comoment + d_before * (mood_after - mean_after),
+        )
+
+    def merge(self, other: "MoodMoments") -> "MoodMoments":
+        """Return the moments of both sets of observations combined."""
+        if not other.n:
+            return self
+        if not self.n:
+            return other
+        n = self.n + other.n
+        d_before = other.mean_before - self.mean_before
+        d_after = other.mean_after - self.mean_after
+        weight = self.n * other.n / n
+        return MoodMoments(
+            n,
+            self.mean_before + d_before * other.n / n,
+            self.mean_after + d_after * other.n / n,
+            self.m2_before + other.m2_before + d_before * d_before * weight,
+            self.m2_after + other.m2_after + d_after * d_after * weight,
+            self.comoment + other.comoment + d_before * d_after * weight,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the count, means, correlation and effect size.
+
+        ``effect_size`` is the mean improvement divided by its standard
+        deviation (Cohen's d for paired samples).
+        """
+        improvement = self.mean_after - self.mean_before if self.n else None
+        sd = None
+        if self.n > 1:
+            variance = (self.m2_before + self.m2_after - 2 * self.comoment) / (
+                self.n - 1
+            )
+            sd = math.sqrt(max(variance, 0.0))
+        spread = math.sqrt(self.m2_before * self.m2_after)
+        return {
+            "count": self.n,
+            "mean_before": self.mean_before if self.n else None,
+            "mean_after": self.mean_after if self.n else None,
+            "mean_improvement": improvement,
+            "improvement_sd": sd,
+            "correlation": self.comoment / spread if spread > 1e-12 else None,
+            "effect_size": improvement / sd if sd and sd > 1e-12 else None,
+        }
+
+
+def moments_by_type(
+    observations: Iterable[Tuple[str, Optional[int], Optional[int]]],
+) -> Dict[str, MoodMoments]:
+    """Fold ``(session_type, mood_before, mood_after)`` tuples into moments."""
+    moments: Dict[str, MoodMoments] = {}
+    for session_type, before, after in observations:
+        if before is None or after is None:
+            continue
+        moments[session_type] = moments.get(session_type, MoodMoments()).add(
+            before, after
+        )
+    return moments
+
+
+def record_moods(
+    conn: Any,
+    user_id: int,
+    observations: Iterable[Tuple[str, Optional[int], Optional[int]]],
+) -> None:
+    """Merge new sessions' moods into ``user_id``'s rows without committing."""
+    rows = [
+        (user_id, session_type) + tuple(m)
+        for session_type, m in moments_by_type(observations).items()
+    ]
+    if rows:
+        conn.executemany(_MERGE, rows)
+
+
+def summarize(rows: Iterable[Tuple[Any, ...]]) -> Dict[str, Any]:
+    """Return overall and per-type statistics from :data:`SELECT_MOOD_STATS` rows."""
+    overall = MoodMoments()
+    by_type: List[Dict[str, Any]] = []
+    for row in rows:
+        moments = MoodMoments(*row[1:])
+        overall = overall.merge(moments)
+        by_type.append({"session_type": row[0], **moments.summary()})
+    return {"overall": overall.summary(), "by_type": by_type}
+
+
+def get_mood_stats(conn: Any, user_id: int) -> Dict[str, Any]:
+    """Return ``user_id``'s mood statistics."""
+    return summarize(conn.execute(SELECT_MOOD_STATS, (user_id,)).fetchall())
+
+
+def rebuild(conn: Any, user_id: int) -> None:
+    """Recompute ``user_id``'s rows from ``moods`` without committing."""
+    conn.execute("DELETE FROM mood_stats WHERE user_id = ?", (user_id,))
+    cur = conn.execute(
+        "SELECT s.session_type, m.mood_before, m.mood_after FROM moods m "
+        "JOIN sessions s ON s.id = m.session_id WHERE s.user_id = ?",
+        (user_id,),
+    )
+    record_moods(conn, user_id, cur)
@@ -6,6 +6,9 @@ from dataclasses import dataclass
 from datetime import time, datetime
 from typing import Any, List
 
+from .pool import borrow
+from .transaction import commit
+
 
 @dataclass
 class Notification:
@@ -18,7 +21,10 @@ class Notification:
 
 
 class NotificationManager:
-    """Database-backed notification preference manager."""
+    """Database-backed notification preference manager.
+
+    ``conn`` may be a connection or a :class:`~src.pool.ConnectionPool`.
+    """
 
     def __init__(self, conn: Any) -> None:
         self._conn = conn
@@ -41,28 +47,30 @@ class NotificationManager:
         self, user_id: int, reminder_time: time, message: str, enabled: bool = True
     ) -> int:
         """Create a new notification and return its identifier."""
-        cur = self._conn.execute(
-            "INSERT INTO user_notifications (user_id, reminder_time, message, is_enabled) "
-            "VALUES (?, ?, ?, ?) RETURNING id",
-            (user_id, reminder_time.isoformat(), message, int(enabled)),
-        )
-        note_id = cur.fetchone()[0]
-        self._conn.commit()
+        with borrow(self._conn) as conn:
+            cur = conn.execute(
+                "INSERT INTO user_notifications (user_id, reminder_time, message, is_enabled) "
+                "VALUES (?, ?, ?, ?) RETURNING id",
+                (user_id, reminder_time.isoformat(), message, int(enabled)),
+            )
+            note_id = cur.fetchone()[0]
+            commit(conn)
         return note_id
 
     def remove_notification(self, user_id: int, notification_id: int) -> None:
         """Remove a notification for ``user_id`` by ``notification_id``."""
-        self._conn.execute(
-            "DELETE FROM user_notifications WHERE user_id = ? AND id = ?",
-            (user_id, notification_id),
-        )
-        self._conn.commit()
+        with borrow(self._conn) as conn:
+            conn.execute(
+                "DELETE FROM user_notifications WHERE user_id = ? AND id = ?",
+                (user_id, notification_id),
+            )
+            commit(conn)
 
     def get_notifications(self, user_id: int) -> List[Notification]:
         """Return all notifications for ``user_id``."""
-        cur = self._conn.execute(
-            "SELECT id, reminder_time, message, is_enabled FROM user_notifications WHERE user_id = ? ORDER BY id",
-            (user_id,),
-        )
-        rows = cur.fetchall()
+        with borrow(self._conn) as conn:
+            rows = conn.execute(
+                "SELECT id, reminder_time, message, is_enabled FROM user_notifications WHERE user_id = ? ORDER BY id",
+                (user_id,),
+            ).fetchall()
         return [Notification(r[0], self._to_time(r[1]), r[2], bool(r[3])) for r in rows]
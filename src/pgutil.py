@@ -1,23 +1,133 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Tuple
+
+# Statements that may be turned into server-side prepared statements.
+_PREPARABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+@lru_cache(maxsize=1024)
+def translate_query(query: str) -> str:
+    """Return ``query`` with SQLite ``?`` placeholders in psycopg2's ``%s`` style."""
+    return query.replace("?", "%s")
+
+
+@lru_cache(maxsize=1024)
+def numbered_query(query: str) -> Tuple[str, int]:
+    """Return ``query`` with ``$1, $2, ...`` placeholders and the parameter count."""
+    parts = query.split("?")
+    numbered = parts[0]
+    for idx, part in enumerate(parts[1:], start=1):
+        numbered += f"${idx}{part}"
+    return numbered, len(parts) - 1
+
+
 class PGConnectionWrapper:
-    """Wrap a psycopg2 connection to expose a SQLite-like execute() method."""
+    """Wrap a psycopg2 connection to expose a SQLite-like execute() method.
 
-    def __init__(self, conn):
+    Translated SQL is memoized, and a statement executed ``prepare_threshold``
+    times on this connection is promoted to a server-side prepared statement
+    so PostgreSQL stops re-planning it. At most ``max_prepared`` statements
+    stay prepared; the least recently used one is deallocated to make room.
+
+    Like ``sqlite3``, every :meth:`execute` returns a new cursor, so callers
+    may keep reading one after running other statements. Only the wrapper's
+    own ``PREPARE``/``DEALLOCATE`` bookkeeping reuses a cursor.
+    """
+
+    def __init__(self, conn, *, prepare_threshold: int = 5, max_prepared: int = 64):
         self._conn = conn
+        self._prepare_threshold = prepare_threshold
+        self._max_prepared = max_prepared
+        self._prepared: OrderedDict[str, str] = OrderedDict()
+        self._unpreparable: set[str] = set()
+        self._counts: OrderedDict[str, int] = OrderedDict()
+        self._next_id = 0
+        self._internal_cursor: Any = None
+
+    @property
+    def prepared_statements(self) -> int:
+        """Number of statements currently prepared on the server."""
+        return len(self._prepared)
 
     def execute(self, query, params=None):
-        query = query.replace("?", "%s")
         cur = self._conn.cursor()
         if params is None:
-            cur.execute(query)
+            cur.execute(translate_query(query))
+            return cur
+        name = self._statement_name(query)
+        if name is None:
+            cur.execute(translate_query(query), params)
         else:
-            cur.execute(query, params)
+            placeholders = ", ".join(["%s"] * len(params))
+            cur.execute(f"EXECUTE {name} ({placeholders})", params)
         return cur
 
     def executemany(self, query, seq):
-        query = query.replace("?", "%s")
         cur = self._conn.cursor()
-        cur.executemany(query, seq)
+        cur.executemany(translate_query(query), seq)
         return cur
 
+    def _statement_name(self, query: str) -> str | None:
+        """Return the prepared statement for ``query``, preparing it when hot."""
+        name = self._prepared.get(query)
+        if name is not None:
+            self._prepared.move_to_end(query)
+            return name
+        if self._prepare_threshold <= 0 or query in self._unpreparable:
+            return None
+        count = self._counts.pop(query, 0) + 1
+        if count < self._prepare_threshold:
+            self._counts[query] = count
+            # Only track as many candidates as could ever be prepared.
+            while len(self._counts) > self._max_prepared * 4:
+                self._counts.popitem(last=False)
+            return None
+        return self._prepare(query)
+
+    def _prepare(self, query: str) -> str | None:
+        numbered, count = numbered_query(query)
+        if count == 0 or not query.lstrip().upper().startswith(_PREPARABLE):
+            self._mark_unpreparable(query)
+            return None
+        while len(self._prepared) >= self._max_prepared:
+            _, old_name = self._prepared.popitem(last=False)
+            self._run_guarded(f"DEALLOCATE {old_name}")
+        self._next_id += 1
+        name = f"mc_stmt_{self._next_id}"
+        # A statement PostgreSQL cannot infer parameter types for fails to
+        # prepare; the savepoint keeps that from aborting the caller's
+        # transaction and the statement keeps running unprepared.
+        if not self._run_guarded(f"PREPARE {name} AS {numbered}"):
+            self._mark_unpreparable(query)
+            return None
+        self._prepared[query] = name
+        return name
+
+    def _mark_unpreparable(self, query: str) -> None:
+        if len(self._unpreparable) >= self._max_prepared * 4:
+            self._unpreparable.clear()
+        self._unpreparable.add(query)
+
+    def _run_guarded(self, statement: str) -> bool:
+        # This cursor never leaves the wrapper, so it is safe to reuse.
+        cur = self._internal_cursor
+        if cur is None or cur.closed:
+            cur = self._internal_cursor = self._conn.cursor()
+        guarded = not self._conn.autocommit
+        try:
+            if guarded:
+                cur.execute("SAVEPOINT mc_prepare")
+            cur.execute(statement)
+            if guarded:
+                cur.execute("RELEASE SAVEPOINT mc_prepare")
+            return True
+        except Exception:
+            if guarded:
+                cur.execute("ROLLBACK TO SAVEPOINT mc_prepare")
+            return False
+
     def __getattr__(self, name):
         return getattr(self._conn, name)
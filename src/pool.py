@@ -0,0 +1,241 @@
+"""Bounded database connection pools for the API.
+
+A pool hands each request its own connection instead of sharing one
+module-level connection between every thread of the server. SQLite
+connections are opened in WAL mode so readers never block the writer, and
+PostgreSQL connections are health checked before reuse so a dropped socket
+only costs one reconnect instead of taking the process down.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from .transaction import active_connection
+
+# Idle PostgreSQL connections older than this are pinged before reuse.
+DEFAULT_RECHECK_SECONDS = 30.0
+
+
+class ConnectionPool:
+    """Thread-safe, bounded pool of database connections.
+
+    ``connect`` opens a new connection. ``check`` is called on idle
+    connections before they are handed out and should return ``False`` when
+    the connection is no longer usable; such connections are closed and
+    transparently replaced. Connections are rolled back when returned so a
+    failed request never leaks an open transaction to the next borrower.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        *,
+        dialect: str = "sqlite",
+        max_size: int = 10,
+        timeout: float = 30.0,
+        check: Optional[Callable[[Any], bool]] = None,
+        recheck_seconds: float = 0.0,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.dialect = dialect
+        self._connect = connect
+        self._check = check
+        self._recheck_seconds = recheck_seconds
+        self._max_size = max_size
+        self._timeout = timeout
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, idle or in use."""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """Number of connections waiting to be borrowed."""
+        return len(self._idle)
+
+    def acquire(self) -> Any:
+        """Borrow a connection, waiting up to ``timeout`` seconds for one."""
+        deadline = time.monotonic() + self._timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    break
+                if self._size < self._max_size:
+                    # Reserve the slot before connecting outside the lock.
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("timed out waiting for a database connection")
+                self._cond.wait(remaining)
+
+        if conn is not None:
+            if self._is_healthy(conn, released_at):
+                return conn
+            self._close_quietly(conn)
+        try:
+            return self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def release(self, conn: Any) -> None:
+        """Return ``conn`` to the pool, discarding it if it is broken."""
+        try:
+            conn.rollback()
+        except Exception:
+            self._close_quietly(conn)
+            self._free_slot()
+            return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Context manager that borrows a connection and always returns it."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close idle connections; borrowed ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _is_healthy(self, conn: Any, released_at: float) -> bool:
+        if self._check is None:
+            return True
+        if time.monotonic() - released_at < self._recheck_seconds:
+            return not getattr(conn, "closed", False)
+        try:
+            return bool(self._check(conn))
+        except Exception:
+            return False
+
+    def _free_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# SQLite stores dates as ISO text. Bind date parameters, such as the
+# analytics date window, the same way without relying on sqlite3's
+# deprecated default adapter.
+sqlite3.register_adapter(date, date.isoformat)
+
+
+def connect_sqlite(db_file: str) -> sqlite3.Connection:
+    """Open a SQLite connection tuned for concurrent access.
+
+    WAL mode lets readers proceed while another connection writes and
+    ``synchronous=NORMAL`` is the recommended durability level for WAL.
+    Connections may move between the threads FastAPI uses for a request's
+    dependencies and handler, but the pool guarantees exclusive use.
+    """
+    conn = sqlite3.connect(db_file, timeout=30.0, check_same_thread=False)
+    if db_file != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def connect_postgres(db_url: str) -> Any:
+    """Open a psycopg2 connection wrapped with the SQLite-style interface."""
+    import psycopg2
+
+    from .pgutil import PGConnectionWrapper
+
+    return PGConnectionWrapper(psycopg2.connect(db_url))
+
+
+def ping(conn: Any) -> bool:
+    """Return ``True`` if ``conn`` can still run a trivial query."""
+    if getattr(conn, "closed", False):
+        return False
+    cur = conn.execute("SELECT 1")
+    cur.fetchone()
+    conn.rollback()
+    return True
+
+
+def create_pool(
+    db_url: str | None = None,
+    db_file: str = "mindful.db",
+    *,
+    max_size: int = 10,
+    timeout: float = 30.0,
+) -> ConnectionPool:
+    """Return a pool for ``db_url`` if it is a PostgreSQL URL, else ``db_file``."""
+    if db_url and db_url.startswith("postgresql"):
+        return ConnectionPool(
+            lambda: connect_postgres(db_url),
+            dialect="postgres",
+            max_size=max_size,
+            timeout=timeout,
+            check=ping,
+            recheck_seconds=DEFAULT_RECHECK_SECONDS,
+        )
+    if db_file == ":memory:":
+        # Every in-memory connection is a separate database.
+        max_size = 1
+    return ConnectionPool(
+        lambda: connect_sqlite(db_file),
+        dialect="sqlite",
+        max_size=max_size,
+        timeout=timeout,
+    )
+
+
+@contextmanager
+def borrow(source: Any) -> Iterator[Any]:
+    """Yield a connection from ``source``, which may be a pool or a connection.
+
+    Helpers that are handed a :class:`ConnectionPool` check a connection out
+    for the duration of a single call, unless a
+    :func:`~src.transaction.unit_of_work` is active, in which case they join
+    its connection. Plain connections are used as-is.
+    """
+    if isinstance(source, ConnectionPool):
+        current = active_connection()
+        if current is not None:
+            yield current
+            return
+        with source.connection() as conn:
+            yield conn
+    else:
+        yield source
@@ -1,7 +1,11 @@
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
 import sqlite3
 
+from . import stats, timeline
+from .transaction import commit
+from .user_cache import UserSummaryCache
+
 
 @dataclass
 class Profile:
@@ -40,42 +44,74 @@ class ProfileManager:
         return profile.is_public or requester_id == profile_user_id
 
 
-def update_bio(conn: sqlite3.Connection, user_id: int, bio: str) -> None:
+def update_bio(
+    conn: sqlite3.Connection,
+    user_id: int,
+    bio: str,
+    users: Optional[UserSummaryCache] = None,
+) -> None:
     """Persist a new bio for ``user_id`` in the database."""
     conn.execute("UPDATE users SET bio = ? WHERE id = ?", (bio, user_id))
-    conn.commit()
+    commit(conn)
+    if users is not None:
+        users.invalidate_after_commit(conn, user_id)
 
 
-def update_photo(conn: sqlite3.Connection, user_id: int, photo_url: str) -> None:
+def update_photo(
+    conn: sqlite3.Connection,
+    user_id: int,
+    photo_url: str,
+    users: Optional[UserSummaryCache] = None,
+) -> None:
     """Persist a new profile photo path for ``user_id``."""
     conn.execute("UPDATE users SET photo_url = ? WHERE id = ?", (photo_url, user_id))
-    conn.commit()
+    commit(conn)
+    if users is not None:
+        users.invalidate_after_commit(conn, user_id)
+
 
-def update_visibility(conn: sqlite3.Connection, user_id: int, is_public: bool) -> None:
+def update_visibility(
+    conn: sqlite3.Connection,
+    user_id: int,
+    is_public: bool,
+    users: Optional[UserSummaryCache] = None,
+) -> None:
     """Update profile visibility flag for a user."""
     conn.execute(
         "UPDATE users SET is_public = ? WHERE id = ?",
         (int(is_public), user_id),
     )
-    conn.commit()
-
-
-def get_profile_with_stats(conn: sqlite3.Connection, user_id: int) -> dict:
-    """Return basic profile info and aggregated session stats."""
-    cur = conn.execute(
-        "SELECT display_name, bio, photo_url, is_public FROM users WHERE id = ?",
-        (user_id,),
-    )
-    row = cur.fetchone()
+    timeline.set_visibility(conn, user_id, is_public)
+    commit(conn)
+    if users is not None:
+        users.invalidate_after_commit(conn, user_id)
+
+
+def get_profile_with_stats(
+    conn: sqlite3.Connection, user_id: int, users: Optional[UserSummaryCache] = None
+) -> dict:
+    """Return basic profile info and aggregated session stats.
+
+    With ``users`` the display columns are read through that cache.
+    ``is_public`` decides who may see the profile, so it is always read
+    from the table.
+    """
+    if users is not None:
+        cur = conn.execute("SELECT is_public FROM users WHERE id = ?", (user_id,))
+        visibility = cur.fetchone()
+        summary = users.get(conn, user_id) if visibility else None
+        row = summary[1:4] + (visibility[0],) if summary is not None else None
+    else:
+        cur = conn.execute(
+            "SELECT display_name, bio, photo_url, is_public FROM users WHERE id = ?",
+            (user_id,),
+        )
+        row = cur.fetchone()
     if not row:
         raise ValueError("user not found")
 
     display_name, bio, photo_url, is_public = row
-    cur = conn.execute(
-        "SELECT COALESCE(SUM(duration), 0), COUNT(*) FROM sessions WHERE user_id = ?",
-        (user_id,),
-    )
-    total_minutes, session_count = cur.fetchone()
+    user_stats = stats.get_user_stats(conn, user_id)
 
     cur = conn.execute(
         "SELECT session_type, session_date FROM sessions WHERE user_id = ? ORDER BY session_date DESC, id DESC LIMIT 5",
@@ -89,7 +125,7 @@ def get_profile_with_stats(conn: sqlite3.Connection, user_id: int) -> dict:
         "bio": bio,
         "photo_url": photo_url,
         "is_public": bool(is_public),
-        "total_minutes": total_minutes or 0,
-        "session_count": session_count or 0,
+        "total_minutes": user_stats["total_minutes"],
+        "session_count": user_stats["session_count"],
         "recent_activity": recent_activity,
     }
@@ -1,17 +1,31 @@
-"""User following relationships management."""
+"""User following relationships management.
+
+The write helpers take an optional :class:`~src.follow_graph.FollowGraph`
+and keep its loaded rows in step with ``follows``.
+"""
 
 from __future__ import annotations
 
 import sqlite3
-from typing import List
+from typing import List, Optional
 
 from fastapi import HTTPException
+from . import timeline
+from .follow_graph import FollowGraph
 from .subscriptions import is_premium, FREE_TIER_FRIEND_LIMIT
+from .transaction import after_commit, commit
 
 
-def follow_user(conn: sqlite3.Connection, follower_id: int, followed_id: int) -> None:
+def follow_user(
+    conn: sqlite3.Connection,
+    follower_id: int,
+    followed_id: int,
+    graph: Optional[FollowGraph] = None,
+) -> None:
     """Create a follow relationship from ``follower_id`` to ``followed_id``."""
 
+    # The graph is per process and may be stale, so the limit is always
+    # checked against the table, in the transaction that inserts the follow.
     if not is_premium(conn, follower_id):
         cur = conn.execute(
             "SELECT COUNT(*) FROM follows WHERE follower_id = ?",
@@ -29,16 +43,27 @@ def follow_user(conn: sqlite3.Connection, follower_id: int, followed_id: int) ->
         " ON CONFLICT(follower_id, followed_id) DO NOTHING",
         (follower_id, followed_id),
     )
-    conn.commit()
+    timeline.add_follow(conn, follower_id, followed_id)
+    commit(conn)
+    if graph is not None:
+        after_commit(conn, lambda: graph.add(follower_id, followed_id))
 
 
-def unfollow_user(conn: sqlite3.Connection, follower_id: int, followed_id: int) -> None:
+def unfollow_user(
+    conn: sqlite3.Connection,
+    follower_id: int,
+    followed_id: int,
+    graph: Optional[FollowGraph] = None,
+) -> None:
     """Remove a follow relationship."""
     conn.execute(
         "DELETE FROM follows WHERE follower_id = ? AND followed_id = ?",
         (follower_id, followed_id),
     )
-    conn.commit()
+    timeline.remove_follow(conn, follower_id, followed_id)
+    commit(conn)
+    if graph is not None:
+        after_commit(conn, lambda: graph.remove(follower_id, followed_id))
 
 
 def get_followers(conn: sqlite3.Connection, user_id: int) -> List[int]:
@@ -0,0 +1,297 @@
+"""Mergeable quantile sketches for session durations.
+
+A :class:`DurationSketch` is a log-bucketed histogram in the style of
+DDSketch: a positive value ``x`` is counted in bucket
+``ceil(log(x) / log(gamma))`` with ``gamma = (1 + a) / (1 - a)``, so every
+quantile it returns is within a relative error ``a`` (:data:`RELATIVE_ACCURACY`)
+of the exact rank-``floor(q * (n - 1))`` value. Merging two sketches adds their
+bucket counts, which gives exactly the sketch of the combined durations. A
+user's per-type sketches therefore combine into the user's overall sketch,
+and the community job can build one sketch per shard and merge them.
+
+A sketch of minute durations has a few dozen buckets and serializes to a
+few dozen bytes. One row per user and meditation type is kept in
+``duration_sketches``, and ``duration_sketch_users`` lists the users whose
+rows have been built from their whole history. A user's first write after
+the upgrade builds their rows, and until then reads compute the sketches
+from ``sessions``. Run ``python -m src.sketches [DB_FILE]`` to build the
+rows for every user.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .transaction import commit
+
+RELATIVE_ACCURACY = 0.01
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_FORMAT_VERSION = 1
+
+SELECT_SKETCHES = (
+    "SELECT session_type, sketch FROM duration_sketches WHERE user_id = ? "
+    "ORDER BY session_type"
+)
+SELECT_BUILT = "SELECT 1 FROM duration_sketch_users WHERE user_id = ?"
+SELECT_DURATIONS = "SELECT session_type, duration FROM sessions WHERE user_id = ?"
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class DurationSketch:
+    """Quantile sketch with bounded relative error."""
+
+    __slots__ = ("buckets", "zeros")
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, int] = {}
+        # Values <= 0 cannot be log-bucketed and are counted separately.
+        self.zeros = 0
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.buckets.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Count ``value`` ``count`` times."""
+        if value <= 0:
+            self.zeros += count
+            return
+        key = math.ceil(math.log(value) / _LOG_GAMMA)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def add_many(self, values: Any) -> None:
+        """Count every value in ``values``, vectorized for large batches."""
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        self.zeros += int(values.size - positive.size)
+        keys, counts = np.unique(
+            np.ceil(np.log(positive) / _LOG_GAMMA).astype(np.int64),
+            return_counts=True,
+        )
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def merge(self, other: "DurationSketch") -> "DurationSketch":
+        """Add ``other``'s counts to this sketch and return it."""
+        self.zeros += other.zeros
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the estimated ``q`` quantile, or ``None`` if empty."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        total = self.count
+        if not total:
+            return None
+        rank = math.floor(q * (total - 1))
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # The point with equal relative distance to both bucket bounds.
+                return 2 * _GAMMA**key / (_GAMMA + 1)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def to_bytes(self) -> bytes:
+        """Serialize the sketch as a compact byte string.
+
+        The layout is a version byte followed by varints: the zero count, the
+        bucket count, then each bucket's zigzag-encoded key delta and count.
+        """
+        out = bytearray([_FORMAT_VERSION])
+        _write_varint(out, self.zeros)
+        _write_varint(out, len(self.buckets))
+        previous = 0
+        for key in sorted(self.buckets):
+            delta = key - previous
+            _write_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+            _write_varint(out, self.buckets[key])
+            previous = key
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: Any) -> "DurationSketch":
+        """Load a sketch written by :meth:`to_bytes`."""
+        data = bytes(data)
+        if not data or data[0] != _FORMAT_VERSION:
+            raise ValueError("Unsupported sketch format")
+        sketch = cls()
+        sketch.zeros, pos = _read_varint(data, 1)
+        size, pos = _read_varint(data, pos)
+        key = 0
+        for _ in range(size):
+            delta, pos = _read_varint(data, pos)
+            key += delta >> 1 if not delta & 1 else -((delta + 1) >> 1)
+            sketch.buckets[key], pos = _read_varint(data, pos)
+        return sketch
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the count, median and 90th percentile."""
+        return {
+            "count": self.count,
+            "median": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+        }
+
+
+_EMPTY = DurationSketch().to_bytes()
+
+
+def record_durations(
+    conn: Any, user_id: int, durations: Iterable[Tuple[str, float]]
+) -> None:
+    """Add ``(session_type, duration)`` pairs to ``user_id``'s sketches.
+
+    The sessions must already be inserted. If ``user_id``'s sketches have
+    not been built yet, they are built from all of ``sessions`` instead.
+    Does not commit.
+    """
+    # Claiming the marker row locks it, so a concurrent first write waits
+    # and then adds only its own durations to the built rows.
+    claimed = conn.execute(
+        "INSERT INTO duration_sketch_users (user_id) VALUES (?) "
+        "ON CONFLICT (user_id) DO NOTHING RETURNING user_id",
+        (user_id,),
+    ).fetchone()
+    if claimed is not None:
+        _build(conn, user_id)
+    else:
+        _add_durations(conn, user_id, durations)
+
+
+def _add_durations(
+    conn: Any, user_id: int, durations: Iterable[Tuple[str, float]]
+) -> None:
+    by_type: Dict[str, list] = defaultdict(list)
+    for session_type, duration in durations:
+        by_type[session_type].append(duration)
+    for session_type, values in by_type.items():
+        # The no-op upsert creates or locks the row, so concurrent writers
+        # read each other's sketch instead of overwriting it.
+        row = conn.execute(
+            "INSERT INTO duration_sketches (user_id, session_type, sketch) "
+            "VALUES (?, ?, ?) ON CONFLICT (user_id, session_type) "
+            "DO UPDATE SET sketch = duration_sketches.sketch RETURNING sketch",
+            (user_id, session_type, _EMPTY),
+        ).fetchone()
+        sketch = DurationSketch.from_bytes(row[0])
+        if len(values) == 1:
+            sketch.add(values[0])
+        else:
+            sketch.add_many(values)
+        conn.execute(
+            "UPDATE duration_sketches SET sketch = ? "
+            "WHERE user_id = ? AND session_type = ?",
+            (sketch.to_bytes(), user_id, session_type),
+        )
+
+
+def _build(conn: Any, user_id: int) -> None:
+    conn.execute("DELETE FROM duration_sketches WHERE user_id = ?", (user_id,))
+    rows = conn.execute(SELECT_DURATIONS, (user_id,)).fetchall()
+    _add_durations(conn, user_id, rows)
+
+
+def rebuild(conn: Any, user_id: int) -> None:
+    """Recompute ``user_id``'s sketches from ``sessions`` and commit."""
+    conn.execute(
+        "INSERT INTO duration_sketch_users (user_id) VALUES (?) "
+        "ON CONFLICT (user_id) DO NOTHING",
+        (user_id,),
+    )
+    _build(conn, user_id)
+    commit(conn)
+
+
+def load_sketches(rows: Iterable[Tuple[str, Any]]) -> Dict[str, DurationSketch]:
+    """Return :data:`SELECT_SKETCHES` rows as sketches keyed by type."""
+    return {
+        session_type: DurationSketch.from_bytes(blob) for session_type, blob in rows
+    }
+
+
+def sketches_from_durations(
+    rows: Iterable[Tuple[str, float]],
+) -> Dict[str, DurationSketch]:
+    """Return :data:`SELECT_DURATIONS` rows as sketches keyed by type."""
+    by_type: Dict[str, list] = defaultdict(list)
+    for session_type, duration in rows:
+        by_type[session_type].append(duration)
+    sketches = {}
+    for session_type, values in sorted(by_type.items()):
+        sketch = sketches[session_type] = DurationSketch()
+        sketch.add_many(values)
+    return sketches
+
+
+def summarize(sketches: Dict[str, DurationSketch]) -> Dict[str, Any]:
+    """Return the overall and per-type percentiles of a user's sketches."""
+    overall = DurationSketch()
+    for sketch in sketches.values():
+        overall.merge(sketch)
+    return {
+        "overall": overall.summary(),
+        "by_type": [
+            {"session_type": session_type, **sketch.summary()}
+            for session_type, sketch in sketches.items()
+        ],
+    }
+
+
+def get_duration_stats(conn: Any, user_id: int) -> Dict[str, Any]:
+    """Return ``user_id``'s duration percentiles overall and per type."""
+    if conn.execute(SELECT_BUILT, (user_id,)).fetchone():
+        sketches = load_sketches(conn.execute(SELECT_SKETCHES, (user_id,)))
+    else:
+        # History logged before sketches existed, built on the next write.
+        sketches = sketches_from_durations(conn.execute(SELECT_DURATIONS, (user_id,)))
+    return summarize(sketches)
+
+
+def backfill(conn: Any) -> int:
+    """Rebuild the sketches of every user and return how many were rebuilt."""
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+    for user_id in user_ids:
+        rebuild(conn, user_id)
+    return len(user_ids)
+
+
+if __name__ == "__main__":  # pragma: no cover - command line entry point
+    import os
+    import sys
+
+    from .pool import create_pool
+
+    db_file = sys.argv[1] if len(sys.argv) > 1 else os.getenv("DB_FILE", "mindful.db")
+    pool = create_pool(os.getenv("DATABASE_URL"), db_file, max_size=1)
+    with pool.connection() as conn:
+        rebuilt = backfill(conn)
+    pool.close()
+    print(f"Rebuilt duration sketches for {rebuilt} users")
@@ -0,0 +1,176 @@
+"""Per-user session aggregates kept in the ``user_stats`` table.
+
+:func:`record_session` is called by :func:`src.mindful.log_session` in the
+same transaction as the session insert. Sessions logged in date order update
+the totals and streaks in place. A backdated session can change the streaks
+anywhere in the history, so the row is recomputed from ``sessions`` instead.
+Rows missing for users whose history predates the table are computed on
+first use.
+
+Streaks follow :func:`src.dashboard.calculate_current_streak`: the current
+streak is the run of consecutive days that ends at the most recent session.
+
+Every change also increments ``data_version``, which keys the cached
+analytics results in :mod:`src.cache`; call :func:`bump_data_version` after
+any other write to a user's sessions or moods.
+
+Run ``python -m src.stats [DB_FILE]`` to backfill or repair every row.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .transaction import commit
+
+SELECT_DATA_VERSION = "SELECT data_version FROM user_stats WHERE user_id = ?"
+
+SELECT_STATS = (
+    "SELECT total_minutes, session_count, first_session_date, last_session_date, "
+    "current_streak, longest_streak FROM user_stats WHERE user_id = ?"
+)
+
+_ONE_DAY = timedelta(days=1)
+
+
+def as_date(value: Any) -> Optional[date]:
+    """Return ``value`` as a ``date``; SQLite stores dates as text."""
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def as_dict(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Return a :data:`SELECT_STATS` row as a dict with ISO date strings."""
+    first, last = as_date(row[2]), as_date(row[3])
+    return {
+        "total_minutes": row[0],
+        "session_count": row[1],
+        "first_session_date": first.isoformat() if first else None,
+        "last_session_date": last.isoformat() if last else None,
+        "current_streak": row[4],
+        "longest_streak": row[5],
+    }
+
+
+def streaks(days: Iterable[date]) -> Tuple[int, int]:
+    """Return ``(current, longest)`` streaks for distinct ``days`` in ascending order."""
+    current = longest = 0
+    previous: Optional[date] = None
+    for day in days:
+        current = current + 1 if previous and day - previous == _ONE_DAY else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def _refresh(conn: Any, user_id: int) -> Tuple[Any, ...]:
+    cur = conn.execute(
+        "SELECT COALESCE(SUM(duration), 0), COUNT(*), MIN(session_date), "
+        "MAX(session_date) FROM sessions WHERE user_id = ?",
+        (user_id,),
+    )
+    total, count, first, last = cur.fetchone()
+    cur = conn.execute(
+        "SELECT DISTINCT session_date FROM sessions WHERE user_id = ? "
+        "ORDER BY session_date",
+        (user_id,),
+    )
+    current, longest = streaks(as_date(r[0]) for r in cur)
+    row = (total, count, as_date(first), as_date(last), current, longest)
+    conn.execute(
+        "INSERT INTO user_stats (user_id, total_minutes, session_count, "
+        "first_session_date, last_session_date, current_streak, longest_streak) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (user_id) DO UPDATE SET "
+        "total_minutes = excluded.total_minutes, "
+        "session_count = excluded.session_count, "
+        "first_session_date = excluded.first_session_date, "
+        "last_session_date = excluded.last_session_date, "
+        "current_streak = excluded.current_streak, "
+        "longest_streak = excluded.longest_streak, "
+        "data_version = user_stats.data_version + 1",
+        (user_id,) + tuple(v.isoformat() if isinstance(v, date) else v for v in row),
+    )
+    return row
+
+
+def record_session(conn: Any, user_id: int, duration: int, session_date: Any) -> None:
+    """Fold a newly inserted session into ``user_id``'s stats without committing."""
+    day = as_date(session_date)
+    # The increment locks the row, so concurrent writers serialize here.
+    row = conn.execute(
+        "UPDATE user_stats SET total_minutes = total_minutes + ?, "
+        "session_count = session_count + 1, data_version = data_version + 1 "
+        "WHERE user_id = ? "
+        "RETURNING last_session_date, current_streak, longest_streak",
+        (duration, user_id),
+    ).fetchone()
+    if row is None:
+        _refresh(conn, user_id)
+        return
+    last, current, longest = as_date(row[0]), row[1], row[2]
+    if last is not None and day < last:
+        _refresh(conn, user_id)
+        return
+    if last is None or day - last > _ONE_DAY:
+        current = 1
+    elif day - last == _ONE_DAY:
+        current += 1
+    conn.execute(
+        "UPDATE user_stats SET first_session_date = COALESCE(first_session_date, ?), "
+        "last_session_date = ?, current_streak = ?, longest_streak = ? "
+        "WHERE user_id = ?",
+        (day.isoformat(), day.isoformat(), current, max(longest, current), user_id),
+    )
+
+
+def bump_data_version(conn: Any, user_id: int) -> None:
+    """Mark ``user_id``'s session data as changed so cached results are dropped."""
+    cur = conn.execute(
+        "UPDATE user_stats SET data_version = data_version + 1 WHERE user_id = ?",
+        (user_id,),
+    )
+    if cur.rowcount == 0:
+        _refresh(conn, user_id)
+    commit(conn)
+
+
+def refresh_user_stats(conn: Any, user_id: int) -> Dict[str, Any]:
+    """Recompute ``user_id``'s stats from ``sessions`` and return them."""
+    row = _refresh(conn, user_id)
+    commit(conn)
+    return as_dict(row)
+
+
+def get_user_stats(conn: Any, user_id: int) -> Dict[str, Any]:
+    """Return ``user_id``'s stats, computing the row if it does not exist yet."""
+    row = conn.execute(SELECT_STATS, (user_id,)).fetchone()
+    if row is None:
+        return refresh_user_stats(conn, user_id)
+    return as_dict(row)
+
+
+def backfill(conn: Any, *, batch_size: int = 500) -> int:
+    """Recompute the stats of every user and return how many were updated."""
+    user_ids = [r[0] for r in conn.execute("SELECT id FROM users ORDER BY id")]
+    for start in range(0, len(user_ids), batch_size):
+        for user_id in user_ids[start : start + batch_size]:
+            _refresh(conn, user_id)
+        commit(conn)
+    return len(user_ids)
+
+
+if __name__ == "__main__":  # pragma: no cover - command line entry point
+    import os
+    import sys
+
+    from .pool import create_pool
+
+    db_file = sys.argv[1] if len(sys.argv) > 1 else os.getenv("DB_FILE", "mindful.db")
+    pool = create_pool(os.getenv("DATABASE_URL"), db_file, max_size=1)
+    with pool.connection() as conn:
+        updated = backfill(conn)
+    pool.close()
+    print(f"Recomputed stats for {updated} users")
@@ -4,6 +4,8 @@ from dataclasses import dataclass
 from typing import Optional, Any
 import sqlite3
 
+from .transaction import commit
+
 
 @dataclass
 class Subscription:
@@ -45,15 +47,15 @@ def subscribe_user(
         cur = conn.cursor()
         cur.execute(sql, params)
         cur.close()
-    conn.commit()
+    commit(conn)
+
+
+SELECT_TIER = "SELECT tier FROM subscriptions WHERE user_id = ?"
 
 
 def get_user_tier(conn: sqlite3.Connection, user_id: int) -> str:
     """Return the subscription tier for ``user_id`` or ``"free"`` if none."""
-    cur = conn.execute(
-        "SELECT tier FROM subscriptions WHERE user_id = ?",
-        (user_id,),
-    )
+    cur = conn.execute(SELECT_TIER, (user_id,))
     row = cur.fetchone()
     return row[0] if row else "free"
 
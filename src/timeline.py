@@ -0,0 +1,226 @@
+"""Fan-out-on-write feed timelines kept in ``feed_timelines``.
+
+Every ``activity_feed`` item gets a row for its author and, if the author's
+profile is public, one for each follower. Reading a feed is then a single
+range scan of the viewer's rows instead of a query over every followed
+user's activity. The rows follow the same visibility rule as the old
+query: a viewer sees their own items and the items of public users they
+follow. Follows, unfollows and visibility changes add or remove the
+affected author's rows.
+
+Feeds are paged with opaque cursors that encode the ``(timestamp, id)`` of
+the last item returned. The next page seeks past that key on the timeline
+index, so every page costs the same however deep the client scrolls.
+The comments and encouragements of a page's items are loaded with one more
+query, :func:`interactions_query`, instead of one call per item. Author
+names come from :mod:`src.user_cache` rather than a join on ``users``.
+
+None of the write helpers commit; they run inside the caller's write.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .user_cache import UserSummary
+
+_COLUMNS = (
+    "SELECT f.id, f.user_id, f.item_type, f.message, f.timestamp, "
+    "f.target_user_id, f.related_feed_item_id "
+)
+
+_SELECT_TIMELINE = (
+    _COLUMNS + "FROM feed_timelines t "
+    "JOIN activity_feed f ON f.id = t.feed_item_id "
+    "WHERE t.viewer_id = ?{seek} "
+    "ORDER BY t.timestamp DESC, t.feed_item_id DESC LIMIT ?"
+)
+
+SELECT_TIMELINE = _SELECT_TIMELINE.format(seek="")
+
+SELECT_ITEM = _COLUMNS + "FROM activity_feed f WHERE f.id = ?"
+
+SELECT_VIEWERS = "SELECT viewer_id FROM feed_timelines WHERE feed_item_id = ?"
+
+_INSERT = "INSERT INTO feed_timelines (viewer_id, feed_item_id, author_id, timestamp) "
+
+
+def fan_out(conn: Any, feed_item_id: int) -> None:
+    """Add a new ``activity_feed`` item to its author's and followers' timelines."""
+    conn.execute(
+        _INSERT + "SELECT user_id, id, user_id, timestamp FROM activity_feed "
+        "WHERE id = ?",
+        (feed_item_id,),
+    )
+    conn.execute(
+        _INSERT + "SELECT fo.follower_id, f.id, f.user_id, f.timestamp "
+        "FROM activity_feed f "
+        "JOIN users u ON u.id = f.user_id "
+        "JOIN follows fo ON fo.followed_id = f.user_id "
+        "WHERE f.id = ? AND u.is_public AND fo.follower_id <> f.user_id",
+        (feed_item_id,),
+    )
+
+
+def add_follow(conn: Any, follower_id: int, followed_id: int) -> None:
+    """Copy ``followed_id``'s existing items into ``follower_id``'s timeline."""
+    conn.execute(
+        _INSERT + "SELECT ?, f.id, f.user_id, f.timestamp FROM activity_feed f "
+        "JOIN users u ON u.id = f.user_id "
+        "WHERE f.user_id = ? AND u.is_public "
+        "ON CONFLICT (viewer_id, feed_item_id) DO NOTHING",
+        (follower_id, followed_id),
+    )
+
+
+def remove_follow(conn: Any, follower_id: int, followed_id: int) -> None:
+    """Drop ``followed_id``'s items from ``follower_id``'s timeline."""
+    if follower_id == followed_id:
+        return
+    conn.execute(
+        "DELETE FROM feed_timelines WHERE author_id = ? AND viewer_id = ?",
+        (followed_id, follower_id),
+    )
+
+
+def set_visibility(conn: Any, user_id: int, is_public: bool) -> None:
+    """Show or hide ``user_id``'s items in their followers' timelines."""
+    if is_public:
+        conn.execute(
+            _INSERT + "SELECT fo.follower_id, f.id, f.user_id, f.timestamp "
+            "FROM activity_feed f JOIN follows fo ON fo.followed_id = f.user_id "
+            "WHERE f.user_id = ? AND fo.follower_id <> f.user_id "
+            "ON CONFLICT (viewer_id, feed_item_id) DO NOTHING",
+            (user_id,),
+        )
+    else:
+        conn.execute(
+            "DELETE FROM feed_timelines WHERE author_id = ? AND viewer_id <> ?",
+            (user_id, user_id),
+        )
+
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _display_name(users: Mapping[int, UserSummary], user_id: int) -> Optional[str]:
+    summary = users.get(user_id)
+    return summary.display_name if summary is not None else None
+
+
+def feed_item(row: Sequence[Any], users: Mapping[int, UserSummary]) -> Dict[str, Any]:
+    """Return a :data:`SELECT_TIMELINE` or :data:`SELECT_ITEM` row as a dict.
+
+    ``users`` maps user ids to summaries, as returned by
+    :meth:`~src.user_cache.UserSummaryCache.get_many`.
+    """
+    return {
+        "item_id": row[0],
+        "user_id": row[1],
+        "user_display_name": _display_name(users, row[1]),
+        "item_type": row[2],
+        "message": row[3],
+        "timestamp": _iso(row[4]),
+        "target_user_id": row[5],
+        "related_feed_item_id": row[6],
+    }
+
+
+def encode_cursor(timestamp: Any, item_id: int) -> str:
+    """Return an opaque cursor pointing just after the given feed item."""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    raw = json.dumps([str(timestamp), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Return the ``(timestamp, id)`` key in ``cursor``.
+
+    Raises ``ValueError`` if the cursor was not made by :func:`encode_cursor`.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, item_id = json.loads(raw)
+        if not isinstance(item_id, int):
+            raise ValueError
+        return datetime.fromisoformat(timestamp), item_id
+    except (binascii.Error, TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid feed cursor") from None
+
+
+def page_query(
+    viewer_id: int, limit: int, cursor: Optional[str] = None
+) -> Tuple[str, tuple]:
+    """Return the query and parameters for one page of a viewer's timeline."""
+    if cursor is None:
+        return SELECT_TIMELINE, (viewer_id, limit)
+    timestamp, item_id = decode_cursor(cursor)
+    return (
+        _SELECT_TIMELINE.format(seek=" AND (t.timestamp, t.feed_item_id) < (?, ?)"),
+        (viewer_id, timestamp, item_id, limit),
+    )
+
+
+def interactions_query(item_ids: Sequence[int], comments: int) -> Tuple[str, tuple]:
+    """Return the query for the interactions on ``item_ids``.
+
+    Each row is ``(related_feed_item_id, item_type, total, rn, id, user_id,
+    message, timestamp)``, where ``rn`` numbers an item's
+    interactions of one type from newest. Every item and type gets its newest
+    row, which carries the ``total``, and comments also get the rows up to
+    ``rn = comments``.
+    """
+    placeholders = ",".join("?" for _ in item_ids)
+    return (
+        "SELECT related_feed_item_id, item_type, total, rn, id, user_id, "
+        "message, timestamp FROM ("
+        "SELECT f.related_feed_item_id, f.item_type, f.id, f.user_id, "
+        "f.message, f.timestamp, "
+        "COUNT(*) OVER (PARTITION BY f.related_feed_item_id, f.item_type) AS total, "
+        "ROW_NUMBER() OVER (PARTITION BY f.related_feed_item_id, f.item_type "
+        "ORDER BY f.timestamp DESC, f.id DESC) AS rn "
+        "FROM activity_feed f "
+        f"WHERE f.related_feed_item_id IN ({placeholders}) "
+        "AND f.item_type IN ('comment', 'encouragement')"
+        ") ranked WHERE rn = 1 OR (item_type = 'comment' AND rn <= ?) "
+        "ORDER BY related_feed_item_id, item_type, rn",
+        (*item_ids, comments),
+    )
+
+
+def attach_interactions(
+    items: List[Dict[str, Any]],
+    rows: Iterable[Sequence[Any]],
+    comments: int,
+    users: Mapping[int, UserSummary],
+) -> None:
+    """Add interaction counts and the newest comments to feed item dicts.
+
+    ``rows`` come from :func:`interactions_query` and ``users`` must cover
+    their authors. Each item gets ``comment_count``, ``encouragement_count``
+    and ``comments``, newest first.
+    """
+    by_id = {}
+    for item in items:
+        item.update(comment_count=0, encouragement_count=0, comments=[])
+        by_id[item["item_id"]] = item
+    for related_id, item_type, total, rn, *comment in rows:
+        item = by_id[related_id]
+        item[f"{item_type}_count"] = total
+        if item_type == "comment" and rn <= comments:
+            item_id, user_id, message, timestamp = comment
+            item["comments"].append(
+                {
+                    "item_id": item_id,
+                    "user_id": user_id,
+                    "user_display_name": _display_name(users, user_id),
+                    "message": message,
+                    "timestamp": _iso(timestamp),
+                }
+            )
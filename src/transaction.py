@@ -0,0 +1,94 @@
+"""Request-scoped units of work.
+
+Database helpers in ``src`` commit their own changes so they remain usable
+on their own. Inside :func:`unit_of_work` those commits are deferred: every
+helper called with the unit's connection joins one transaction that is
+committed once when the block exits, or rolled back if it raises. Pooled
+helpers such as :class:`~src.activity.ActivityFeed` borrow the unit's
+connection instead of checking out a separate one. Work that must only see
+committed data, such as notifying other clients, is registered with
+:func:`after_commit`. A :func:`savepoint` undoes part of a unit, along with
+the callbacks registered in it, without abandoning the rest.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional
+
+_current: ContextVar[Any] = ContextVar("unit_of_work_connection", default=None)
+_callbacks: ContextVar[Optional[List[Callable[[], None]]]] = ContextVar(
+    "unit_of_work_callbacks", default=None
+)
+
+
+def active_connection() -> Any:
+    """Return the connection of the enclosing unit of work, if any."""
+    return _current.get()
+
+
+def commit(conn: Any) -> None:
+    """Commit ``conn`` unless it belongs to the enclosing unit of work."""
+    if conn is not _current.get():
+        conn.commit()
+
+
+def after_commit(conn: Any, callback: Callable[[], None]) -> None:
+    """Call ``callback`` once ``conn``'s changes are committed.
+
+    Inside a unit of work on ``conn`` the call waits until the unit commits
+    and is dropped if it rolls back. Otherwise it happens immediately.
+    """
+    if conn is _current.get():
+        _callbacks.get().append(callback)
+    else:
+        callback()
+
+
+@contextmanager
+def unit_of_work(conn: Any) -> Iterator[Any]:
+    """Group the enclosed database writes into a single transaction.
+
+    Nested units on the same connection join the outer one.
+    """
+    if conn is _current.get():
+        yield conn
+        return
+    token = _current.set(conn)
+    callbacks: List[Callable[[], None]] = []
+    callbacks_token = _callbacks.set(callbacks)
+    try:
+        yield conn
+    except BaseException:
+        _current.reset(token)
+        _callbacks.reset(callbacks_token)
+        conn.rollback()
+        raise
+    _current.reset(token)
+    _callbacks.reset(callbacks_token)
+    conn.commit()
+    for callback in callbacks:
+        callback()
+
+
+@contextmanager
+def savepoint(conn: Any, name: str) -> Iterator[Any]:
+    """Run the enclosed writes in savepoint ``name``.
+
+    If the block raises, its writes are rolled back to the savepoint and the
+    :func:`after_commit` callbacks it registered are dropped before the
+    exception propagates. The enclosing transaction carries on.
+    """
+    callbacks = _callbacks.get() if conn is _current.get() else None
+    mark = len(callbacks) if callbacks is not None else 0
+    conn.execute(f"SAVEPOINT {name}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        conn.execute(f"RELEASE SAVEPOINT {name}")
+        if callbacks is not None:
+            del callbacks[mark:]
+        raise
+    conn.execute(f"RELEASE SAVEPOINT {name}")
@@ -0,0 +1,164 @@
+"""Bounded in-process cache of the ``users`` columns shown next to content.
+
+Feed items, comments and profiles all show a user's display name, photo and
+bio, and need their visibility. A :class:`UserSummaryCache` keeps those
+columns for recently seen users, so rendering a page reads each hot user row
+once instead of once per item. :meth:`UserSummaryCache.get_many` loads every
+missing user of a batch with one query.
+
+:mod:`src.profiles` and :mod:`src.auth` invalidate a user's entry once their
+write commits. Entries also expire after ``ttl`` seconds, which bounds how
+long a change made by another worker process can go unseen.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .transaction import after_commit
+
+
+class UserSummary(NamedTuple):
+    """The public-facing columns of a ``users`` row."""
+
+    user_id: int
+    display_name: Optional[str]
+    bio: Optional[str]
+    photo_url: Optional[str]
+    is_public: bool
+
+
+def summaries_query(user_ids: Iterable[int]) -> Tuple[str, tuple]:
+    """Return the query for the summaries of ``user_ids``."""
+    ids = tuple(user_ids)
+    placeholders = ",".join("?" for _ in ids)
+    return (
+        "SELECT id, display_name, bio, photo_url, is_public FROM users "
+        f"WHERE id IN ({placeholders})",
+        ids,
+    )
+
+
+def to_summary(row: Any) -> UserSummary:
+    """Return a :func:`summaries_query` row as a :class:`UserSummary`."""
+    return UserSummary(row[0], row[1], row[2], row[3], bool(row[4]))
+
+
+def load_summaries(conn: Any, user_ids: Iterable[int]) -> Dict[int, UserSummary]:
+    """Read the summaries of ``user_ids`` without a cache."""
+    ids = list(dict.fromkeys(user_ids))
+    if not ids:
+        return {}
+    rows = conn.execute(*summaries_query(ids)).fetchall()
+    return {row[0]: to_summary(row) for row in rows}
+
+
+class UserSummaryCache:
+    """Thread-safe LRU cache of :class:`UserSummary` rows with a TTL."""
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl: float = 60.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[int, Tuple[float, UserSummary]] = OrderedDict()
+        # Bumped by every invalidation so a load that raced one is not cached.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(
+        self, user_ids: Iterable[int]
+    ) -> Tuple[Dict[int, UserSummary], List[int], int]:
+        """Split ``user_ids`` into cached summaries and ids to load.
+
+        Returns the summaries found, the missing ids and a generation. Pass
+        the rows of :func:`summaries_query` for the missing ids and the
+        generation to :meth:`store`. :meth:`get_many` does both with a
+        synchronous connection.
+        """
+        found: Dict[int, UserSummary] = {}
+        missing: List[int] = []
+        now = self._clock()
+        with self._lock:
+            for user_id in dict.fromkeys(user_ids):
+                entry = self._entries.get(user_id)
+                if entry is not None and now < entry[0]:
+                    self._entries.move_to_end(user_id)
+                    found[user_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(user_id)
+                    self.misses += 1
+            generation = self._generation
+        return found, missing, generation
+
+    def store(self, rows: Iterable[Any], generation: int) -> Dict[int, UserSummary]:
+        """Cache ``rows`` from :func:`summaries_query` and return them by id.
+
+        Nothing is cached if an entry was invalidated since the
+        :meth:`lookup` that returned ``generation``, as the rows may predate
+        that write.
+        """
+        summaries = {row[0]: to_summary(row) for row in rows}
+        with self._lock:
+            if generation != self._generation:
+                return summaries
+            expires_at = self._clock() + self._ttl
+            for user_id, summary in summaries.items():
+                self._entries[user_id] = (expires_at, summary)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return summaries
+
+    def get_many(self, conn: Any, user_ids: Iterable[int]) -> Dict[int, UserSummary]:
+        """Return the summaries of ``user_ids``, loading the missing ones.
+
+        Users that do not exist are left out.
+        """
+        found, missing, generation = self.lookup(user_ids)
+        if missing:
+            rows = conn.execute(*summaries_query(missing)).fetchall()
+            found.update(self.store(rows, generation))
+        return found
+
+    def get(self, conn: Any, user_id: int) -> Optional[UserSummary]:
+        """Return ``user_id``'s summary, or ``None`` if there is no such user."""
+        return self.get_many(conn, [user_id]).get(user_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop ``user_id``'s entry in this process."""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def invalidate_after_commit(self, conn: Any, user_id: int) -> None:
+        """Drop ``user_id``'s entry once ``conn``'s changes are committed."""
+        after_commit(conn, lambda: self.invalidate(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters like :meth:`src.cache.ResultCache.stats`."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "ttl": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
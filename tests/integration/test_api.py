@@ -1,3 +1,5 @@
+import asyncio
+import json
 import os
 import sys
 import importlib
@@ -18,7 +20,8 @@ def create_client(db_path):
 def setup_client(tmp_path):
     client, module = create_client(tmp_path / "test.db")
     yield client
-    module.conn.close()
+    module.db_pool.close()
+    asyncio.run(module.async_db_pool.close())
 
 
 import pytest
@@ -73,11 +76,13 @@ def test_dashboard_empty_initially(client):
 def auth_headers(client, email: str, password: str, display_name: str = "User"):
     # Update the display name for the default user to simulate account details
     import backend.main as m
-    m.conn.execute(
-        "UPDATE users SET display_name = ? WHERE id = 1",
-        (display_name,),
-    )
-    m.conn.commit()
+
+    with m.db_pool.connection() as conn:
+        conn.execute(
+            "UPDATE users SET display_name = ? WHERE id = 1",
+            (display_name,),
+        )
+        conn.commit()
     return {}
 
 
@@ -118,7 +123,8 @@ def test_list_badges(client):
     import backend.main as m
     from src import challenges as challenges_mod
 
-    challenges_mod.award_badge(m.conn, 1, "Early Adopter")
+    with m.db_pool.connection() as conn:
+        challenges_mod.award_badge(conn, 1, "Early Adopter")
 
     resp = client.get("/users/me/badges", headers=headers)
     assert resp.status_code == 200
@@ -142,9 +148,9 @@ def test_private_challenge_crud_with_premium_check(client):
 
     headers = auth_headers(client, "premium@example.com", "pw")
     import backend.main as m
-    m.subscriptions.subscribe_user(
-        m.conn, 1, "premium", "2023-01-01"
-    )
+
+    with m.db_pool.connection() as conn:
+        m.subscriptions.subscribe_user(conn, 1, "premium", "2023-01-01")
 
     resp = client.post(
         "/users/me/private-challenges",
@@ -181,6 +187,7 @@ def test_private_challenge_crud_with_premium_check(client):
     resp = client.get("/users/me/private-challenges", headers=headers)
     assert resp.json() == []
 
+
 def test_public_profile_endpoint(client):
     headers = auth_headers(client, "profile@example.com", "pw", "ProfileUser")
     # log two sessions for user 1
@@ -206,6 +213,11 @@ def test_public_profile_endpoint(client):
         "Guided - 2023-01-01",
     ]
 
+    client.put("/users/me/bio", json={"bio": "Sits daily"})
+    assert client.get("/users/1/profile").json()["bio"] == "Sits daily"
+    assert client.get("/feed").json()[0]["user_display_name"] == "ProfileUser"
+    assert client.get("/metrics/cache").json()["users"]["hits"] >= 1
+
 
 def test_update_profile_visibility_endpoint(client):
     headers = auth_headers(client, "vis@example.com", "pw")
@@ -219,5 +231,394 @@ def test_update_profile_visibility_endpoint(client):
 
     import backend.main as m
 
-    cur = m.conn.execute("SELECT is_public FROM users WHERE id = 1")
-    assert cur.fetchone()[0] == 0
+    with m.db_pool.connection() as conn:
+        cur = conn.execute("SELECT is_public FROM users WHERE id = 1")
+        assert cur.fetchone()[0] == 0
+
+
+def test_private_profile_is_refused_despite_cached_summary(client):
+    import backend.main as m
+
+    with m.db_pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            ("other@example.com", "pw"),
+        )
+        conn.commit()
+    assert client.get("/users/2/profile").status_code == 200
+    # Made private by another worker, whose cache invalidation is not seen here.
+    with m.db_pool.connection() as conn:
+        conn.execute("UPDATE users SET is_public = 0 WHERE id = 2")
+        conn.commit()
+    assert client.get("/users/2/profile").status_code == 403
+    assert client.get("/metrics/cache").json()["users"]["hits"] >= 1
+
+
+def test_feed_and_analytics_endpoints(client):
+    client.post(
+        "/sessions",
+        json={
+            "date": "2023-01-01",
+            "duration": 10,
+            "type": "Guided",
+            "time": "06:00",
+            "location": "Home",
+            "moodBefore": 3,
+            "moodAfter": 7,
+        },
+    )
+
+    resp = client.get("/feed")
+    assert resp.status_code == 200
+    assert [item["message"] for item in resp.json()] == ["Guided 10m"]
+
+    resp = client.get("/analytics/me/time-of-day")
+    assert resp.json() == {"points": [{"hour": 6, "value": 1}]}
+    resp = client.get("/analytics/me/mood-correlation")
+    assert resp.json() == {"points": [{"mood_before": 3, "mood_after": 7}]}
+
+    session = {"date": "2023-01-02", "duration": 10, "type": "Zen", "moodBefore": 5}
+    client.post("/sessions", json=dict(session, moodAfter=200))
+    points = client.get("/analytics/me/mood-correlation").json()["points"]
+    assert {"mood_before": 5, "mood_after": 200} in points
+
+
+def test_feed_cursor_pagination(client, monkeypatch):
+    import backend.main as m
+
+    monkeypatch.setattr(m, "FEED_MAX_LIMIT", 3)
+    for minutes in range(1, 6):
+        client.post(
+            "/sessions",
+            json={"date": "2023-01-01", "duration": minutes, "type": "Zen"},
+        )
+
+    resp = client.get("/feed?limit=2")
+    assert [item["message"] for item in resp.json()] == ["Zen 5m", "Zen 4m"]
+    resp = client.get("/feed", params={"cursor": resp.headers["X-Next-Cursor"]})
+    assert [item["message"] for item in resp.json()] == ["Zen 3m", "Zen 2m", "Zen 1m"]
+    assert "X-Next-Cursor" not in resp.headers
+
+    assert len(client.get("/feed?limit=50").json()) == 3
+    assert client.get("/feed?limit=0").status_code == 422
+    assert client.get("/feed?cursor=bogus").status_code == 400
+
+
+def test_bulk_import_sessions(client):
+    body = (
+        "date,time,duration,type,location,moodBefore,moodAfter\n"
+        "2023-01-01,06:00,10,Guided,Home,3,7\n"
+        "2023-01-02,07:00,oops,Guided,Home,,\n"
+        "2023-01-03,08:00,20,Zen,Park,,\n"
+    )
+    resp = client.post(
+        "/sessions/bulk", content=body, headers={"Content-Type": "text/csv"}
+    )
+    assert resp.status_code == 200
+    report = resp.json()
+    assert report["inserted"] == 2
+    assert report["errors"] == [{"line": 3, "error": "duration must be an integer"}]
+
+    assert client.get("/dashboard/me").json()["total"] == 30
+    assert client.get("/feed").json() == []
+
+    resp = client.post("/sessions/bulk?format=xml", content="")
+    assert resp.status_code == 400
+
+
+def test_export_streams_user_history(client):
+    client.post(
+        "/sessions",
+        json={"date": "2023-01-01", "duration": 10, "type": "Guided", "moodAfter": 4},
+    )
+    resp = client.get("/users/me/export")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["record_type"] for r in records] == ["session", "badge"]
+    assert records[0]["mood_after"] == 4
+
+    resp = client.get("/users/me/export?format=csv")
+    assert resp.text.startswith("record_type,id,date")
+    assert client.get("/users/me/export?format=xml").status_code == 400
+
+
+def test_analytics_summary_endpoint(client):
+    for day, hour in (("2023-01-01", "06:00"), ("2023-01-01", "20:30")):
+        client.post(
+            "/sessions",
+            json={
+                "date": day,
+                "time": hour,
+                "duration": 10,
+                "type": "Guided",
+                "location": "Home",
+                "moodBefore": 3,
+                "moodAfter": 7,
+            },
+        )
+    resp = client.get("/analytics/me/summary")
+    assert resp.status_code == 200
+    summary = resp.json()
+    assert summary["consistency"] == [{"date_str": "2023-01-01", "value": 2}]
+    assert (
+        summary["time_of_day"]
+        == client.get("/analytics/me/time-of-day").json()["points"]
+    )
+    assert len(summary["mood_correlation"]) == 2
+
+    resp = client.get("/analytics/me/summary?fields=location_frequency")
+    assert resp.json() == {"location_frequency": [{"name": "Home", "value": 2}]}
+    assert client.get("/analytics/me/summary?fields=nope").status_code == 400
+
+
+def test_analytics_date_range_and_buckets(client):
+    for day in ("2023-01-02", "2023-01-03", "2023-01-10", "2023-02-01"):
+        client.post(
+            "/sessions",
+            json={"date": day, "time": "07:00", "duration": 10, "type": "Zen"},
+        )
+    resp = client.get("/analytics/me/consistency?from=2023-01-03&to=2023-01-31")
+    assert [p["date_str"] for p in resp.json()["points"]] == [
+        "2023-01-03",
+        "2023-01-10",
+    ]
+    resp = client.get("/analytics/me/consistency?bucket=month")
+    assert resp.json()["points"] == [
+        {"date_str": "2023-01-01", "value": 3},
+        {"date_str": "2023-02-01", "value": 1},
+    ]
+    resp = client.get("/analytics/me/time-of-day?from=2023-02-01")
+    assert resp.json()["points"] == [{"hour": 7, "value": 1}]
+    resp = client.get(
+        "/analytics/me/summary?fields=consistency&bucket=week&to=2023-01-09"
+    )
+    assert resp.json()["consistency"] == [{"date_str": "2023-01-02", "value": 2}]
+
+    assert client.get("/analytics/me/consistency?bucket=year").status_code == 400
+    resp = client.get("/analytics/me/mood-correlation?from=2023-02-01&to=2023-01-01")
+    assert resp.status_code == 400
+
+
+def test_analytics_cache_invalidated_by_new_session(client):
+    session = {"date": "2023-01-02", "time": "07:00", "duration": 10, "type": "Zen"}
+    client.post("/sessions", json=session)
+    first = client.get("/analytics/me/location-frequency").json()
+    assert client.get("/analytics/me/location-frequency").json() == first
+    metrics = client.get("/metrics/cache").json()["analytics"]
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 1
+
+    client.post("/sessions", json=dict(session, location="Park"))
+    resp = client.get("/analytics/me/location-frequency")
+    assert {"name": "Park", "value": 1} in resp.json()["points"]
+    assert client.get("/metrics/cache").json()["analytics"]["misses"] == 2
+
+
+def test_analytics_cache_invalidated_by_each_write_path(client, tmp_path, monkeypatch):
+    import backend.main as m
+
+    monkeypatch.setattr(m, "UPLOAD_DIR", tmp_path)
+    session = {"date": "2023-01-02", "time": "07:00", "duration": 10, "type": "Zen"}
+    session_id = client.post("/sessions", json=session).json()["session_id"]
+    writes = {
+        "log_session": lambda: client.post("/sessions", json=session),
+        "bulk import": lambda: client.post(
+            "/sessions/bulk?format=ndjson", content=json.dumps(session) + "\n"
+        ),
+        "photo upload": lambda: client.post(
+            f"/sessions/{session_id}/photo",
+            content=b"\x89PNG",
+            headers={"Content-Type": "image/png", "X-Filename": "calm.png"},
+        ),
+    }
+    for name, write in writes.items():
+        client.get("/analytics/me/time-of-day")
+        misses = client.get("/metrics/cache").json()["analytics"]["misses"]
+        assert write().status_code == 200, name
+        client.get("/analytics/me/time-of-day")
+        assert client.get("/metrics/cache").json()["analytics"]["misses"] == (
+            misses + 1
+        ), name
+
+
+def test_feed_embeds_interactions(client):
+    client.post("/sessions", json={"date": "2023-01-01", "duration": 10, "type": "Zen"})
+    item_id = client.get("/feed").json()[0]["item_id"]
+    for text in ("First", "Second"):
+        client.post(
+            f"/feed/{item_id}/comment", json={"feed_item_id": item_id, "text": text}
+        )
+    client.post(
+        f"/feed/{item_id}/encourage", json={"feed_item_id": item_id, "text": "Go"}
+    )
+
+    items = client.get("/feed?interactions=true&comments=1").json()
+    session = next(item for item in items if item["item_id"] == item_id)
+    assert session["comment_count"] == 2
+    assert session["encouragement_count"] == 1
+    assert [c["message"] for c in session["comments"]] == ["Second"]
+    assert "comment_count" not in client.get("/feed").json()[0]
+
+
+def test_feed_interactions_with_one_pooled_connection(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    fixture = setup_client(tmp_path)
+    client = next(fixture)
+    import backend.main as m
+
+    # Fail fast instead of waiting out the pool timeout if a handler nests borrows.
+    monkeypatch.setattr(m.db_pool, "_timeout", 1.0)
+    client.post("/sessions", json={"date": "2023-01-01", "duration": 10, "type": "Zen"})
+    item_id = client.get("/feed").json()[0]["item_id"]
+    for action in ("comment", "encourage"):
+        resp = client.post(
+            f"/feed/{item_id}/{action}", json={"feed_item_id": item_id, "text": "Hi"}
+        )
+        assert resp.status_code == 200
+    items = client.get("/feed?interactions=true").json()
+    item = next(item for item in items if item["item_id"] == item_id)
+    assert (item["comment_count"], item["encouragement_count"]) == (1, 1)
+    next(fixture, None)
+
+
+def test_feed_stream_pushes_new_items(client, monkeypatch):
+    import backend.main as m
+
+    monkeypatch.setattr(m, "FEED_STREAM_HEARTBEAT", 0.01)
+
+    async def scenario():
+        response = await m.stream_user_feed(1)
+        assert response.media_type == "text/event-stream"
+        events = response.body_iterator
+        assert (await events.__anext__()).startswith("retry:")
+        assert await events.__anext__() == ": heartbeat\n\n"
+        m.feed.log_session(1, "Zen 10m")
+        message = await events.__anext__()
+        await events.aclose()
+        return message
+
+    message = asyncio.run(scenario())
+    assert message.startswith("event: item\n")
+    assert json.loads(message.split("data: ", 1)[1])["message"] == "Zen 10m"
+    assert client.get("/metrics/cache").json()["feed_stream"]["subscriptions"] == 0
+
+
+def test_follow_updates_follow_graph(client):
+    import backend.main as m
+
+    with m.db_pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            ("friend@example.com", "pw"),
+        )
+        friend_id = conn.execute(
+            "SELECT id FROM users WHERE email = ?", ("friend@example.com",)
+        ).fetchone()[0]
+        conn.commit()
+
+    assert client.post("/follow", json={"followed_id": friend_id}).status_code == 200
+    with m.db_pool.connection() as conn:
+        assert m.follow_graph.is_following(conn, 1, friend_id)
+        client.post("/unfollow", json={"followed_id": friend_id})
+        assert not m.follow_graph.is_following(conn, 1, friend_id)
+    metrics = client.get("/metrics/cache").json()["follow_graph"]
+    assert metrics["misses"] == 1
+    assert metrics["hits"] >= 1
+
+
+def test_analytics_chart_images(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHART_WORKERS", "0")
+    fixture = setup_client(tmp_path)
+    client = next(fixture)
+    client.post(
+        "/sessions",
+        json={"date": "2023-01-02", "time": "07:00", "duration": 10, "type": "Zen"},
+    )
+    resp = client.get("/analytics/me/charts/time-of-day")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/png"
+    assert resp.content.startswith(b"\x89PNG")
+    etag = resp.headers["etag"]
+    resp = client.get(
+        "/analytics/me/charts/time-of-day", headers={"If-None-Match": etag}
+    )
+    assert resp.status_code == 304
+
+    resp = client.get("/analytics/me/charts/consistency?format=svg&bucket=week")
+    assert resp.headers["content-type"].startswith("image/svg+xml")
+    assert client.get("/analytics/me/charts/pie").status_code == 404
+    assert client.get("/analytics/me/charts/consistency?format=gif").status_code == 400
+    next(fixture, None)
+
+
+def test_mood_stats_endpoint(client):
+    empty = client.get("/analytics/me/mood-stats").json()
+    assert empty["overall"]["count"] == 0
+    assert empty["overall"]["mean_improvement"] is None
+    assert empty["by_type"] == []
+    for before, after, kind in ((3, 6, "Zen"), (4, 6, "Zen"), (5, 5, "Guided")):
+        client.post(
+            "/sessions",
+            json={
+                "date": "2023-01-02",
+                "duration": 10,
+                "type": kind,
+                "moodBefore": before,
+                "moodAfter": after,
+            },
+        )
+    stats = client.get("/analytics/me/mood-stats").json()
+    assert stats["overall"]["count"] == 3
+    assert stats["overall"]["mean_improvement"] == pytest.approx(5 / 3)
+    zen = next(t for t in stats["by_type"] if t["session_type"] == "Zen")
+    assert zen["mean_improvement"] == pytest.approx(2.5)
+    assert zen["effect_size"] == pytest.approx(2.5 / 0.5**0.5)
+
+
+def test_community_benchmarks_endpoint(client):
+    from src import community
+
+    assert client.get("/community/benchmarks").json() == {
+        "computed_at": None,
+        "by_type": [],
+        "by_hour": [],
+        "by_weekday": [],
+    }
+    client.post(
+        "/sessions",
+        json={"date": "2023-01-02", "time": "07:00", "duration": 18, "type": "Zen"},
+    )
+    community.run(None, os.environ["DB_FILE"], workers=0)
+    data = client.get("/community/benchmarks").json()
+    assert data["computed_at"] is not None
+    assert data["by_hour"] == [
+        {
+            "key": "7",
+            "session_count": 1,
+            "user_count": 1,
+            "avg_minutes": 18.0,
+            "mean_improvement": None,
+            "median_minutes": pytest.approx(18, rel=0.01),
+            "p90_minutes": pytest.approx(18, rel=0.01),
+        }
+    ]
+    assert data["by_weekday"][0]["key"] == "0"
+
+
+def test_duration_percentiles_require_premium(client):
+    for duration in (10, 20, 30):
+        client.post(
+            "/sessions",
+            json={"date": "2023-01-02", "duration": duration, "type": "Zen"},
+        )
+    assert client.get("/analytics/me/durations").status_code == 403
+
+    import backend.main as m
+
+    with m.db_pool.connection() as conn:
+        m.subscriptions.subscribe_user(conn, 1, "premium", "2023-01-01")
+    data = client.get("/analytics/me/durations").json()
+    assert data["overall"]["count"] == 3
+    assert data["overall"]["median"] == pytest.approx(20, rel=0.01)
+    assert data["by_type"][0]["session_type"] == "Zen"
@@ -1,7 +1,8 @@
 import sqlite3
 
-from src import mindful
+from src import mindful, relationships
 from src.activity import ActivityFeed
+from src.follow_graph import FollowGraph
 
 
 def setup_db():
@@ -19,8 +20,8 @@ def setup_db():
 def test_activity_feed():
     conn = setup_db()
     feed = ActivityFeed(conn)
-    feed.add_friend(1, 2)
-    feed.add_friend(1, 3)
+    relationships.follow_user(conn, 1, 2)
+    relationships.follow_user(conn, 1, 3)
 
     feed.log_session(2, "Morning meditation")
     feed.add_comment(3, 2, "Great job!")
@@ -30,3 +31,29 @@ def test_activity_feed():
     items = feed.get_feed(1)
     assert len(items) == 3
     assert [i.item_type for i in items] == ["encouragement", "comment", "session"]
+
+
+def test_activity_feed_cursor():
+    conn = setup_db()
+    feed = ActivityFeed(conn)
+    relationships.follow_user(conn, 1, 2)
+    for idx in range(5):
+        feed.log_session(2, f"Session {idx}")
+
+    first = feed.get_feed(1, limit=3)
+    rest = feed.get_feed(1, limit=3, cursor=first[-1].cursor)
+    assert [i.message for i in first + rest] == [
+        f"Session {i}" for i in range(4, -1, -1)
+    ]
+    assert feed.get_feed(1, cursor=rest[-1].cursor) == []
+
+
+def test_activity_feed_uses_follow_graph():
+    conn = setup_db()
+    graph = FollowGraph()
+    feed = ActivityFeed(conn, graph)
+    feed.log_session(2, "Followed")
+    feed.log_session(3, "Not followed")
+    relationships.follow_user(conn, 1, 2, graph)
+
+    assert [i.message for i in feed.get_feed(1)] == ["Followed"]
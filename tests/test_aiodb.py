@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from src import mindful
+from src.aiodb import AsyncConnectionPool, create_async_pool
+
+
+def test_sqlite_adapter_executes_and_runs_sync_helpers(tmp_path):
+    async def scenario():
+        pool = create_async_pool(None, str(tmp_path / "async.db"))
+        async with pool.connection() as conn:
+            await conn.run_sync(mindful.init_db)
+            await conn.execute(
+                "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+                ("user@example.com", "hash"),
+            )
+            await conn.commit()
+            session_id = await conn.run_sync(
+                mindful.log_session,
+                1,
+                10,
+                "Zen",
+                "2023-01-01",
+                mood_before=3,
+                mood_after=6,
+            )
+            cur = await conn.execute(
+                "SELECT duration FROM sessions WHERE id = ?", (session_id,)
+            )
+            row = await cur.fetchone()
+        await pool.close()
+        return row
+
+    assert asyncio.run(scenario()) == (10,)
+
+
+def test_async_pool_waits_for_release():
+    class FakeConn:
+        async def rollback(self):
+            pass
+
+        async def close(self):
+            pass
+
+        def is_closed(self):
+            return False
+
+    async def connect():
+        return FakeConn()
+
+    async def scenario():
+        pool = AsyncConnectionPool(connect, max_size=1, timeout=1.0)
+        first = await pool.acquire()
+        waiter = asyncio.ensure_future(pool.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await pool.release(first)
+        second = await waiter
+        assert second is first
+        await pool.release(second)
+        assert pool.size == 1
+
+    asyncio.run(scenario())
+
+
+def test_async_pool_times_out():
+    class FakeConn:
+        def is_closed(self):
+            return False
+
+    async def connect():
+        return FakeConn()
+
+    async def scenario():
+        pool = AsyncConnectionPool(connect, max_size=1, timeout=0.05)
+        await pool.acquire()
+        with pytest.raises(TimeoutError):
+            await pool.acquire()
+
+    asyncio.run(scenario())
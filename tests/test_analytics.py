@@ -1,5 +1,7 @@
 from datetime import date, time
 
+import pytest
+
 from src import analytics
 from src.sessions import MeditationSession
 
@@ -58,3 +60,59 @@ def test_location_frequency():
     sessions = sample_sessions()
     result = analytics.location_frequency(sessions)
     assert result == {"Home": 2, "Park": 1}
+
+
+def as_rows(sessions):
+    return [
+        (
+            s.session_date.isoformat(),
+            s.time_of_day.isoformat(timespec="minutes"),
+            s.location,
+            s.mood_before,
+            s.mood_after,
+        )
+        for s in sessions
+    ]
+
+
+def test_summarize_rows_matches_individual_functions():
+    sessions = sample_sessions()
+    summary = analytics.summarize_rows(as_rows(sessions))
+    assert summary == {
+        "consistency": analytics.consistency_over_time(sessions),
+        "mood_correlation": analytics.mood_correlation_points(sessions),
+        "time_of_day": analytics.time_of_day_distribution(sessions),
+        "location_frequency": analytics.location_frequency(sessions),
+    }
+
+
+def test_summarize_rows_computes_only_selected_fields():
+    rows = as_rows(sample_sessions()) + [("2023-01-02", None, None, 1, None)]
+    summary = analytics.summarize_rows(rows, ["time_of_day", "location_frequency"])
+    assert summary == {
+        "time_of_day": {0: 1, 6: 1, 7: 1, 20: 1},
+        "location_frequency": {"": 1, "Home": 2, "Park": 1},
+    }
+    with pytest.raises(ValueError):
+        analytics.summarize_rows(rows, ["streaks"])
+
+
+def test_bucket_counts():
+    counts = {
+        date(2023, 1, 1): 1,  # Sunday
+        date(2023, 1, 2): 2,  # Monday
+        date(2023, 1, 8): 1,
+        date(2023, 2, 1): 4,
+    }
+    assert analytics.bucket_counts(counts, "day") == counts
+    assert analytics.bucket_counts(counts, "week") == {
+        date(2022, 12, 26): 1,
+        date(2023, 1, 2): 3,
+        date(2023, 1, 30): 4,
+    }
+    assert analytics.bucket_counts(counts, "month") == {
+        date(2023, 1, 1): 4,
+        date(2023, 2, 1): 4,
+    }
+    with pytest.raises(ValueError):
+        analytics.bucket_counts(counts, "year")
@@ -0,0 +1,107 @@
+import random
+import sqlite3
+from datetime import date, time, timedelta
+
+from src import analytics, mindful
+from src.sessions import MeditationSession
+
+
+def random_db(seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    for email in ("a@example.com", "b@example.com"):
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)", (email, "hash")
+        )
+    for _ in range(300):
+        day = date(2022, 1, 1) + timedelta(days=rng.randint(0, 400))
+        clock = rng.choice(
+            [None, "", f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"]
+            + [f"{rng.randint(0, 23):02d}:15:30"]
+        )
+        location = rng.choice([None, "", "Home", "Park", "home", "Émile's"])
+        conn.execute(
+            "INSERT INTO sessions (user_id, duration, session_type, session_date, "
+            "session_time, location) VALUES (?, ?, ?, ?, ?, ?)",
+            (rng.choice([1, 1, 2]), 10, "Zen", day.isoformat(), clock, location),
+        )
+    conn.commit()
+    return conn
+
+
+def load_sessions(conn, user_id):
+    # Mirrors the row decoding done by the API before these queries existed.
+    rows = conn.execute(
+        "SELECT duration, session_type, session_date, session_time, location "
+        "FROM sessions WHERE user_id = ?",
+        (user_id,),
+    )
+    return [
+        MeditationSession(
+            duration_minutes=r[0],
+            meditation_type=r[1],
+            session_date=date.fromisoformat(r[2]),
+            time_of_day=time.fromisoformat(r[3]) if r[3] else time(0, 0),
+            location=r[4] or "",
+        )
+        for r in rows
+    ]
+
+
+def test_sql_aggregations_match_python_reference():
+    for seed in range(5):
+        conn = random_db(seed)
+        for user_id in (1, 2, 3):
+            sessions = load_sessions(conn, user_id)
+            assert analytics.query_consistency_over_time(
+                conn, user_id
+            ) == analytics.consistency_over_time(sessions)
+            assert analytics.query_time_of_day_distribution(
+                conn, user_id
+            ) == analytics.time_of_day_distribution(sessions)
+            assert analytics.query_location_frequency(
+                conn, user_id
+            ) == analytics.location_frequency(sessions)
+
+
+def test_sql_aggregations_preserve_key_order():
+    conn = random_db(0)
+    sessions = load_sessions(conn, 1)
+    assert list(analytics.query_location_frequency(conn, 1)) == list(
+        analytics.location_frequency(sessions)
+    )
+    assert list(analytics.query_consistency_over_time(conn, 1)) == list(
+        analytics.consistency_over_time(sessions)
+    )
+
+
+def test_date_window_matches_filtered_reference():
+    conn = random_db(3)
+    start, end = date(2022, 3, 1), date(2022, 6, 30)
+    assert analytics.session_filter(1, start, end)[1] == (1, start, end)
+    sessions = [s for s in load_sessions(conn, 1) if start <= s.session_date <= end]
+    assert analytics.query_consistency_over_time(
+        conn, 1, start, end
+    ) == analytics.consistency_over_time(sessions)
+    assert analytics.query_time_of_day_distribution(
+        conn, 1, start, end
+    ) == analytics.time_of_day_distribution(sessions)
+    assert analytics.query_location_frequency(
+        conn, 1, end=end
+    ) == analytics.location_frequency(
+        [s for s in load_sessions(conn, 1) if s.session_date <= end]
+    )
+
+
+def test_bucketed_consistency_sums_days():
+    conn = random_db(4)
+    daily = analytics.query_consistency_over_time(conn, 1)
+    for bucket in ("week", "month"):
+        buckets = analytics.query_consistency_over_time(conn, 1, bucket=bucket)
+        assert sum(buckets.values()) == sum(daily.values())
+        assert list(buckets) == sorted(buckets)
+        for day, count in buckets.items():
+            assert count == sum(
+                c for d, c in daily.items() if analytics.bucket_start(d, bucket) == day
+            )
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from src import mindful
+from src.activity import ActivityFeed
+from src.batcher import WriteBatcher
+from src.pool import create_pool
+from src.transaction import after_commit
+
+
+def setup_pool(path, max_size=2):
+    pool = create_pool(None, str(path), max_size=max_size, timeout=1.0)
+    with pool.connection() as conn:
+        mindful.init_db(conn)
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            ("user@example.com", "hash"),
+        )
+        conn.commit()
+    return pool
+
+
+def test_concurrent_writes_share_a_batch_and_return_ids(tmp_path):
+    pool = setup_pool(tmp_path / "batch.db")
+    batcher = WriteBatcher(pool, max_delay=0.2, max_batch=10)
+    start = threading.Barrier(10)
+    futures = []
+
+    def submit(i):
+        start.wait()
+        futures.append(
+            batcher.submit(mindful.log_session, 1, i + 1, "Zen", "2023-01-01")
+        )
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ids = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert len(set(ids)) == 10
+    assert batcher.writes == 10
+    assert batcher.batches < 10
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 10
+    pool.close()
+
+
+def test_failed_write_only_rolls_back_itself(tmp_path):
+    pool = setup_pool(tmp_path / "batch.db")
+    feed = ActivityFeed(pool)
+    batcher = WriteBatcher(pool, max_delay=0.2, max_batch=3)
+
+    def log_then_fail(conn):
+        mindful.log_session(conn, 1, 5, "Zen", "2023-01-01")
+        raise ValueError("bad row")
+
+    ok = batcher.submit(mindful.log_session, 1, 10, "Zen", "2023-01-01")
+    bad = batcher.submit(log_then_fail)
+    item = batcher.submit(lambda _conn: feed.log_session(1, "Zen 10m"))
+    assert ok.result(timeout=5)
+    assert item.result(timeout=5)
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    batcher.close()
+
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT duration FROM sessions").fetchall()
+        feed_rows = conn.execute("SELECT COUNT(*) FROM activity_feed").fetchone()[0]
+    assert rows == [(10,)]
+    assert feed_rows == 1
+    pool.close()
+
+
+def test_failed_write_drops_its_after_commit_callbacks(tmp_path):
+    pool = setup_pool(tmp_path / "batch.db")
+    batcher = WriteBatcher(pool, max_delay=0.2, max_batch=3)
+    calls = []
+
+    def notify_then_fail(conn):
+        after_commit(conn, lambda: calls.append("failed"))
+        raise ValueError("bad row")
+
+    ok = batcher.submit(lambda conn: after_commit(conn, lambda: calls.append("ok")))
+    bad = batcher.submit(notify_then_fail)
+    ok.result(timeout=5)
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    batcher.close()
+    assert calls == ["ok"]
+    pool.close()
+
+
+def test_close_flushes_queue_and_rejects_new_writes(tmp_path):
+    pool = setup_pool(tmp_path / "batch.db")
+    batcher = WriteBatcher(pool, max_delay=5.0, max_batch=100)
+    future = batcher.submit(mindful.log_session, 1, 10, "Zen", "2023-01-01")
+    batcher.close()
+    assert future.done()
+    with pytest.raises(RuntimeError):
+        batcher.submit(mindful.log_session, 1, 10, "Zen", "2023-01-01")
+    pool.close()
@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from src import mindful, relationships
+from src.activity import ActivityFeed
+from src.broker import OVERFLOW, FeedBroker, encode_event
+from src.transaction import unit_of_work
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    mindful.init_db(conn)
+    for idx in range(1, 4):
+        conn.execute(
+            "INSERT INTO users (email, password_hash, display_name) VALUES (?, ?, ?)",
+            (f"user{idx}@example.com", "pw", f"User {idx}"),
+        )
+    conn.commit()
+    return conn
+
+
+def test_publish_from_another_thread_reaches_subscribers():
+    async def scenario():
+        broker = FeedBroker()
+        first = broker.subscribe(1)
+        second = broker.subscribe(2)
+        assert broker.listening() == {1, 2}
+        thread = threading.Thread(target=broker.publish, args=([1], {"item_id": 7}))
+        thread.start()
+        thread.join()
+        assert await first.get(1) == {"item_id": 7}
+        assert await second.get(0.01) is None
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        assert broker.listening() == set()
+        return broker.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["published"] == 1
+    assert stats["delivered"] == 1
+    assert stats["subscriptions"] == 0
+
+
+def test_slow_subscriber_overflows_instead_of_buffering():
+    async def scenario():
+        broker = FeedBroker(queue_size=2)
+        subscription = broker.subscribe(1)
+        for idx in range(5):
+            broker.publish([1], idx)
+        await asyncio.sleep(0)
+        assert await subscription.get(1) is OVERFLOW
+        assert await subscription.get(0.01) is None
+        broker.unsubscribe(subscription)
+        return broker.stats()
+
+    assert asyncio.run(scenario())["overflows"] == 1
+
+
+def test_activity_feed_publishes_committed_items_to_viewers():
+    conn = setup_db()
+    broker = FeedBroker()
+    feed = ActivityFeed(conn, broker=broker)
+    relationships.follow_user(conn, 2, 1)
+
+    async def scenario():
+        follower = broker.subscribe(2)
+        stranger = broker.subscribe(3)
+        with pytest.raises(RuntimeError):
+            with unit_of_work(conn):
+                feed.log_session(1, "Rolled back")
+                raise RuntimeError("boom")
+        item_id = feed.log_session(1, "Zen 10m")
+        event = await follower.get(1)
+        assert event["item_id"] == item_id
+        assert event["user_display_name"] == "User 1"
+        assert event["message"] == "Zen 10m"
+        assert await follower.get(0.01) is None
+        assert await stranger.get(0.01) is None
+
+    asyncio.run(scenario())
+
+
+def test_encode_event():
+    assert encode_event({"a": 1}, event="item") == 'event: item\ndata: {"a": 1}\n\n'
+    with pytest.raises(ValueError):
+        FeedBroker(queue_size=0)
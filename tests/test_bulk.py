@@ -0,0 +1,172 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from src import bulk, mindful, mood_stats, stats
+from src.aiodb import AsyncSQLiteConnection
+
+
+def setup_db(path):
+    conn = sqlite3.connect(str(path))
+    mindful.init_db(conn)
+    conn.execute(
+        "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+        ("user@example.com", "hash"),
+    )
+    conn.commit()
+    return conn
+
+
+def parse(fmt, lines):
+    parser = bulk.RowParser(fmt)
+    rows, errors = [], []
+    for line in lines:
+        try:
+            row = parser.feed(line)
+        except bulk.RowError as exc:
+            errors.append((exc.line, str(exc)))
+            continue
+        if row is not None:
+            rows.append(row)
+    return rows, errors
+
+
+def test_ndjson_rows_are_validated_per_line():
+    rows, errors = parse(
+        "ndjson",
+        [
+            '{"date": "2023-01-01", "duration": 10, "type": "Zen", "moodBefore": 2}',
+            "",
+            '{"date": "01/02/2023", "duration": 10, "type": "Zen"}',
+            '{"date": "2023-01-03", "duration": -5, "type": "Zen"}',
+            "not json",
+            '{"date": "2023-01-04", "duration": 5, "type": "Zen", "colour": "red"}',
+        ],
+    )
+    assert rows == [bulk.SessionRow("2023-01-01", None, 10, "Zen", None, None, 2, None)]
+    assert [line for line, _ in errors] == [3, 4, 5, 6]
+    assert "date" in errors[0][1]
+    assert "duration" in errors[1][1]
+
+
+def test_csv_rows_with_quoted_newlines():
+    rows, errors = parse(
+        "csv",
+        [
+            "date,time,duration,type,notes,moodAfter",
+            '2023-01-01,07:30,15,Breathing,"calm,',
+            'then sleepy",4',
+            "2023-01-02,,abc,Breathing,,",
+            "2023-01-03,,5,Body Scan,,",
+        ],
+    )
+    assert rows == [
+        bulk.SessionRow(
+            "2023-01-01", "07:30", 15, "Breathing", None, "calm,\nthen sleepy", None, 4
+        ),
+        bulk.SessionRow("2023-01-03", None, 5, "Body Scan", None, None, None, None),
+    ]
+    assert errors == [(4, "duration must be an integer")]
+
+
+def test_unterminated_csv_record_is_reported():
+    parser = bulk.RowParser("csv")
+    parser.feed("date,duration,type,notes")
+    assert parser.feed('2023-01-01,5,Zen,"open') is None
+    with pytest.raises(bulk.RowError) as exc:
+        parser.close()
+    assert exc.value.line == 2
+
+
+def test_insert_rows_links_moods_to_reserved_ids(tmp_path):
+    conn = setup_db(tmp_path / "bulk.db")
+    first = mindful.log_session(conn, 1, 10, "Zen", "2022-12-31")
+    rows = [
+        bulk.SessionRow("2023-01-01", None, 10, "Zen", None, None, 1, 3),
+        bulk.SessionRow("2023-01-02", None, 20, "Zen", None, None, None, None),
+        bulk.SessionRow("2023-01-03", None, 30, "Zen", None, None, 2, 5),
+    ]
+    assert bulk.insert_rows(conn, 1, rows) == 3
+    assert not conn.in_transaction
+    assert conn.execute(
+        "SELECT s.duration, m.mood_before, m.mood_after FROM moods m "
+        "JOIN sessions s ON s.id = m.session_id ORDER BY s.id"
+    ).fetchall() == [(10, 1, 3), (30, 2, 5)]
+    assert mood_stats.get_mood_stats(conn, 1)["overall"]["mean_improvement"] == 2.5
+    # Regular inserts continue after the reserved ids.
+    assert mindful.log_session(conn, 1, 5, "Zen", "2023-01-04") == first + 4
+    assert conn.execute("SELECT COUNT(*) FROM activity_feed").fetchone()[0] == 0
+
+
+def test_import_stream_commits_in_chunks(tmp_path, monkeypatch):
+    refreshed = []
+    refresh = stats.refresh_user_stats
+    monkeypatch.setattr(
+        stats,
+        "refresh_user_stats",
+        lambda conn, user_id: refreshed.append(user_id) or refresh(conn, user_id),
+    )
+    path = tmp_path / "bulk.db"
+    setup_db(path).close()
+    lines = [
+        f'{{"date": "2023-01-{day:02d}", "duration": {day}, "type": "Zen"}}'
+        for day in range(1, 8)
+    ]
+    lines.insert(3, '{"date": "2023-01-01"}')
+    body = ("\n".join(lines) + "\n").encode()
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start : start + 7]
+
+    async def run():
+        conn = await AsyncSQLiteConnection.open(lambda: sqlite3.connect(str(path)))
+        try:
+            return await bulk.import_stream(conn, 1, chunks(), chunk_size=3)
+        finally:
+            await conn.close()
+
+    report = asyncio.run(run())
+    assert report["inserted"] == 7
+    assert report["failed"] == 1
+    assert report["errors"][0]["line"] == 4
+    conn = sqlite3.connect(str(path))
+    assert conn.execute("SELECT SUM(duration) FROM sessions").fetchone()[0] == 28
+    assert refreshed == [1]
+    assert stats.get_user_stats(conn, 1)["total_minutes"] == 28
+
+
+def test_failed_chunk_is_rolled_back_before_stats_refresh(tmp_path, monkeypatch):
+    path = tmp_path / "bulk.db"
+    setup_db(path).close()
+    record = mood_stats.record_moods
+    calls = []
+
+    def fail_second_chunk(conn, user_id, rows):
+        calls.append(user_id)
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        record(conn, user_id, rows)
+
+    monkeypatch.setattr(mood_stats, "record_moods", fail_second_chunk)
+    body = "".join(
+        f'{{"date": "2023-01-0{day}", "duration": 10, "type": "Zen"}}\n'
+        for day in range(1, 5)
+    ).encode()
+
+    async def chunks():
+        yield body
+
+    async def run():
+        conn = await AsyncSQLiteConnection.open(lambda: sqlite3.connect(str(path)))
+        try:
+            await bulk.import_stream(conn, 1, chunks(), chunk_size=2)
+        finally:
+            await conn.close()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    conn = sqlite3.connect(str(path))
+    assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 2
+    assert stats.get_user_stats(conn, 1)["session_count"] == 2
@@ -0,0 +1,48 @@
+import pytest
+
+from src.cache import MISSING, ResultCache
+
+
+def test_get_requires_matching_version():
+    cache = ResultCache()
+    cache.put(1, "consistency", 3, {"a": 1})
+    assert cache.get(1, "consistency", 3) == {"a": 1}
+    assert cache.get(1, "consistency", 4) is MISSING
+    # A stale entry is dropped rather than kept around.
+    assert cache.get(1, "consistency", 3) is MISSING
+    assert cache.get(2, "consistency", 3) is MISSING
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResultCache(ttl=10, clock=clock)
+    cache.put(1, "k", 0, "value")
+    clock.now = 9.9
+    assert cache.get(1, "k", 0) == "value"
+    clock.now = 10.0
+    assert cache.get(1, "k", 0) is MISSING
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.put(1, "a", 0, "a")
+    cache.put(1, "b", 0, "b")
+    cache.get(1, "a", 0)
+    cache.put(1, "c", 0, "c")
+    assert cache.get(1, "b", 0) is MISSING
+    assert cache.get(1, "a", 0) == "a"
+    assert cache.get(1, "c", 0) == "c"
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == pytest.approx(3 / 4)
+
+
+def test_invalidate_drops_only_that_user():
+    cache = ResultCache()
+    cache.put(1, "a", 0, "a")
+    cache.put(2, "a", 0, "b")
+    cache.invalidate(1)
+    assert cache.get(1, "a", 0) is MISSING
+    assert cache.get(2, "a", 0) == "b"
@@ -0,0 +1,50 @@
+import pytest
+
+from src import charts
+from src.charts import ChartRenderer
+
+POINTS = {
+    "consistency": [("2023-01-01", 2), ("2023-01-03", 1)],
+    "mood-correlation": [(3, 6), (4, 7)],
+    "time-of-day": [(7, 2), (21, 1)],
+    "location-frequency": [("Home", 2), ("Park", 1)],
+}
+
+
+def test_render_every_chart_as_png_and_svg():
+    for kind, points in POINTS.items():
+        assert charts.render_chart(kind, points, "png").startswith(b"\x89PNG")
+        assert b"<svg" in charts.render_chart(kind, points, "svg")
+    assert charts.render_chart("time-of-day", [], "png").startswith(b"\x89PNG")
+    with pytest.raises(ValueError):
+        charts.render_chart("pie", [], "png")
+    with pytest.raises(ValueError):
+        charts.render_chart("time-of-day", [], "gif")
+
+
+def test_renderer_caches_by_data_hash():
+    renderer = ChartRenderer(0)
+    key, first = renderer.render("time-of-day", POINTS["time-of-day"])
+    same_key, again = renderer.render("time-of-day", [[7, 2], [21, 1]])
+    other_key, _ = renderer.render("time-of-day", [(7, 3)])
+    assert key == same_key != other_key
+    assert again is first
+    assert first.result().startswith(b"\x89PNG")
+    assert (renderer.hits, renderer.misses) == (1, 2)
+    renderer.close()
+
+
+def test_failed_renders_are_not_cached():
+    renderer = ChartRenderer(0)
+    _, image = renderer.render("pie", [])
+    with pytest.raises(ValueError):
+        image.result()
+    assert renderer.stats()["entries"] == 0
+    renderer.close()
+
+
+def test_renderer_uses_worker_processes():
+    renderer = ChartRenderer(1)
+    _, image = renderer.render("location-frequency", POINTS["location-frequency"])
+    assert image.result(timeout=60).startswith(b"\x89PNG")
+    renderer.close()
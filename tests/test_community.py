@@ -0,0 +1,120 @@
+import random
+import sqlite3
+from collections import defaultdict
+from datetime import date, time, timedelta
+
+import pytest
+
+from src import community, mindful
+from src.sketches import RELATIVE_ACCURACY
+
+
+def random_db(path, users=12, sessions=400):
+    rng = random.Random(5)
+    conn = sqlite3.connect(path)
+    mindful.init_db(conn)
+    for i in range(users):
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            (f"{i}@x.com", "h"),
+        )
+    for _ in range(sessions):
+        mindful.log_session(
+            conn,
+            rng.randint(1, users),
+            rng.randint(5, 60),
+            rng.choice(["Zen", "Guided", "Body Scan"]),
+            (date(2023, 1, 1) + timedelta(days=rng.randint(0, 30))).isoformat(),
+            rng.choice([None, "", f"{rng.randint(0, 23):02d}:30"]),
+            mood_before=rng.choice([None, rng.randint(1, 10)]),
+            mood_after=rng.choice([None, rng.randint(1, 10)]),
+        )
+    return conn
+
+
+def reference(conn):
+    totals = defaultdict(lambda: [0, 0, set(), 0, 0])
+    rows = conn.execute(
+        "SELECT s.user_id, s.duration, s.session_type, s.session_date, "
+        "s.session_time, m.mood_before, m.mood_after FROM sessions s "
+        "LEFT JOIN moods m ON s.id = m.session_id"
+    )
+    for user, duration, kind, day, clock, before, after in rows:
+        hour = time.fromisoformat(clock).hour if clock else 0
+        weekday = date.fromisoformat(day).weekday()
+        for key in (("type", kind), ("hour", str(hour)), ("weekday", str(weekday))):
+            entry = totals[key]
+            entry[0] += 1
+            entry[1] += duration
+            entry[2].add(user)
+            if before is not None and after is not None:
+                entry[3] += 1
+                entry[4] += after - before
+    return {k: [v[0], v[1], len(v[2]), v[3], v[4]] for k, v in totals.items()}
+
+
+def stored(conn):
+    return {
+        (r[0], r[1]): list(r[2:7])
+        for r in conn.execute(community.SELECT_COMMUNITY_STATS)
+    }
+
+
+def test_sharded_run_matches_single_pass_reference(tmp_path):
+    path = str(tmp_path / "community.db")
+    conn = random_db(path)
+    expected = reference(conn)
+    for shard_size in (1, 5, 100):
+        written = community.run(None, path, workers=0, shard_size=shard_size)
+        assert written == len(expected)
+        assert stored(conn) == expected
+
+
+def test_duration_percentiles_are_within_sketch_accuracy(tmp_path):
+    path = str(tmp_path / "community.db")
+    conn = random_db(path)
+    community.run(None, path, workers=0, shard_size=4)
+    for kind, median, p90 in conn.execute(
+        "SELECT bucket, median_minutes, p90_minutes FROM community_stats "
+        "WHERE dimension = 'type'"
+    ):
+        durations = sorted(
+            r[0]
+            for r in conn.execute(
+                "SELECT duration FROM sessions WHERE session_type = ?", (kind,)
+            )
+        )
+        for q, estimate in ((0.5, median), (0.9, p90)):
+            exact = durations[int(q * (len(durations) - 1))]
+            assert abs(estimate - exact) <= RELATIVE_ACCURACY * exact + 1e-9
+
+
+def test_run_in_worker_processes(tmp_path):
+    path = str(tmp_path / "community.db")
+    conn = random_db(path, users=6, sessions=60)
+    community.run(None, path, workers=2, shard_size=2)
+    assert stored(conn) == reference(conn)
+
+
+def test_aggregate_rows_accepts_large_moods():
+    rows = [(1, 10, "Zen", "2023-01-02", "07:00", None, 5, 200)]
+    partial = community.aggregate_rows(rows)
+    assert partial[("type", "Zen")][3:5] == [1, 195]
+
+
+def test_benchmarks_from_rows_orders_buckets():
+    stamp = "2023-02-01T00:00:00+00:00"
+    result = community.benchmarks_from_rows(
+        [
+            ("hour", "10", 2, 30, 1, 0, 0, 15.0, 20.0, stamp),
+            ("hour", "7", 4, 40, 2, 2, 3, 10.0, 12.0, stamp),
+            ("type", "Zen", 1, 20, 1, 1, -1, 20.0, 20.0, stamp),
+        ]
+    )
+    assert result["computed_at"] == stamp
+    assert [b["key"] for b in result["by_hour"]] == ["7", "10"]
+    assert result["by_hour"][0]["avg_minutes"] == 10
+    assert result["by_hour"][0]["mean_improvement"] == pytest.approx(1.5)
+    assert result["by_hour"][1]["mean_improvement"] is None
+    assert result["by_hour"][0]["p90_minutes"] == 12.0
+    assert result["by_weekday"] == []
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import sqlite3
+from datetime import time
+
+import pytest
+
+from src import challenges, export, mindful
+from src.notifications import NotificationManager
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    for email in ("user@example.com", "other@example.com"):
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)", (email, "hash")
+        )
+    conn.commit()
+    mindful.log_session(
+        conn, 1, 10, "Zen", "2023-01-02", "07:00", "Home", mood_before=2, mood_after=4
+    )
+    mindful.log_session(conn, 1, 20, "Breathing", "2023-01-01")
+    mindful.log_session(conn, 2, 30, "Zen", "2023-01-01")
+    challenges.award_badge(conn, 1, "First Session Completed")
+    NotificationManager(conn).add_notification(1, time(7, 0), "Breathe")
+    type_id = mindful.add_custom_meditation_type(conn, 1, "Walking")
+    return conn, type_id
+
+
+def test_ndjson_export_contains_only_the_users_records():
+    conn, type_id = setup_db()
+    text = "".join(export.stream_export(conn, 1, batch_size=1))
+    records = [json.loads(line) for line in text.splitlines()]
+
+    assert [r["record_type"] for r in records] == [
+        "session",
+        "session",
+        "badge",
+        "notification",
+        "custom_type",
+    ]
+    assert records[0]["date"] == "2023-01-01"
+    assert records[1]["mood_after"] == 4
+    assert records[2]["badge_name"] == "First Session Completed"
+    assert records[3]["message"] == "Breathe"
+    assert records[4] == {
+        "record_type": "custom_type",
+        "id": type_id,
+        "type_name": "Walking",
+    }
+
+
+def test_csv_export_streams_one_chunk_per_batch():
+    conn, _ = setup_db()
+    chunks = list(export.stream_export(conn, 1, "csv", batch_size=1))
+    # Header with the first session, then one chunk per remaining record.
+    assert len(chunks) == 5
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert list(rows[0]) == list(export.CSV_COLUMNS)
+    assert [r["record_type"] for r in rows].count("session") == 2
+    assert rows[1]["duration"] == "10" and rows[1]["badge_name"] == ""
+
+
+def test_csv_export_for_user_without_data_has_header_only():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    assert list(export.stream_export(conn, 1, "csv")) == [
+        ",".join(export.CSV_COLUMNS) + "\r\n"
+    ]
+
+
+def test_unknown_format_is_rejected():
+    conn = sqlite3.connect(":memory:")
+    with pytest.raises(ValueError):
+        list(export.stream_export(conn, 1, "xml"))
@@ -1,7 +1,10 @@
+import random
 from datetime import date, time
 
+import pytest
+
 from src.sessions import MeditationSession
-from src.feed import build_feed
+from src.feed import build_feed, iter_feed
 
 
 def sample_sessions() -> dict[int, list[MeditationSession]]:
@@ -30,3 +33,42 @@ def test_feed_shows_own_sessions():
     privacy = {1: False, 2: False}
     feed = build_feed(1, sessions, privacy)
     assert any(entry.user_id == 1 for entry in feed)
+
+
+def random_sessions(users: int, per_user: int, seed: int = 0):
+    rng = random.Random(seed)
+    sessions = {}
+    for user_id in range(1, users + 1):
+        stamps = sorted(
+            (
+                date(2023, 1, rng.randint(1, 28)),
+                time(rng.randint(0, 23), rng.randint(0, 59)),
+            )
+            for _ in range(per_user)
+        )
+        sessions[user_id] = [
+            MeditationSession(10, "Zen", at, day, "Home") for day, at in stamps
+        ]
+    return sessions
+
+
+def keys(feed):
+    return [(e.user_id, e.session.session_date, e.session.time_of_day) for e in feed]
+
+
+def test_limited_feed_is_the_top_of_the_full_feed():
+    sessions = random_sessions(30, 8)
+    privacy = {user_id: user_id % 3 != 0 for user_id in sessions}
+    full = build_feed(3, sessions, privacy)
+    for limit in (0, 1, 20, 1000):
+        limited = build_feed(3, sessions, privacy, limit=limit)
+        assert [k[1:] for k in keys(limited)] == [k[1:] for k in keys(full)][:limit]
+        assert len(limited) == min(limit, len(full))
+    assert sorted(keys(iter_feed(3, sessions, privacy))) == sorted(keys(full))
+
+
+def test_iter_feed_rejects_unsorted_sessions():
+    sessions = sample_sessions()
+    sessions[1] = list(reversed(random_sessions(1, 5)[1]))
+    with pytest.raises(ValueError):
+        list(iter_feed(1, sessions, {}))
@@ -0,0 +1,102 @@
+import random
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from src import mindful, relationships, subscriptions
+from src.follow_graph import FollowGraph
+from src.transaction import unit_of_work
+
+USERS = range(1, 9)
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    for idx in USERS:
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            (f"user{idx}@example.com", "pw"),
+        )
+        subscriptions.subscribe_user(conn, idx, "premium", "2023-01-01")
+    conn.commit()
+    return conn
+
+
+def test_graph_matches_follows_table():
+    conn = setup_db()
+    graph = FollowGraph(max_edges=10)
+    rng = random.Random(5)
+    for _ in range(300):
+        follower, followed = rng.sample(list(USERS), 2)
+        if rng.random() < 0.6:
+            relationships.follow_user(conn, follower, followed, graph)
+        else:
+            relationships.unfollow_user(conn, follower, followed, graph)
+        user = rng.choice(USERS)
+        assert list(graph.following(conn, user)) == relationships.get_following(
+            conn, user
+        )
+        assert list(graph.followers(conn, user)) == relationships.get_followers(
+            conn, user
+        )
+        assert graph.is_following(conn, follower, followed) == (
+            followed in relationships.get_following(conn, follower)
+        )
+        assert graph.stats()["edges"] <= 10
+    stats = graph.stats()
+    assert stats["hits"] and stats["misses"] and stats["evictions"]
+
+
+def test_rows_expire_after_ttl(clock):
+    conn = setup_db()
+    graph = FollowGraph(ttl=10, clock=clock)
+    assert graph.count_following(conn, 1) == 0
+    # A follow made by another worker.
+    relationships.follow_user(conn, 1, 2)
+    assert graph.count_following(conn, 1) == 0
+    clock.now = 11
+    assert graph.count_following(conn, 1) == 1
+    assert graph.count_followers(conn, 2) == 1
+
+
+def test_rows_change_only_when_the_unit_of_work_commits():
+    conn = setup_db()
+    graph = FollowGraph()
+    assert not graph.is_following(conn, 1, 2)
+    with pytest.raises(RuntimeError):
+        with unit_of_work(conn):
+            relationships.follow_user(conn, 1, 2, graph)
+            raise RuntimeError("boom")
+    assert list(graph.following(conn, 1)) == relationships.get_following(conn, 1) == []
+
+    with unit_of_work(conn):
+        relationships.follow_user(conn, 1, 2, graph)
+        assert not graph.is_following(conn, 1, 2)
+    assert graph.is_following(conn, 1, 2)
+
+
+def test_free_tier_limit_is_checked_against_the_table(monkeypatch):
+    monkeypatch.setattr(relationships, "FREE_TIER_FRIEND_LIMIT", 3)
+    conn = setup_db()
+    conn.execute("DELETE FROM subscriptions WHERE user_id = 1")
+    graph = FollowGraph()
+    for followed in (2, 3, 4):
+        relationships.follow_user(conn, 1, followed, graph)
+    with pytest.raises(HTTPException):
+        relationships.follow_user(conn, 1, 8, graph)
+    # A stale full row does not refuse once the table has room.
+    conn.execute("DELETE FROM follows WHERE follower_id = 1 AND followed_id = 2")
+    relationships.follow_user(conn, 1, 8, graph)
+    assert graph.is_following(conn, 1, 8)
+
+    # Nor does a stale row with room let follows made elsewhere exceed it.
+    conn.execute("DELETE FROM subscriptions WHERE user_id = 2")
+    assert graph.count_following(conn, 2) == 0
+    conn.executemany(
+        "INSERT INTO follows (follower_id, followed_id) VALUES (2, ?)",
+        [(3,), (4,), (5,)],
+    )
+    with pytest.raises(HTTPException):
+        relationships.follow_user(conn, 2, 6, graph)
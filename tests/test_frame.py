@@ -0,0 +1,90 @@
+import random
+from datetime import date, time, timedelta
+
+import numpy as np
+
+from src import analytics, dashboard, frame
+from src.frame import SessionFrame
+from src.sessions import MeditationSession
+
+
+def random_sessions(seed, count=500):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    return [
+        MeditationSession(
+            duration_minutes=rng.randint(1, 90),
+            meditation_type=rng.choice(["Zen", "Guided", "Body Scan"]),
+            time_of_day=time(rng.randint(0, 23), rng.randint(0, 59)),
+            session_date=start + timedelta(days=rng.randint(0, 60)),
+            location=rng.choice(["", "Home", "Park", "home", "Büro"]),
+            mood_before=rng.choice([None, rng.randint(1, 10)]),
+            mood_after=rng.choice([None, rng.randint(1, 10)]),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_vectorized_functions_match_reference():
+    for seed in range(5):
+        sessions = random_sessions(seed)
+        f = SessionFrame.from_sessions(sessions)
+        assert frame.calculate_total_time(f) == dashboard.calculate_total_time(sessions)
+        assert frame.calculate_session_count(f) == len(sessions)
+        assert frame.calculate_current_streak(f) == dashboard.calculate_current_streak(
+            sessions
+        )
+        assert frame.consistency_over_time(f) == analytics.consistency_over_time(
+            sessions
+        )
+        assert frame.mood_correlation_points(f) == analytics.mood_correlation_points(
+            sessions
+        )
+        assert frame.time_of_day_distribution(f) == analytics.time_of_day_distribution(
+            sessions
+        )
+        assert list(frame.location_frequency(f).items()) == list(
+            analytics.location_frequency(sessions).items()
+        )
+
+
+def test_from_rows_decodes_database_values():
+    rows = [
+        (10, "Zen", "2023-01-02", "07:45:00", "Home", 3, 6),
+        (20, "Guided", "2023-01-01", None, None, None, 4),
+        (5, "Zen", "2023-01-02", "", "Home", 2, None),
+    ]
+    f = SessionFrame.from_rows(rows)
+    assert f.durations.dtype == np.int32
+    assert f.hours.tolist() == [7, 0, 0]
+    assert f.days.tolist() == [
+        date(2023, 1, 2).toordinal(),
+        date(2023, 1, 1).toordinal(),
+        date(2023, 1, 2).toordinal(),
+    ]
+    assert [f.types[c] for c in f.type_codes] == ["Zen", "Guided", "Zen"]
+    assert frame.location_frequency(f) == {"": 1, "Home": 2}
+    assert frame.mood_correlation_points(f) == [(3, 6)]
+    assert frame.calculate_current_streak(f) == 2
+
+
+def test_moods_outside_a_small_scale_are_kept():
+    rows = [
+        (10, "Zen", "2023-01-02", None, None, 3, 200),
+        (10, "Zen", "2023-01-03", None, None, -300, 4),
+        (10, "Zen", "2023-01-04", None, None, None, 10),
+    ]
+    assert frame.mood_correlation_points(SessionFrame.from_rows(rows)) == [
+        (3, 200),
+        (-300, 4),
+    ]
+
+
+def test_empty_frame():
+    f = SessionFrame.from_rows([])
+    assert len(f) == 0
+    assert frame.calculate_total_time(f) == 0
+    assert frame.calculate_current_streak(f) == 0
+    assert frame.consistency_over_time(f) == {}
+    assert frame.time_of_day_distribution(f) == {}
+    assert frame.location_frequency(f) == {}
@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+from src import migrations, mindful
+
+
+def index_names(conn):
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    return {r[0] for r in rows}
+
+
+def test_migrations_apply_once():
+    conn = sqlite3.connect(":memory:")
+    latest = migrations.discover("sqlite")[-1].version
+
+    applied = migrations.migrate(conn)
+    assert applied == [m.version for m in migrations.discover("sqlite")]
+    assert migrations.current_version(conn) == latest
+    assert migrations.migrate(conn) == []
+
+
+def test_existing_baseline_database_is_upgraded(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "old.db"))
+    # Databases created before versioning only ran the baseline script.
+    conn.executescript(migrations.discover("sqlite")[0].sql)
+    conn.execute(
+        "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+        ("user@example.com", "hash"),
+    )
+    conn.commit()
+
+    mindful.init_db(conn)
+    assert "idx_sessions_user_date" in index_names(conn)
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+
+
+def test_hot_path_queries_use_indexes():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    plans = {
+        "sessions": "SELECT duration FROM sessions WHERE user_id = ?",
+        "moods": "SELECT mood_before FROM moods WHERE session_id = ?",
+        "feed": "SELECT id FROM activity_feed WHERE user_id IN (?, ?) "
+        "ORDER BY timestamp DESC, id DESC LIMIT 20",
+        "badges": "SELECT badge_name FROM badges WHERE user_id = ? ORDER BY awarded_at",
+    }
+    for name, query in plans.items():
+        detail = " ".join(
+            r[-1]
+            for r in conn.execute(
+                f"EXPLAIN QUERY PLAN {query}", (1, 2)[: query.count("?")]
+            )
+        )
+        assert "USING INDEX" in detail or "USING COVERING INDEX" in detail, name
+
+
+def test_statement_splitting_ignores_comments():
+    sql = "-- header\nCREATE TABLE a (x INTEGER);\n-- trailing comment\n"
+    assert migrations._statements(sql, "sqlite") == [
+        "-- header\nCREATE TABLE a (x INTEGER);"
+    ]
+    assert migrations._statements(sql, "postgres") == [
+        "-- header\nCREATE TABLE a (x INTEGER);"
+    ]
+
+
+@pytest.mark.parametrize(
+    "dialect, migration",
+    [
+        (dialect, migration)
+        for dialect in ("sqlite", "postgres")
+        for migration in migrations.discover(dialect)
+    ],
+    ids=lambda value: getattr(value, "name", value),
+)
+def test_shipped_migrations_split_into_sql_statements(dialect, migration):
+    keywords = ("CREATE", "ALTER", "INSERT", "UPDATE", "DELETE", "DROP", "WITH")
+    statements = migrations._statements(migration.sql, dialect)
+    assert statements
+    for statement in statements:
+        code = "\n".join(
+            line
+            for line in statement.splitlines()
+            if line.strip() and not line.strip().startswith("--")
+        )
+        assert code.lstrip().upper().startswith(keywords), code
+
+
+def test_postgres_splitting_ignores_semicolons_in_comments_and_strings():
+    sql = (
+        "-- covers a; not b\nCREATE TABLE a (x TEXT DEFAULT ';');\n"
+        "/* block; comment */ INSERT INTO a VALUES ($$x;y$$);\n"
+    )
+    assert migrations._statements(sql, "postgres") == [
+        "-- covers a; not b\nCREATE TABLE a (x TEXT DEFAULT ';');",
+        "/* block; comment */ INSERT INTO a VALUES ($$x;y$$);",
+    ]
@@ -0,0 +1,115 @@
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src import mindful, mood_stats
+from src.migrations import MIGRATIONS_DIR
+from src.mood_stats import MoodMoments
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    conn.execute(
+        "INSERT INTO users (email, password_hash) VALUES (?, ?)", ("a@x.com", "h")
+    )
+    conn.commit()
+    return conn
+
+
+def log_random_sessions(conn, seed, count=200):
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(count):
+        session_type = rng.choice(["Zen", "Guided", "Body Scan"])
+        before = rng.choice([None, rng.randint(1, 10)])
+        after = rng.choice([None, rng.randint(1, 10)])
+        mindful.log_session(
+            conn,
+            1,
+            10,
+            session_type,
+            f"2023-01-{i % 28 + 1:02d}",
+            mood_before=before,
+            mood_after=after,
+        )
+        if before is not None and after is not None:
+            pairs.append((session_type, before, after))
+    return pairs
+
+
+def reference(pairs):
+    before = np.array([p[1] for p in pairs], dtype=float)
+    after = np.array([p[2] for p in pairs], dtype=float)
+    delta = after - before
+    return {
+        "count": len(pairs),
+        "mean_before": before.mean(),
+        "mean_after": after.mean(),
+        "mean_improvement": delta.mean(),
+        "improvement_sd": delta.std(ddof=1),
+        "correlation": np.corrcoef(before, after)[0, 1],
+        "effect_size": delta.mean() / delta.std(ddof=1),
+    }
+
+
+def assert_stats_close(actual, expected):
+    assert actual["overall"] == pytest.approx(expected["overall"])
+    assert [r["session_type"] for r in actual["by_type"]] == [
+        r["session_type"] for r in expected["by_type"]
+    ]
+    for row, want in zip(actual["by_type"], expected["by_type"]):
+        assert row == pytest.approx(want)
+
+
+def test_incremental_stats_match_batch_reference():
+    conn = setup_db()
+    pairs = log_random_sessions(conn, 1)
+    result = mood_stats.get_mood_stats(conn, 1)
+    assert result["overall"] == pytest.approx(reference(pairs))
+    for row in result["by_type"]:
+        expected = reference([p for p in pairs if p[0] == row["session_type"]])
+        assert {k: v for k, v in row.items() if k != "session_type"} == (
+            pytest.approx(expected)
+        )
+
+
+def test_rebuild_and_migration_backfill_match_incremental():
+    conn = setup_db()
+    log_random_sessions(conn, 2)
+    incremental = mood_stats.get_mood_stats(conn, 1)
+
+    mood_stats.rebuild(conn, 1)
+    assert_stats_close(mood_stats.get_mood_stats(conn, 1), incremental)
+
+    conn.execute("DELETE FROM mood_stats")
+    sql = (MIGRATIONS_DIR / "sqlite" / "0005_mood_stats.sql").read_text()
+    conn.execute(sql[sql.index("INSERT INTO mood_stats") :])
+    assert_stats_close(mood_stats.get_mood_stats(conn, 1), incremental)
+
+
+def test_merge_matches_sequential_adds():
+    rng = random.Random(3)
+    pairs = [(rng.randint(1, 10), rng.randint(1, 10)) for _ in range(50)]
+    left = right = whole = MoodMoments()
+    for b, a in pairs[:20]:
+        left = left.add(b, a)
+    for b, a in pairs[20:]:
+        right = right.add(b, a)
+    for b, a in pairs:
+        whole = whole.add(b, a)
+    assert left.merge(right) == pytest.approx(whole)
+    assert MoodMoments().merge(whole) == whole
+
+
+def test_degenerate_inputs_have_no_ratios():
+    assert MoodMoments().summary()["mean_improvement"] is None
+    single = MoodMoments().add(4, 6).summary()
+    assert single["mean_improvement"] == 2
+    assert single["correlation"] is None
+    assert single["effect_size"] is None
+    constant = MoodMoments().add(4, 6).add(5, 7).summary()
+    assert constant["improvement_sd"] == 0
+    assert constant["effect_size"] is None
@@ -0,0 +1,102 @@
+from src.pgutil import PGConnectionWrapper, numbered_query, translate_query
+
+
+class FakeCursor:
+    def __init__(self, log, fail_on=None):
+        self._log = log
+        self._fail_on = fail_on
+        self.closed = False
+        self.description = None
+        self.rownumber = 0
+        self.rowcount = -1
+
+    def execute(self, query, params=None):
+        if self._fail_on and query.startswith(self._fail_on):
+            raise RuntimeError("cannot prepare")
+        self._log.append((query, params))
+        if query.startswith(("SELECT", "EXECUTE")):
+            self.description = [("col",)]
+            self.rowcount = 1
+            self.rownumber = 0
+
+    def fetchone(self):
+        self.rownumber += 1
+        return (1,)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    autocommit = False
+
+    def __init__(self, fail_on=None):
+        self.log = []
+        self.cursors = 0
+        self._fail_on = fail_on
+
+    def cursor(self):
+        self.cursors += 1
+        return FakeCursor(self.log, self._fail_on)
+
+
+def test_translation_is_memoized():
+    query = "SELECT tier FROM subscriptions WHERE user_id = ?"
+    assert translate_query(query) == "SELECT tier FROM subscriptions WHERE user_id = %s"
+    assert translate_query(query) is translate_query(query)
+    assert numbered_query("UPDATE t SET a = ? WHERE b = ?") == (
+        "UPDATE t SET a = $1 WHERE b = $2",
+        2,
+    )
+
+
+def test_hot_statements_are_prepared():
+    raw = FakeConnection()
+    conn = PGConnectionWrapper(raw, prepare_threshold=2)
+    query = "SELECT tier FROM subscriptions WHERE user_id = ?"
+
+    conn.execute(query, (1,)).fetchone()
+    assert raw.log[-1] == ("SELECT tier FROM subscriptions WHERE user_id = %s", (1,))
+
+    conn.execute(query, (2,)).fetchone()
+    executed = [q for q, _ in raw.log]
+    assert (
+        "PREPARE mc_stmt_1 AS SELECT tier FROM subscriptions WHERE user_id = $1"
+        in executed
+    )
+    assert raw.log[-1] == ("EXECUTE mc_stmt_1 (%s)", (2,))
+
+    conn.execute(query, (3,)).fetchone()
+    assert raw.log[-1] == ("EXECUTE mc_stmt_1 (%s)", (3,))
+    assert conn.prepared_statements == 1
+
+
+def test_prepared_statements_are_bounded():
+    raw = FakeConnection()
+    conn = PGConnectionWrapper(raw, prepare_threshold=1, max_prepared=2)
+    for idx in range(3):
+        conn.execute(f"SELECT {idx} FROM users WHERE id = ?", (1,)).fetchone()
+    assert conn.prepared_statements == 2
+    assert ("DEALLOCATE mc_stmt_1", None) in raw.log
+
+
+def test_failed_prepare_falls_back_to_plain_execution():
+    raw = FakeConnection(fail_on="PREPARE")
+    conn = PGConnectionWrapper(raw, prepare_threshold=1)
+    query = "SELECT id FROM users WHERE ? IS NULL"
+    conn.execute(query, (None,)).fetchone()
+    assert ("ROLLBACK TO SAVEPOINT mc_prepare", None) in raw.log
+    assert raw.log[-1] == ("SELECT id FROM users WHERE %s IS NULL", (None,))
+    assert conn.prepared_statements == 0
+
+
+def test_every_execute_returns_a_new_cursor():
+    raw = FakeConnection()
+    conn = PGConnectionWrapper(raw, prepare_threshold=1, max_prepared=1)
+    update = conn.execute("UPDATE users SET bio = ? WHERE id = ?", ("", 1))
+    select = conn.execute("SELECT 1 FROM users WHERE id = ?", (1,))
+    select.fetchone()
+    later = conn.execute("SELECT 2 FROM users WHERE id = ?", (1,))
+    assert len({id(update), id(select), id(later)}) == 3
+    # Preparing and deallocating share one cursor that is never returned.
+    assert raw.cursors == 4
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from src import mindful, relationships
+from src.activity import ActivityFeed
+from src.pool import ConnectionPool, borrow, create_pool
+
+
+def test_sqlite_pool_uses_wal_and_reuses_connections(tmp_path):
+    pool = create_pool(None, str(tmp_path / "pool.db"), max_size=2)
+    with pool.connection() as conn:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        first = conn
+    assert mode == "wal"
+    with pool.connection() as conn:
+        assert conn is first
+    assert pool.size == 1
+    pool.close()
+
+
+def test_pool_is_bounded(tmp_path):
+    pool = create_pool(None, str(tmp_path / "pool.db"), max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+    pool.close()
+
+
+def test_broken_connection_is_replaced():
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(":memory:")
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(connect, max_size=1)
+    with pool.connection() as conn:
+        conn.close()
+    # Rolling back a closed connection fails so it is discarded, not reused.
+    assert pool.size == 0
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    assert len(opened) == 2
+
+
+def test_failed_health_check_reconnects():
+    pool = ConnectionPool(
+        lambda: sqlite3.connect(":memory:"), max_size=1, check=lambda c: False
+    )
+    with pool.connection() as conn:
+        first = conn
+    with pool.connection() as conn:
+        assert conn is not first
+    assert pool.size == 1
+
+
+def test_managers_borrow_from_pool(tmp_path):
+    pool = create_pool(None, str(tmp_path / "pool.db"))
+    with pool.connection() as conn:
+        mindful.init_db(conn)
+        for idx in range(1, 3):
+            conn.execute(
+                "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+                (f"user{idx}@example.com", "pw"),
+            )
+        conn.commit()
+
+    feed = ActivityFeed(pool)
+    with pool.connection() as conn:
+        relationships.follow_user(conn, 1, 2)
+    feed.log_session(2, "Morning meditation")
+    assert [i.message for i in feed.get_feed(1)] == ["Morning meditation"]
+    assert pool.idle == pool.size
+    pool.close()
+
+
+def test_borrow_passes_plain_connections_through():
+    conn = sqlite3.connect(":memory:")
+    with borrow(conn) as borrowed:
+        assert borrowed is conn
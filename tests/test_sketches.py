@@ -0,0 +1,131 @@
+import random
+import sqlite3
+
+import pytest
+
+from src import mindful, sketches
+from src.sketches import RELATIVE_ACCURACY, DurationSketch
+
+QUANTILES = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+
+
+def exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def assert_accurate(sketch, values):
+    for q in QUANTILES:
+        expected = exact(values, q)
+        assert abs(sketch.quantile(q) - expected) <= RELATIVE_ACCURACY * expected + 1e-9
+
+
+@pytest.mark.parametrize(
+    "draw",
+    [
+        lambda rng: rng.randint(1, 60),
+        lambda rng: round(rng.lognormvariate(3, 0.8)) + 1,
+        lambda rng: rng.choice([5, 10, 15, 20, 30, 45, 60]),
+        lambda rng: rng.uniform(0.5, 600),
+    ],
+)
+def test_quantiles_within_relative_accuracy(draw):
+    rng = random.Random(11)
+    for size in (1, 2, 10, 1000, 20000):
+        values = [draw(rng) for _ in range(size)]
+        sketch = DurationSketch()
+        for value in values:
+            sketch.add(value)
+        assert sketch.count == size
+        assert_accurate(sketch, values)
+        bulk = DurationSketch()
+        bulk.add_many(values)
+        assert_accurate(bulk, values)
+
+
+def test_merged_sketches_match_combined_data():
+    rng = random.Random(12)
+    parts = [
+        [rng.randint(1, 120) for _ in range(rng.randint(0, 300))] for _ in range(20)
+    ]
+    merged = DurationSketch()
+    for part in parts:
+        sketch = DurationSketch()
+        for value in part:
+            sketch.add(value)
+        merged.merge(DurationSketch.from_bytes(sketch.to_bytes()))
+    combined = DurationSketch()
+    for value in sum(parts, []):
+        combined.add(value)
+    assert merged.buckets == combined.buckets
+    assert_accurate(merged, sum(parts, []))
+
+
+def test_serialization_round_trip_is_compact():
+    sketch = DurationSketch()
+    for value in [0, 0, 1, 5, 10, 10, 20, 45, 60, 90, 180, 0.01]:
+        sketch.add(value)
+    data = sketch.to_bytes()
+    restored = DurationSketch.from_bytes(memoryview(data))
+    assert restored.buckets == sketch.buckets
+    assert restored.zeros == 2
+    assert restored.quantile(0.0) == 0.0
+    assert len(data) < 40
+    with pytest.raises(ValueError):
+        DurationSketch.from_bytes(b"\x09")
+
+
+def test_empty_sketch():
+    sketch = DurationSketch()
+    assert sketch.quantile(0.5) is None
+    assert sketch.summary() == {"count": 0, "median": None, "p90": None}
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
+
+
+def test_log_session_maintains_per_type_sketches():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    conn.execute("INSERT INTO users (email, password_hash) VALUES ('a@x.com', 'h')")
+    rng = random.Random(13)
+    logged = {"Zen": [], "Guided": []}
+    for _ in range(300):
+        kind = rng.choice(list(logged))
+        duration = rng.randint(1, 90)
+        logged[kind].append(duration)
+        mindful.log_session(conn, 1, duration, kind, "2023-01-01")
+
+    result = sketches.get_duration_stats(conn, 1)
+    assert result["overall"]["count"] == 300
+    everything = logged["Zen"] + logged["Guided"]
+    assert result["overall"]["median"] == pytest.approx(
+        exact(everything, 0.5), rel=RELATIVE_ACCURACY
+    )
+    for row in result["by_type"]:
+        values = logged[row["session_type"]]
+        assert row["count"] == len(values)
+        assert row["p90"] == pytest.approx(exact(values, 0.9), rel=RELATIVE_ACCURACY)
+
+    # History logged before sketches existed is read from sessions.
+    conn.execute("DELETE FROM duration_sketches")
+    conn.execute("DELETE FROM duration_sketch_users")
+    assert sketches.get_duration_stats(conn, 1) == result
+    assert conn.execute("SELECT COUNT(*) FROM duration_sketches").fetchone()[0] == 0
+
+
+def test_first_session_after_upgrade_builds_from_history():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    conn.execute("INSERT INTO users (email, password_hash) VALUES ('a@x.com', 'h')")
+    conn.executemany(
+        "INSERT INTO sessions (user_id, duration, session_type, session_date) "
+        "VALUES (1, 60, 'Zen', '2023-01-01')",
+        [()] * 50,
+    )
+    mindful.log_session(conn, 1, 5, "Zen", "2023-01-02")
+    overall = sketches.get_duration_stats(conn, 1)["overall"]
+    assert overall["count"] == 51
+    assert overall["median"] == pytest.approx(60, rel=RELATIVE_ACCURACY)
+
+    mindful.log_session(conn, 1, 5, "Zen", "2023-01-03")
+    assert sketches.get_duration_stats(conn, 1)["overall"]["count"] == 52
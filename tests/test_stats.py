@@ -0,0 +1,109 @@
+import random
+import sqlite3
+from datetime import date, time, timedelta
+
+from src import dashboard, mindful, stats
+from src.sessions import MeditationSession
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    for email in ("a@example.com", "b@example.com"):
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)", (email, "hash")
+        )
+    conn.commit()
+    return conn
+
+
+def expected(conn, user_id):
+    rows = conn.execute(
+        "SELECT duration, session_date FROM sessions WHERE user_id = ?", (user_id,)
+    ).fetchall()
+    sessions = [
+        MeditationSession(d, "Zen", time(0, 0), date.fromisoformat(day), "")
+        for d, day in rows
+    ]
+    return (
+        dashboard.calculate_total_time(sessions),
+        dashboard.calculate_session_count(sessions),
+        dashboard.calculate_current_streak(sessions),
+    )
+
+
+def test_incremental_stats_match_full_scan():
+    conn = setup_db()
+    rng = random.Random(7)
+    start = date(2023, 1, 1)
+    day = start
+    for _ in range(60):
+        # Mostly move forward, sometimes repeat a day or backdate a session.
+        step = rng.choice([0, 1, 1, 1, 2, 5, -3])
+        day = max(start, day + timedelta(days=step))
+        mindful.log_session(conn, 1, rng.randint(1, 60), "Zen", day.isoformat())
+        user_stats = stats.get_user_stats(conn, 1)
+        assert (
+            user_stats["total_minutes"],
+            user_stats["session_count"],
+            user_stats["current_streak"],
+        ) == expected(conn, 1)
+
+    incremental = stats.get_user_stats(conn, 1)
+    assert stats.refresh_user_stats(conn, 1) == incremental
+    assert incremental["first_session_date"] == "2023-01-01"
+
+
+def test_streaks_track_longest_run():
+    conn = setup_db()
+    for day in ("2023-01-01", "2023-01-02", "2023-01-03", "2023-01-10", "2023-01-11"):
+        mindful.log_session(conn, 1, 10, "Zen", day)
+    user_stats = stats.get_user_stats(conn, 1)
+    assert user_stats["current_streak"] == 2
+    assert user_stats["longest_streak"] == 3
+    assert user_stats["last_session_date"] == "2023-01-11"
+    # Filling the gap joins the two runs.
+    for day in range(4, 10):
+        mindful.log_session(conn, 1, 10, "Zen", f"2023-01-{day:02d}")
+    assert stats.get_user_stats(conn, 1)["current_streak"] == 11
+
+
+def test_missing_rows_are_computed_and_backfill_repairs():
+    conn = setup_db()
+    conn.execute(
+        "INSERT INTO sessions (user_id, duration, session_type, session_date) "
+        "VALUES (1, 15, 'Zen', '2023-01-01')"
+    )
+    conn.commit()
+    # History from before the table existed is picked up on first use.
+    mindful.log_session(conn, 1, 5, "Zen", "2023-01-02")
+    assert stats.get_user_stats(conn, 1)["total_minutes"] == 20
+    assert stats.get_user_stats(conn, 2)["session_count"] == 0
+
+    conn.execute("UPDATE user_stats SET total_minutes = 0, current_streak = 9")
+    conn.commit()
+    assert stats.backfill(conn, batch_size=1) == 2
+    assert stats.get_user_stats(conn, 1)["total_minutes"] == 20
+    assert stats.get_user_stats(conn, 1)["current_streak"] == 2
+    assert stats.get_user_stats(conn, 2)["current_streak"] == 0
+
+
+def test_every_write_bumps_data_version():
+    conn = setup_db()
+
+    def version():
+        return conn.execute(stats.SELECT_DATA_VERSION, (1,)).fetchone()[0]
+
+    mindful.log_session(conn, 1, 10, "Zen", "2023-01-02")
+    seen = [version()]
+    mindful.log_session(conn, 1, 10, "Zen", "2023-01-03")
+    seen.append(version())
+    # Backdated sessions take the recompute path.
+    mindful.log_session(conn, 1, 10, "Zen", "2023-01-01")
+    seen.append(version())
+    stats.bump_data_version(conn, 1)
+    seen.append(version())
+    assert seen == sorted(set(seen))
+    # Users without a row get one.
+    stats.bump_data_version(conn, 2)
+    assert conn.execute(stats.SELECT_DATA_VERSION, (2,)).fetchone() is not None
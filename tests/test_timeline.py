@@ -0,0 +1,175 @@
+import random
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from src import mindful, profiles, relationships, subscriptions, timeline
+from src.activity import ActivityFeed
+from src.migrations import MIGRATIONS_DIR
+from src.user_cache import load_summaries
+
+USERS = range(1, 7)
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:")
+    mindful.init_db(conn)
+    for idx in USERS:
+        conn.execute(
+            "INSERT INTO users (email, password_hash, display_name) VALUES (?, ?, ?)",
+            (f"user{idx}@example.com", "pw", f"User {idx}"),
+        )
+        subscriptions.subscribe_user(conn, idx, "premium", "2023-01-01")
+    conn.commit()
+    return conn
+
+
+def reference_feed(conn, viewer_id, limit=1000):
+    # The query /feed ran before timelines existed.
+    ids = set(relationships.get_following(conn, viewer_id)) | {viewer_id}
+    placeholders = ",".join("?" for _ in ids)
+    return conn.execute(
+        "SELECT f.id, f.user_id, f.item_type, f.message, "
+        "f.timestamp, f.target_user_id, f.related_feed_item_id "
+        "FROM activity_feed f JOIN users u ON f.user_id = u.id "
+        f"WHERE f.user_id IN ({placeholders}) AND (u.is_public = 1 OR f.user_id = ?) "
+        "ORDER BY f.timestamp DESC, f.id DESC LIMIT ?",
+        (*ids, viewer_id, limit),
+    ).fetchall()
+
+
+def timeline_feed(conn, viewer_id, limit=1000):
+    return conn.execute(timeline.SELECT_TIMELINE, (viewer_id, limit)).fetchall()
+
+
+def random_activity(conn, seed, steps=300):
+    rng = random.Random(seed)
+    feed = ActivityFeed(conn)
+    for _ in range(steps):
+        user, other = rng.sample(list(USERS), 2)
+        action = rng.random()
+        if action < 0.35:
+            feed.log_session(user, "Zen 10m")
+        elif action < 0.5:
+            feed.add_comment(user, other, "Nice")
+        elif action < 0.6:
+            feed.add_encouragement(user, other, "Keep going")
+        elif action < 0.8:
+            relationships.follow_user(conn, user, other)
+        elif action < 0.92:
+            relationships.unfollow_user(conn, user, other)
+        else:
+            profiles.update_visibility(conn, user, rng.random() < 0.6)
+
+
+def test_timelines_match_query_over_followed_users():
+    for seed in range(4):
+        conn = setup_db()
+        random_activity(conn, seed)
+        for viewer in USERS:
+            assert timeline_feed(conn, viewer) == reference_feed(conn, viewer)
+            assert timeline_feed(conn, viewer, 5) == reference_feed(conn, viewer, 5)
+
+
+def test_cursor_pages_cover_the_whole_timeline():
+    conn = setup_db()
+    random_activity(conn, 3)
+    # Tied timestamps must still page in (timestamp, id) order.
+    conn.execute(
+        "UPDATE activity_feed SET timestamp = '2023-01-01 06:00:00' WHERE id % 3 = 0"
+    )
+    conn.execute(
+        "UPDATE feed_timelines SET timestamp = (SELECT timestamp FROM activity_feed "
+        "WHERE id = feed_item_id)"
+    )
+    for viewer in USERS:
+        pages, cursor = [], None
+        while True:
+            rows = conn.execute(*timeline.page_query(viewer, 7, cursor)).fetchall()
+            pages.extend(rows)
+            if len(rows) < 7:
+                break
+            cursor = timeline.encode_cursor(rows[-1][4], rows[-1][0])
+        assert pages == reference_feed(conn, viewer)
+
+
+def test_decode_cursor_rejects_garbage():
+    cursor = timeline.encode_cursor("2023-01-01 06:00:00.5", 42)
+    assert timeline.decode_cursor(cursor) == (datetime(2023, 1, 1, 6, 0, 0, 500000), 42)
+    for bad in ("", "bogus", "W10", timeline.encode_cursor("yesterday", 1)):
+        with pytest.raises(ValueError):
+            timeline.decode_cursor(bad)
+
+
+def test_migration_backfill_matches_fan_out():
+    conn = setup_db()
+    random_activity(conn, 7)
+    expected = conn.execute(
+        "SELECT * FROM feed_timelines ORDER BY viewer_id, feed_item_id"
+    ).fetchall()
+    conn.execute("DELETE FROM feed_timelines")
+    sql = (MIGRATIONS_DIR / "sqlite" / "0008_feed_timelines.sql").read_text()
+    conn.executescript(sql[sql.index("INSERT INTO feed_timelines") :])
+    assert (
+        conn.execute(
+            "SELECT * FROM feed_timelines ORDER BY viewer_id, feed_item_id"
+        ).fetchall()
+        == expected
+    )
+
+
+def test_follow_backfills_and_unfollow_removes():
+    conn = setup_db()
+    feed = ActivityFeed(conn)
+    first = feed.log_session(2, "Zen 10m")
+    assert timeline_feed(conn, 1) == []
+    relationships.follow_user(conn, 1, 2)
+    assert [r[0] for r in timeline_feed(conn, 1)] == [first]
+    profiles.update_visibility(conn, 2, False)
+    assert timeline_feed(conn, 1) == []
+    assert [r[0] for r in timeline_feed(conn, 2)] == [first]
+    profiles.update_visibility(conn, 2, True)
+    second = feed.log_session(2, "Zen 20m")
+    assert [r[0] for r in timeline_feed(conn, 1)] == [second, first]
+    relationships.unfollow_user(conn, 1, 2)
+    assert timeline_feed(conn, 1) == []
+    assert len(timeline_feed(conn, 2)) == 2
+
+
+def test_interactions_match_per_item_queries():
+    conn = setup_db()
+    feed = ActivityFeed(conn)
+    rng = random.Random(11)
+    sessions = [feed.log_session(user, "Zen 10m") for user in USERS]
+    for _ in range(60):
+        item = rng.choice(sessions)
+        user, target = rng.sample(list(USERS), 2)
+        if rng.random() < 0.7:
+            feed.add_comment(user, target, f"Nice {_}", related_feed_item_id=item)
+        else:
+            feed.add_encouragement(user, target, "Go", related_feed_item_id=item)
+
+    items = [{"item_id": item_id} for item_id in sessions]
+    rows = conn.execute(*timeline.interactions_query(sessions, 2)).fetchall()
+    users = load_summaries(conn, USERS)
+    timeline.attach_interactions(items, rows, 2, users)
+    for item in items:
+        per_item = conn.execute(
+            "SELECT item_type, message FROM activity_feed "
+            "WHERE related_feed_item_id = ? ORDER BY timestamp DESC, id DESC",
+            (item["item_id"],),
+        ).fetchall()
+        comments = [m for t, m in per_item if t == "comment"]
+        assert item["comment_count"] == len(comments)
+        assert item["encouragement_count"] == len(per_item) - len(comments)
+        assert [c["message"] for c in item["comments"]] == comments[:2]
+        for comment in item["comments"]:
+            assert comment["user_display_name"] == f"User {comment['user_id']}"
+
+
+def test_interactions_use_related_index():
+    conn = setup_db()
+    sql, params = timeline.interactions_query([1, 2], 3)
+    plan = " ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert "idx_activity_feed_related" in plan
@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+from src import challenges, mindful
+from src.activity import ActivityFeed
+from src.pool import create_pool
+from src.transaction import after_commit, unit_of_work
+
+
+class CountingConnection(sqlite3.Connection):
+    commits = 0
+
+    def commit(self):
+        self.commits += 1
+        super().commit()
+
+
+def setup_db(path):
+    conn = sqlite3.connect(str(path), factory=CountingConnection)
+    mindful.init_db(conn)
+    conn.execute(
+        "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+        ("user@example.com", "hash"),
+    )
+    conn.commit()
+    conn.commits = 0
+    return conn
+
+
+def test_helpers_commit_once_inside_unit_of_work(tmp_path):
+    conn = setup_db(tmp_path / "uow.db")
+    feed = ActivityFeed(conn)
+    with unit_of_work(conn):
+        mindful.log_session(conn, 1, 10, "Zen", "2023-01-01", mood_before=3)
+        feed.log_session(1, "Zen 10m")
+        challenges.award_badge(conn, 1, "First Session Completed")
+        assert conn.commits == 0
+    assert conn.commits == 1
+
+
+def test_unit_of_work_rolls_back_on_error(tmp_path):
+    conn = setup_db(tmp_path / "uow.db")
+    with pytest.raises(RuntimeError):
+        with unit_of_work(conn):
+            mindful.log_session(conn, 1, 10, "Zen", "2023-01-01")
+            raise RuntimeError("boom")
+    assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 0
+
+
+def test_pooled_helpers_join_the_unit_of_work(tmp_path):
+    pool = create_pool(None, str(tmp_path / "pool.db"), max_size=1, timeout=0.1)
+    with pool.connection() as conn:
+        mindful.init_db(conn)
+        conn.execute(
+            "INSERT INTO users (email, password_hash) VALUES (?, ?)",
+            ("user@example.com", "hash"),
+        )
+        conn.commit()
+        # With a single-connection pool a separate checkout would time out.
+        with unit_of_work(conn):
+            ActivityFeed(pool).log_session(1, "Zen 10m")
+        count = conn.execute("SELECT COUNT(*) FROM activity_feed").fetchone()[0]
+    assert count == 1
+    pool.close()
+
+
+def test_after_commit_waits_for_the_unit_of_work(tmp_path):
+    conn = setup_db(tmp_path / "uow.db")
+    calls = []
+    after_commit(conn, lambda: calls.append("now"))
+    assert calls == ["now"]
+
+    with unit_of_work(conn):
+        after_commit(conn, lambda: calls.append(conn.commits))
+        assert calls == ["now"]
+    assert calls == ["now", 1]
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work(conn):
+            after_commit(conn, lambda: calls.append("rolled back"))
+            raise RuntimeError("boom")
+    assert calls == ["now", 1]
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from src import auth, mindful, profiles
+from src.transaction import unit_of_work
+from src.user_cache import UserSummary, UserSummaryCache, summaries_query
+
+
+class CountingConnection(sqlite3.Connection):
+    queries = 0
+
+    def execute(self, *args):
+        if args[0].startswith("SELECT id, display_name"):
+            self.queries += 1
+        return super().execute(*args)
+
+
+def setup_db():
+    conn = sqlite3.connect(":memory:", factory=CountingConnection)
+    mindful.init_db(conn)
+    for idx in range(1, 5):
+        conn.execute(
+            "INSERT INTO users (email, password_hash, display_name) VALUES (?, ?, ?)",
+            (f"user{idx}@example.com", "pw", f"User {idx}"),
+        )
+    conn.commit()
+    return conn
+
+
+def test_get_many_loads_missing_users_in_one_query():
+    conn = setup_db()
+    cache = UserSummaryCache()
+    users = cache.get_many(conn, [1, 2, 2, 99])
+    assert sorted(users) == [1, 2]
+    assert users[1] == UserSummary(1, "User 1", None, None, True)
+    assert conn.queries == 1
+
+    users = cache.get_many(conn, [1, 2, 3])
+    assert sorted(users) == [1, 2, 3]
+    assert conn.queries == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 4, 3)
+
+
+def test_entries_expire_and_are_evicted(clock):
+    conn = setup_db()
+    cache = UserSummaryCache(max_entries=2, ttl=10, clock=clock)
+    cache.get_many(conn, [1, 2, 3])
+    assert cache.stats()["evictions"] == 1
+    conn.execute("UPDATE users SET display_name = 'Renamed' WHERE id = 3")
+    assert cache.get(conn, 3).display_name == "User 3"
+    clock.now = 11
+    assert cache.get(conn, 3).display_name == "Renamed"
+    with pytest.raises(ValueError):
+        UserSummaryCache(max_entries=0)
+
+
+def test_profile_writes_invalidate_after_commit():
+    conn = setup_db()
+    cache = UserSummaryCache()
+    cache.get(conn, 1)
+    profiles.update_bio(conn, 1, "Hello", cache)
+    assert cache.get(conn, 1).bio == "Hello"
+    profiles.update_photo(conn, 1, "/uploads/me.png", cache)
+    assert cache.get(conn, 1).photo_url == "/uploads/me.png"
+
+    with unit_of_work(conn):
+        profiles.update_visibility(conn, 1, False, cache)
+        assert cache.get(conn, 1).is_public
+    assert not cache.get(conn, 1).is_public
+    profile = profiles.get_profile_with_stats(conn, 1, cache)
+    assert (profile["bio"], profile["is_public"]) == ("Hello", False)
+    with pytest.raises(ValueError):
+        profiles.get_profile_with_stats(conn, 99, cache)
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    conn = setup_db()
+    cache = UserSummaryCache()
+    found, missing, generation = cache.lookup([1])
+    rows = conn.execute(*summaries_query(missing)).fetchall()
+    cache.invalidate(1)
+    assert cache.store(rows, generation)[1].display_name == "User 1"
+    assert cache.stats()["entries"] == 0
+
+
+def test_registration_invalidates_new_id(monkeypatch):
+    monkeypatch.setattr(auth, "hash_password", lambda password: "hashed")
+    conn = setup_db()
+    cache = UserSummaryCache()
+    cache.store([(5, "Stale", "", None, 1)], cache.lookup([])[2])
+    user_id = auth.register_user(
+        conn, "new@example.com", "pw", display_name="New", users=cache
+    )
+    assert user_id == 5
+    assert cache.get(conn, 5).display_name == "New"